@@ -1,6 +1,8 @@
 # backend/db.py
 
 import os
+import threading
+from typing import Dict, List, Optional
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 from flask import Flask
 from flask_pymongo import PyMongo
@@ -65,25 +67,108 @@ def init_mongo_app(app: Flask):
     except ConnectionFailure as e:
         raise ConnectionFailure(f"無法連接 MongoDB: {e}")
 
-    # 建立好 counters 集合的索引（若不存在）
-    # 用來實作「自動遞增序號」功能
-    counters_coll = mongo.db["counters"]
-    counters_coll.create_index("collection_name", unique=True)
+    # counters 集合 (自動遞增序號) 等所有索引統一宣告於 backend/indexes.py，於 create_app 建立
 
 
-def get_next_sequence(collection_name: str) -> int:
+def reserve_sequence(collection_name: str, count: int) -> int:
     """
-    取得對應 collection_name 的下一個自增序號。
-    若尚無紀錄，則從 1 開始。
+    一次 $inc 保留 count 個連續序號；回傳第一個序號，
+    保留的範圍為 [first, first + count - 1]。
     """
+    if count < 1:
+        raise ValueError("count must be >= 1")
     counters_coll = mongo.db["counters"]
     result = counters_coll.find_one_and_update(
         {"collection_name": collection_name},
-        {"$inc": {"seq": 1}},
+        {"$inc": {"seq": count}},
         upsert=True,
         return_document=True
     )
-    return result["seq"]
+    return result["seq"] - count + 1
+
+
+# 以區塊發放 ID 的 collection (預設沒有)：目前所有 collection 的 ID 都是使用者看得到的編號
+# (專案列表依 id 排序、日報標題 "DailyReport #{id}"、Gantt 的 ID 欄位與依 id 排序的任務列表)，
+# 預設逐一取號、保持依建立順序連續遞增
+_DEFAULT_ID_BLOCK_COLLECTIONS = ""
+
+
+def _id_block_size(collection_name: str) -> int:
+    """
+    collection 在 ID_BLOCK_COLLECTIONS (逗號分隔，預設空白) 之中 => ID_BLOCK_SIZE (預設 100)，否則 1。
+    """
+    names = os.environ.get("ID_BLOCK_COLLECTIONS", _DEFAULT_ID_BLOCK_COLLECTIONS)
+    if collection_name not in {n.strip() for n in names.split(",") if n.strip()}:
+        return 1
+    try:
+        return max(1, int(os.environ.get("ID_BLOCK_SIZE", 100)))
+    except ValueError:
+        return 100
+
+
+class SequenceAllocator:
+    """
+    自增序號的發放。
+
+    預設每個 ID 一次 find_one_and_update (與舊的 get_next_sequence 相同)，ID 依建立順序連續遞增。
+    大量新增請用 reserve(n)：一次 $inc 保留 n 個連續 ID (例如 apply_gantt_task_batch)，
+    同樣連續、依順序，且只有一次 round trip。
+
+    區塊模式 (opt-in，只對 ID_BLOCK_COLLECTIONS 列出的 collection)：每次 $inc ID_BLOCK_SIZE (預設 100)
+    保留一段 ID，之後在 process 內直接發放，用完才再向 MongoDB 要下一段。取捨：
+      - 不同 worker 各自持有一段，ID 仍唯一，但會跳號約一個區塊、且不按建立時間遞增
+      - worker 重啟時沒用完的 ID 會跳號
+    所以只適用 ID 不對使用者顯示、也不用於排序的 collection；目前沒有這樣的 collection，預設不啟用。
+    block_size 有給時 (benchmark 用) 對所有 collection 都用該大小。
+    """
+
+    def __init__(self, block_size: Optional[int] = None):
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._blocks: Dict[str, List[int]] = {}  # collection_name -> [下一個可用, 區塊結尾(不含)]
+        self._pid = os.getpid()
+
+    def _collection_lock(self, collection_name: str) -> threading.Lock:
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 之後 (gunicorn worker) 不能沿用 parent 手上的區塊，否則兩個 worker 會發出相同 ID
+                self._pid = os.getpid()
+                self._locks.clear()
+                self._blocks.clear()
+            lock = self._locks.get(collection_name)
+            if lock is None:
+                lock = self._locks[collection_name] = threading.Lock()
+            return lock
+
+    def next(self, collection_name: str) -> int:
+        with self._collection_lock(collection_name):
+            block = self._blocks.get(collection_name)
+            if block is None or block[0] >= block[1]:
+                size = self._block_size or _id_block_size(collection_name)
+                first = reserve_sequence(collection_name, size)
+                block = self._blocks[collection_name] = [first, first + size]
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def reserve(self, collection_name: str, count: int) -> range:
+        """
+        批次新增用：一次保留 count 個連續 ID (直接向 counters 要，不動本地區塊)。
+        """
+        first = reserve_sequence(collection_name, count)
+        return range(first, first + count)
+
+
+id_allocator = SequenceAllocator()
+
+
+def get_next_sequence(collection_name: str) -> int:
+    """
+    取得對應 collection_name 的下一個自增序號 (由 id_allocator 以區塊發放)。
+    若尚無紀錄，則從 1 開始。
+    """
+    return id_allocator.next(collection_name)
 
 
 def to_iso_date(date_obj):
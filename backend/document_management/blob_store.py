@@ -0,0 +1,162 @@
+# backend/document_management/blob_store.py
+
+"""
+文件版本檔案的內容定址 (content-addressed) 儲存與去重。
+
+常見流程是「同一份圖面 / PDF 重新發行，只改版本備註」：原本每次都以新的 uuid key 上傳一份完整複本。
+現在以內容的 sha256 為 blob id，`document_blobs` collection 記錄：
+
+  {
+    "_id": "<sha256 hex>",
+    "s3_key": "documents/blobs/ab/<sha256>-<8 碼>",
+    "size": int,
+    "refcount": int,          # 有幾個版本引用這個 blob
+    "created_at": datetime
+  }
+
+  - 版本記錄多一個 "sha256" 欄位；s3_key 仍照舊存在版本上 (下載 / presigned GET 不需要查 blob)
+  - 新增版本：blob 已存在 => refcount + 1，不再上傳 (base64 / presigned 直傳在上傳前就知道 hash，完全跳過上傳)；
+    串流上傳只能邊傳邊算 hash，傳完發現重複時把剛上傳的物件交給 s3_cleanup 刪除
+  - 刪除文件：引用的 blob refcount - 1，歸零的 blob 記錄刪除、S3 物件交給 s3_cleanup 批次刪除
+  - 每個 blob 的 S3 key 帶有隨機尾碼：blob 歸零刪除後又有人上傳相同內容時，會得到新的 key，
+    不會被 cleaner 佇列中尚未刪除的舊 key 誤刪
+  - 沒有 sha256 的舊版本 (去重上線前) 照舊：刪除文件時直接刪其 s3_key
+"""
+
+import hashlib
+import logging
+import uuid
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.db import mongo
+from backend.document_management.s3_cleanup import enqueue_s3_deletes
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_BLOBS_COLLECTION = "document_blobs"
+BLOB_KEY_PREFIX = "documents/blobs"
+
+
+def _blobs():
+    return mongo.db[DOCUMENT_BLOBS_COLLECTION]
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def new_blob_key(digest: str) -> str:
+    return f"{BLOB_KEY_PREFIX}/{digest[:2]}/{digest}-{uuid.uuid4().hex[:8]}"
+
+
+def is_valid_digest(digest: str) -> bool:
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+
+def find_blob(digest: str) -> Optional[dict]:
+    return _blobs().find_one({"_id": digest, "refcount": {"$gt": 0}})
+
+
+def ref_existing_blob(digest: str) -> Optional[dict]:
+    """
+    blob 已存在時 refcount + 1 並回傳 blob 記錄；不存在回傳 None (由呼叫端上傳後 register_blob)。
+    """
+    return _blobs().find_one_and_update(
+        {"_id": digest, "refcount": {"$gt": 0}},
+        {"$inc": {"refcount": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def register_blob(digest: str, s3_key: str, size: Optional[int] = None) -> dict:
+    """
+    登記一個剛上傳到 s3_key 的 blob 並取得一個引用 (refcount + 1)。
+    若同時已有人登記了相同內容 (並行上傳)，改引用既有 blob，剛上傳的物件交給 s3_cleanup 刪除。
+    回傳實際被引用的 blob 記錄 (其 s3_key 可能與傳入的不同)。
+    """
+    while True:
+        blob = ref_existing_blob(digest)
+        if blob:
+            if blob["s3_key"] != s3_key:
+                enqueue_s3_deletes([s3_key], source=f"blob-duplicate/{digest}")
+            return blob
+        # refcount 已歸零 (正在被 release) 的殘留記錄：由這裡刪除並清掉其 S3 物件，改登記這份
+        stale = _blobs().find_one_and_delete({"_id": digest, "refcount": {"$lte": 0}})
+        if stale:
+            enqueue_s3_deletes([stale["s3_key"]], source=f"blob-release/{digest}")
+        blob = {
+            "_id": digest,
+            "s3_key": s3_key,
+            "size": size,
+            "refcount": 1,
+            "created_at": datetime.now(),
+        }
+        try:
+            _blobs().insert_one(blob)
+            return blob
+        except DuplicateKeyError:
+            continue
+
+
+def store_blob_bytes(data: bytes, upload: Callable[[str], None]) -> dict:
+    """
+    內容已在記憶體中 (例如 base64 上傳)：先算 hash，已存在就不上傳；
+    不存在時以 upload(s3_key) 上傳後登記。回傳被引用的 blob 記錄。
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    blob = ref_existing_blob(digest)
+    if blob:
+        logger.debug("[blob_store] dedup hit %s (%d bytes)", digest, len(data))
+        return blob
+    s3_key = new_blob_key(digest)
+    upload(s3_key)
+    return register_blob(digest, s3_key, len(data))
+
+
+def release_blobs(digests: Iterable[str]):
+    """
+    每個 digest 釋放一個引用；refcount 歸零的 blob 記錄刪除，S3 物件交給 s3_cleanup。
+    同一 digest 出現多次代表釋放多個引用。
+    """
+    counts = {}
+    for d in digests:
+        if d:
+            counts[d] = counts.get(d, 0) + 1
+
+    to_delete = []
+    for digest, n in counts.items():
+        blob = _blobs().find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refcount": -n}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not blob or blob["refcount"] > 0:
+            continue
+        # 以 refcount 條件刪除：若中間又被引用 (refcount > 0) 就不刪
+        if _blobs().delete_one({"_id": digest, "refcount": {"$lte": 0}}).deleted_count:
+            to_delete.append(blob["s3_key"])
+
+    if to_delete:
+        enqueue_s3_deletes(to_delete, source="blob-release")
+
+
+def release_version_files(versions: Iterable[dict], source: str = ""):
+    """
+    刪除版本時呼叫：有 sha256 的釋放 blob 引用，舊版本 (無 sha256) 直接刪 s3_key。
+    """
+    digests = []
+    legacy_keys = []
+    for ver in versions:
+        if ver.get("sha256"):
+            digests.append(ver["sha256"])
+        elif ver.get("s3_key"):
+            legacy_keys.append(ver["s3_key"])
+    if digests:
+        release_blobs(digests)
+    if legacy_keys:
+        enqueue_s3_deletes(legacy_keys, source=source)
+
@@ -0,0 +1,89 @@
+# backend/document_management/document_counts.py
+
+"""
+文件數量的快取計數器 (分頁 API 的 total)。
+
+count_documents 要掃過所有符合的文件 (專案日報越多越慢)；這裡以 `document_counts` collection
+按 (project_id, doc_type) 維護計數，新增 / 刪除 / 改專案或類型時以 $inc 同步更新，
+查 total 時只要加總幾筆計數 document。
+
+第一次查詢時 (或呼叫 rebuild_document_counts()) 會以 aggregate 從 documents 重建整張表，
+之後只靠增量更新；計數若因舊版程式直接寫 documents 而偏差，重建即可校正。
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Optional
+
+from backend.db import mongo
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_COUNTS_COLLECTION = "document_counts"
+_INITIALIZED_ID = "__initialized__"
+
+
+def _counts():
+    return mongo.db[DOCUMENT_COUNTS_COLLECTION]
+
+
+def _counter_id(project_id: Any, doc_type: Any) -> str:
+    # repr 區分型別 (project_id 1 與 "1" 在 MongoDB 查詢中是不同的值)
+    return f"{project_id!r}|{doc_type!r}"
+
+
+def adjust_document_count(project_id: Any, doc_type: Any, delta: int):
+    if not delta:
+        return
+    _counts().update_one(
+        {"_id": _counter_id(project_id, doc_type)},
+        {
+            "$inc": {"count": delta},
+            "$set": {"project_id": project_id, "doc_type": doc_type, "updated_at": datetime.now()}
+        },
+        upsert=True
+    )
+
+
+def rebuild_document_counts() -> int:
+    """
+    以 documents 重新計算所有計數；回傳 (project_id, doc_type) 組數。
+    """
+    rows = list(mongo.db["documents"].aggregate([
+        {"$group": {"_id": {"project_id": "$project_id", "doc_type": "$doc_type"}, "count": {"$sum": 1}}}
+    ]))
+    now = datetime.now()
+    seen = [_INITIALIZED_ID]
+    for row in rows:
+        project_id, doc_type = row["_id"].get("project_id"), row["_id"].get("doc_type")
+        counter_id = _counter_id(project_id, doc_type)
+        _counts().update_one(
+            {"_id": counter_id},
+            {"$set": {"project_id": project_id, "doc_type": doc_type, "count": row["count"], "updated_at": now}},
+            upsert=True
+        )
+        seen.append(counter_id)
+    # 已經沒有文件的組合歸零
+    _counts().update_many({"_id": {"$nin": seen}}, {"$set": {"count": 0, "updated_at": now}})
+    _counts().update_one({"_id": _INITIALIZED_ID}, {"$set": {"rebuilt_at": now}}, upsert=True)
+    logger.info("[document_counts] rebuilt %d counters", len(rows))
+    return len(rows)
+
+
+def get_document_count(project_id: Optional[Any] = None, doc_type: Optional[str] = None) -> int:
+    """
+    符合 (project_id, doc_type) 的文件數 (任一為 None 表示不限)。
+    """
+    if _counts().find_one({"_id": _INITIALIZED_ID}, {"_id": 1}) is None:
+        rebuild_document_counts()
+
+    query = {"_id": {"$ne": _INITIALIZED_ID}}
+    if project_id is not None:
+        query["project_id"] = project_id
+    if doc_type is not None:
+        query["doc_type"] = doc_type
+    rows = list(_counts().aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "total": {"$sum": "$count"}}}
+    ]))
+    return max(0, rows[0]["total"]) if rows else 0
@@ -0,0 +1,178 @@
+# backend/document_management/document_versions.py
+
+"""
+文件版本存放於獨立的 `document_versions` collection (原本 $push 在 documents.versions 陣列裡)。
+
+原本每新增一個版本，documents 那一筆就變大一點，list 文件時也連同全部版本歷史一起讀出、一起傳給前端。
+現在：
+  document_versions：
+    {
+      "_id": ObjectId,
+      "doc_id": ObjectId,        # documents._id
+      "version_id": str (uuid),
+      "version_note", "filename", "s3_key", "size", "sha256"(選填),
+      "created_at": datetime
+    }
+    index (見 indexes.py)：(doc_id, created_at, _id) 供分頁；version_id unique
+
+  documents 上只留摘要：
+    "latest_version": {version_id, version_note, filename, size, created_at} | None
+    "version_count": int
+
+舊資料 (documents.versions 陣列) 以 migrate_versions.py 一次搬完；
+尚未搬移的文件在讀寫版本時也會自動搬移 (ensure_versions_migrated)，所以可以不停機上線。
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from backend.db import mongo
+from backend.document_management.pagination import DEFAULT_PAGE_SIZE, clamp_limit, fetch_page
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_VERSIONS_COLLECTION = "document_versions"
+
+# 版本 API 回傳的欄位 (doc_id / _id 為內部欄位)
+_VERSION_FIELDS = ("version_id", "version_note", "filename", "s3_key", "size", "sha256", "created_at")
+_SUMMARY_FIELDS = ("version_id", "version_note", "filename", "size", "created_at")
+
+
+def _versions():
+    return mongo.db[DOCUMENT_VERSIONS_COLLECTION]
+
+
+def version_summary(version: Optional[dict]) -> Optional[dict]:
+    if not version:
+        return None
+    return {k: version.get(k) for k in _SUMMARY_FIELDS}
+
+
+def _public_version(version: dict) -> dict:
+    return {k: version[k] for k in _VERSION_FIELDS if k in version}
+
+
+def insert_version(doc_oid: ObjectId, version: dict):
+    """
+    新增一個版本並更新 documents 上的 latest_version / version_count 摘要。
+    version 需包含 version_id / created_at 等欄位。
+    """
+    ensure_versions_migrated(doc_oid)
+    _versions().insert_one(dict(version, doc_id=doc_oid))
+    mongo.db["documents"].update_one(
+        {"_id": doc_oid},
+        {
+            "$set": {"latest_version": version_summary(version), "updated_at": datetime.now()},
+            "$inc": {"version_count": 1}
+        }
+    )
+
+
+def find_version(doc_oid: ObjectId, version_id: str) -> Optional[dict]:
+    ensure_versions_migrated(doc_oid)
+    return _versions().find_one({"doc_id": doc_oid, "version_id": version_id})
+
+
+def list_all_versions(doc_oid: ObjectId) -> List[dict]:
+    """
+    所有版本，舊到新 (與原本 documents.versions 陣列的順序相同)。
+    """
+    ensure_versions_migrated(doc_oid)
+    cursor = _versions().find({"doc_id": doc_oid}).sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+    return [_public_version(v) for v in cursor]
+
+
+def list_versions_page(doc_oid: ObjectId, limit: int = DEFAULT_PAGE_SIZE,
+                       cursor: Optional[str] = None) -> dict:
+    """
+    分頁列出版本，新到舊 (keyset 分頁，見 pagination.py)。
+    回傳 {"items": [...], "next_cursor": str | None}
+    """
+    ensure_versions_migrated(doc_oid)
+    rows, next_cursor = fetch_page(_versions(), {"doc_id": doc_oid}, "created_at", clamp_limit(limit), cursor)
+    return {"items": [_public_version(v) for v in rows], "next_cursor": next_cursor}
+
+
+def take_versions_for_delete(doc_oid: ObjectId, legacy_versions: Optional[List[dict]] = None) -> List[dict]:
+    """
+    刪除文件時呼叫 (documents 那筆已刪除之後)：刪除其所有版本記錄，回傳版本 (含 s3_key / sha256) 供釋放檔案。
+    legacy_versions：尚未搬移的 documents.versions 陣列。
+    """
+    versions = list(_versions().find({"doc_id": doc_oid}, {"version_id": 1, "s3_key": 1, "sha256": 1}))
+    _versions().delete_many({"doc_id": doc_oid})
+    seen = {v["version_id"] for v in versions}
+    versions.extend(v for v in (legacy_versions or []) if v.get("version_id") not in seen)
+    return versions
+
+
+# ------------------------------------------------------------
+#  舊資料搬移 (documents.versions 陣列 => document_versions)
+# ------------------------------------------------------------
+
+def migrate_document_versions(doc: dict) -> int:
+    """
+    搬移一筆 documents 的 versions 陣列 (doc 需含 _id 與 versions)；可重複執行 (以 version_id upsert)。
+    回傳搬移的版本數。
+    """
+    legacy = doc.get("versions") or []
+    ops = []
+    for ver in legacy:
+        ver = dict(ver)
+        if not ver.get("version_id"):
+            continue
+        ver.setdefault("created_at", doc.get("created_at") or datetime.now())
+        ver["doc_id"] = doc["_id"]
+        ops.append(UpdateOne({"version_id": ver["version_id"]}, {"$setOnInsert": ver}, upsert=True))
+    if ops:
+        _versions().bulk_write(ops, ordered=True)
+
+    latest = _versions().find_one(
+        {"doc_id": doc["_id"]}, sort=[("created_at", DESCENDING), ("_id", DESCENDING)]
+    )
+    count = _versions().count_documents({"doc_id": doc["_id"]})
+    # 只在 versions 陣列未被改動時才移除 (搬移期間若有舊版程式 $push，下次再搬)
+    mongo.db["documents"].update_one(
+        {"_id": doc["_id"], "versions": doc.get("versions")},
+        {
+            "$unset": {"versions": ""},
+            "$set": {"latest_version": version_summary(latest), "version_count": count}
+        }
+    )
+    return len(ops)
+
+
+def ensure_versions_migrated(doc_oid: ObjectId):
+    """
+    文件若還有舊的 versions 陣列就先搬移 (只有尚未搬移的文件會多一次搬移成本)。
+    """
+    doc = mongo.db["documents"].find_one(
+        {"_id": doc_oid, "versions": {"$exists": True}}, {"versions": 1, "created_at": 1}
+    )
+    if doc:
+        migrate_document_versions(doc)
+
+
+def migrate_all_document_versions(batch_size: int = 200) -> dict:
+    """
+    搬移所有仍有 versions 陣列的文件。回傳 {"documents": n, "versions": n}。
+    """
+    stats = {"documents": 0, "versions": 0}
+    last_id = None
+    while True:
+        query = {"versions": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        docs = list(mongo.db["documents"].find(query, {"versions": 1, "created_at": 1})
+                    .sort("_id", ASCENDING).limit(batch_size))
+        if not docs:
+            return stats
+        last_id = docs[-1]["_id"]
+        for doc in docs:
+            stats["versions"] += migrate_document_versions(doc)
+            stats["documents"] += 1
+        logger.info("[migrate_versions] migrated %d documents / %d versions so far",
+                    stats["documents"], stats["versions"])
@@ -0,0 +1,179 @@
+# backend/document_management/export_jobs.py
+
+"""
+多筆日報下載 (ZIP) 的背景 job (佇列見 backend/jobs.py)。
+
+job params: {"project_id": int, "diary_ids": [...], "file_type": "xlsx|sheet1|sheet2|all"}
+job result: {"file_path": 本機 ZIP 路徑, "filename": 下載檔名, "host": 產生 ZIP 的主機,
+             "s3_key": (JOB_RESULT_STORAGE=s3 時) ZIP 在 S3 的 key}
+
+JOB_EXECUTION=worker 且 web 與 worker 不在同一台機器時，必須設 JOB_RESULT_STORAGE=s3，
+web 端才拿得到 ZIP。
+"""
+
+import calendar
+import logging
+import os
+import socket
+import threading
+import time
+import zipfile
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from backend.db import mongo
+from backend.jobs import claim_job, execute_job, get_job_ttl_seconds, get_worker_id, update_job_progress
+from backend.document_management.services import (
+    DAILY_REPORT_ARTIFACTS,
+    _get_daily_report_template_path,
+    _get_project_doc,
+    get_s3_client,
+)
+from backend.document_management.render_pool import render_daily_report_files_parallel
+from backend.document_management.scratch import scratch_mkdtemp, scratch_owner
+
+logger = logging.getLogger(__name__)
+
+DAILY_REPORT_ZIP_JOB = "daily_report_zip"
+
+JOB_RESULT_S3_PREFIX = "job-results"
+
+
+def daily_report_arcname(date_str: str, artifact: str) -> str:
+    """日報各產出檔的下載/ZIP 內檔名"""
+    if artifact == "xlsx":
+        return f"{date_str}_daily_report.xlsx"
+    if artifact == "sheet1":
+        return f"{date_str}_daily_report.pdf"
+    return f"{date_str}_worker_log.pdf"
+
+
+def load_daily_report_docs(project_id, diary_ids) -> List[dict]:
+    """
+    依輸入順序把所有日報讀出來 (找不到的略過)。
+    """
+    docs = []
+    for d_id in diary_ids:
+        doc = mongo.db["documents"].find_one({
+            "doc_type": "DAILY_REPORT",
+            "daily_report_id": d_id,
+            "project_id": int(project_id)
+        })
+        if not doc:
+            logger.debug(f"[DEBUG] Diary ID={d_id} not found, skipping.")
+            continue
+        docs.append(doc)
+    return docs
+
+
+def iter_daily_report_zip_entries(rendered) -> Iterator[Tuple[str, str]]:
+    """
+    (doc, {artifact: path}) => (ZIP 內檔名, path)
+    """
+    for doc, files in rendered:
+        dr_data = doc.get("daily_report_data", {})
+        raw_date = dr_data.get("report_date", "")
+        date_str = raw_date.replace("-", "") if raw_date else f"ID{doc.get('daily_report_id')}"
+        for artifact, path_ in files.items():
+            yield daily_report_arcname(date_str, artifact), path_
+
+
+def _use_s3_result_storage() -> bool:
+    return os.environ.get("JOB_RESULT_STORAGE", "local").strip().lower() == "s3"
+
+
+def run_daily_report_zip_job(job: dict, worker_id: str) -> Optional[dict]:
+    """
+    產生 ZIP；回傳 job result，或 None (job 已被取消 / 過期 / 被其他 worker 接手)。
+    需在 Flask app context 中執行。
+    """
+    job_id = job["job_id"]
+    params = job.get("params") or {}
+    project_id = params.get("project_id")
+    diary_ids = params.get("diary_ids") or []
+    file_type = params.get("file_type", "xlsx")
+
+    logger.debug(
+        "[run_daily_report_zip_job] Start job_id=%s project_id=%s diary_ids=%s file_type=%s",
+        job_id, project_id, diary_ids, file_type
+    )
+
+    if len(diary_ids) == 0:
+        raise ValueError("No diaries specified.")
+    if file_type not in DAILY_REPORT_ARTIFACTS:
+        raise ValueError(f"Unsupported file_type={file_type}")
+
+    docs = load_daily_report_docs(project_id, diary_ids)
+
+    # 結果 ZIP 保留到 job 到期 (清掃不會淘汰 .expires 未到的 owner)；產生期間另持有 owner 鎖，
+    # render 的中間產物在 ZIP 寫完後立即刪除
+    result_owner = f"job-{job_id}"
+    expires_at = job.get("expires_at")
+    result_expires_at = (
+        calendar.timegm(expires_at.utctimetuple()) if expires_at else time.time() + get_job_ttl_seconds()
+    )
+
+    owned = {"value": True}
+
+    def _on_progress(finished):
+        # 進度更新同時是 heartbeat；更新失敗 = job 已不屬於這個 worker
+        if not update_job_progress(job_id, int(finished * 100 / len(docs)), worker_id):
+            owned["value"] = False
+
+    def _should_stop():
+        return not owned["value"]
+
+    with scratch_owner(result_owner, delete=False, expires_at=result_expires_at):
+        temp_dir = scratch_mkdtemp(prefix="multi_daily_", owner=result_owner)
+        zip_filename = f"multiple_diaries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        zip_path = os.path.join(temp_dir, zip_filename)
+
+        # 每份日報只填表一次；chunk 分散到 render 子行程平行產檔 (見 render_pool.py)，
+        # 結果仍依輸入順序寫入 ZIP
+        with scratch_owner(f"job-{job_id}-work"):
+            rendered = render_daily_report_files_parallel(
+                docs, file_type,
+                project_doc=_get_project_doc(docs[0]) if docs else {},
+                template_path=_get_daily_report_template_path(),
+                on_progress=_on_progress,
+                should_stop=_should_stop
+            )
+
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for arcname, path_ in iter_daily_report_zip_entries(rendered):
+                    zf.write(path_, arcname=arcname)
+
+        if _should_stop():
+            return None
+
+        result = {"file_path": zip_path, "filename": zip_filename, "host": socket.gethostname()}
+        if _use_s3_result_storage():
+            bucket = os.environ.get("AWS_S3_BUCKET", "")
+            s3_key = f"{JOB_RESULT_S3_PREFIX}/{job_id}/{zip_filename}"
+            get_s3_client().upload_file(zip_path, bucket, s3_key)
+            result["s3_key"] = s3_key
+
+    logger.debug("[run_daily_report_zip_job] Job done. file_path=%s", zip_path)
+    return result
+
+
+JOB_HANDLERS = {
+    DAILY_REPORT_ZIP_JOB: run_daily_report_zip_job,
+}
+
+
+def start_job_inline(app, job_id: str):
+    """
+    JOB_EXECUTION=inline：在目前的 web worker 以背景 thread 認領並執行 job。
+    """
+    def _run():
+        with app.app_context():
+            worker_id = get_worker_id()
+            job = claim_job(job_id, worker_id)
+            if job is None:
+                return
+            execute_job(job, JOB_HANDLERS, worker_id)
+
+    t = threading.Thread(target=_run, daemon=True)
+    t.start()
+    return t
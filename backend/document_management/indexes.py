@@ -0,0 +1,65 @@
+# backend/document_management/indexes.py
+
+"""
+documents blueprint 的索引宣告 (見 backend/indexes.py)。
+"""
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from backend.indexes import index, query
+from backend.document_management.blob_store import DOCUMENT_BLOBS_COLLECTION
+from backend.document_management.document_counts import DOCUMENT_COUNTS_COLLECTION
+from backend.document_management.document_versions import DOCUMENT_VERSIONS_COLLECTION
+from backend.document_management.s3_cleanup import S3_ORPHANS_COLLECTION
+from backend.document_management.services import DOCUMENT_UPLOADS_COLLECTION
+
+DAILY_REPORT_DATE = "daily_report_data.report_date"
+
+INDEXES = [
+    # list_documents 的 keyset 分頁 (created_at desc, _id desc)
+    index("documents", [("project_id", ASCENDING), ("doc_type", ASCENDING),
+                        ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    # 日報列表的 keyset 分頁 (report_date desc, _id desc)
+    index("documents", [("doc_type", ASCENDING), ("project_id", ASCENDING),
+                        (DAILY_REPORT_DATE, DESCENDING), ("_id", DESCENDING)]),
+    # 單筆日報 (更新 / 刪除 / 下載 / 多筆下載)
+    index("documents", [("doc_type", ASCENDING), ("project_id", ASCENDING), ("daily_report_id", ASCENDING)]),
+
+    # 版本 (見 document_versions.py)
+    index(DOCUMENT_VERSIONS_COLLECTION, [("doc_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    index(DOCUMENT_VERSIONS_COLLECTION, "version_id", unique=True),
+
+    # presigned 直傳尚未 finalize 的記錄 (TTL)
+    index(DOCUMENT_UPLOADS_COLLECTION, "upload_id", unique=True),
+    index(DOCUMENT_UPLOADS_COLLECTION, "expires_at", expireAfterSeconds=0),
+
+    # 待刪除的 S3 物件 (見 s3_cleanup.py)
+    index(S3_ORPHANS_COLLECTION, [("bucket", ASCENDING), ("key", ASCENDING)], unique=True),
+    index(S3_ORPHANS_COLLECTION, [("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+
+    # 文件數快取計數 (見 document_counts.py)
+    index(DOCUMENT_COUNTS_COLLECTION, [("project_id", ASCENDING), ("doc_type", ASCENDING)]),
+]
+
+_OID = ObjectId("000000000000000000000000")
+
+QUERIES = [
+    query("GET /api/documents/?project_id=&doc_type=", "documents",
+          {"project_id": 1, "doc_type": "DAILY_REPORT"}, sort=[("created_at", DESCENDING), ("_id", DESCENDING)]),
+    query("GET /api/documents/daily-reports", "documents",
+          {"doc_type": "DAILY_REPORT", "project_id": 1}, sort=[(DAILY_REPORT_DATE, DESCENDING), ("_id", DESCENDING)]),
+    query("PUT|DELETE /api/documents/daily-reports/<report_id>", "documents",
+          {"doc_type": "DAILY_REPORT", "daily_report_id": 1, "project_id": 1}),
+    query("GET /api/documents/<doc_id>", "documents", {"_id": _OID}),
+    query("GET /api/documents/<doc_id>/versions", DOCUMENT_VERSIONS_COLLECTION,
+          {"doc_id": _OID}, sort=[("created_at", DESCENDING), ("_id", DESCENDING)]),
+    query("GET /api/documents/<doc_id>/versions/<version_id>/download", DOCUMENT_VERSIONS_COLLECTION,
+          {"doc_id": _OID, "version_id": "x"}),
+    query("POST /api/documents/<doc_id>/versions/finalize", DOCUMENT_UPLOADS_COLLECTION,
+          {"upload_id": "x", "doc_id": _OID}),
+    query("POST /api/documents/<doc_id>/versions (dedup)", DOCUMENT_BLOBS_COLLECTION, {"_id": "x"}),
+    query("s3 cleaner: process_s3_orphans", S3_ORPHANS_COLLECTION,
+          {"status": "pending", "next_attempt_at": {"$lte": 0}}, sort=[("next_attempt_at", ASCENDING)]),
+    query("GET /api/documents/?total=1", DOCUMENT_COUNTS_COLLECTION, {"project_id": 1, "doc_type": "DAILY_REPORT"}),
+]
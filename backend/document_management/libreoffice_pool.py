@@ -0,0 +1,381 @@
+# backend/document_management/libreoffice_pool.py
+
+"""
+常駐 LibreOffice 轉檔池 (XLSX -> PDF)。
+
+原本每次轉檔都 `soffice --headless --convert-to`，每份 PDF 都要付出數秒的冷啟動。
+這裡改為維持 N 個常駐的 headless soffice (每個由 uno_convert_worker.py 管理，走 UNO pipe)，
+轉檔只需付出實際 render 的時間。
+
+環境變數設定：
+  - LIBREOFFICE_POOL_SIZE        常駐 instance 數 (預設 2；設為 0 表示停用，改回每次啟動 soffice)
+  - LIBREOFFICE_POOL_QUEUE       最多允許多少個請求排隊等待空閒 instance (預設 16)，超過直接回 PoolBusyError
+  - LIBREOFFICE_CONVERT_TIMEOUT  單次轉檔逾時秒數 (預設 120)，逾時會砍掉該 instance 並重啟
+  - LIBREOFFICE_HEALTHCHECK_INTERVAL  instance 閒置超過此秒數，下次取用前先 ping 一次 (預設 30)
+  - LIBREOFFICE_PYTHON           可 import uno 的 Python 直譯器 (預設自動尋找)
+
+gunicorn 每個 worker process 各自擁有一個 pool (以 pid 判斷，fork 後會重新建立)。
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uno_convert_worker.py")
+
+
+class ConversionError(RuntimeError):
+    pass
+
+
+class PoolBusyError(ConversionError):
+    pass
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class _UnoWorker:
+    """
+    單一常駐 instance：一個 uno_convert_worker.py 子行程 (其下再掛一個 soffice)。
+    以 stdin/stdout 的 JSON 單行協定溝通。
+    """
+
+    def __init__(self, index: int, python_exec: str, soffice_exec: str):
+        self.index = index
+        self.python_exec = python_exec
+        self.soffice_exec = soffice_exec
+        self.proc = None
+        self.profile_dir = None
+        self.last_ok = 0.0
+        self._responses = None
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self, startup_timeout: float = 60.0):
+        self.stop()
+        self.profile_dir = tempfile.mkdtemp(prefix=f"lo_profile_{self.index}_")
+        pipe_name = f"lo_pool_{os.getpid()}_{self.index}_{uuid.uuid4().hex[:8]}"
+        cmd = [
+            self.python_exec, WORKER_SCRIPT,
+            "--soffice", self.soffice_exec,
+            "--pipe", pipe_name,
+            "--profile", self.profile_dir,
+            "--startup-timeout", str(startup_timeout),
+        ]
+        self.proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            start_new_session=True,  # 獨立 process group，方便連同 soffice 一起砍掉
+        )
+        self._responses = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_loop, args=(self.proc, self._responses), daemon=True
+        )
+        reader.start()
+
+        ready = self._wait_response(startup_timeout + 5)
+        if not ready or not ready.get("ready"):
+            err = (ready or {}).get("error", "no ready signal")
+            self.stop()
+            raise ConversionError(f"LibreOffice worker #{self.index} failed to start: {err}")
+        self.last_ok = time.monotonic()
+        logger.info("[LibreOfficePool] worker #%s started (soffice pid=%s)",
+                    self.index, ready.get("soffice_pid"))
+
+    @staticmethod
+    def _read_loop(proc, responses):
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                responses.put(json.loads(line))
+            except ValueError:
+                logger.debug("[LibreOfficePool] ignore non-JSON output: %s", line)
+        responses.put(None)  # EOF => 子行程已結束
+
+    def _wait_response(self, timeout: float):
+        try:
+            return self._responses.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def request(self, payload: dict, timeout: float) -> dict:
+        if not self.is_alive():
+            raise ConversionError(f"LibreOffice worker #{self.index} is not running")
+        try:
+            self.proc.stdin.write(json.dumps(payload) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.stop(force=True)
+            raise ConversionError(f"LibreOffice worker #{self.index} pipe broken: {e}") from e
+
+        resp = self._wait_response(timeout)
+        if resp is None:
+            # 逾時 or 子行程結束 => 直接砍掉，下次取用時重啟
+            reason = "timed out" if self.is_alive() else "crashed"
+            self.stop(force=True)
+            raise ConversionError(f"LibreOffice worker #{self.index} {reason} (op={payload.get('op')})")
+        return resp
+
+    def ping(self, timeout: float = 10.0) -> bool:
+        try:
+            resp = self.request({"op": "ping"}, timeout)
+        except ConversionError:
+            return False
+        if resp.get("ok"):
+            self.last_ok = time.monotonic()
+            return True
+        return False
+
+    def stop(self, force: bool = False):
+        """
+        正常情況關閉 stdin 讓 worker 自行收掉 soffice；
+        force=True (逾時/卡死) 則直接對整個 process group 送 SIGKILL。
+        """
+        proc = self.proc
+        self.proc = None
+        if proc is not None and proc.poll() is None:
+            if not force:
+                try:
+                    proc.stdin.close()
+                    proc.wait(timeout=10)
+                except Exception:
+                    force = True
+            if force:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except OSError:
+                    proc.kill()
+                proc.wait()
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+class LibreOfficePool:
+    """
+    固定大小的常駐 LibreOffice pool。
+      - 空閒 instance 放在 _idle queue；取用時最多等待 convert_timeout 秒
+      - 同時排隊等待的請求數超過 max_queue 直接擲 PoolBusyError (bounded queue)
+      - 取用時若 instance 已死 => 重啟；閒置太久 => 先 ping (health check)
+      - 每次轉檔記錄耗時，stats() 可查詢
+    """
+
+    def __init__(self, size: int, max_queue: int, convert_timeout: float,
+                 healthcheck_interval: float, python_exec: str, soffice_exec: str):
+        self.size = size
+        self.max_queue = max_queue
+        self.convert_timeout = convert_timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._workers = [_UnoWorker(i, python_exec, soffice_exec) for i in range(size)]
+        self._idle = queue.Queue()
+        for w in self._workers:
+            self._idle.put(w)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._stats = {
+            "conversions": 0,
+            "failures": 0,
+            "restarts": 0,
+            "total_ms": 0,
+            "last_ms": 0,
+            "max_ms": 0,
+        }
+
+    def _acquire(self) -> _UnoWorker:
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                raise PoolBusyError(
+                    f"LibreOffice pool busy: {self._waiting} requests already waiting (max {self.max_queue})"
+                )
+            self._waiting += 1
+        try:
+            return self._idle.get(timeout=self.convert_timeout)
+        except queue.Empty:
+            raise PoolBusyError("Timed out waiting for an idle LibreOffice instance")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _ensure_healthy(self, worker: _UnoWorker):
+        if worker.is_alive():
+            if time.monotonic() - worker.last_ok < self.healthcheck_interval:
+                return
+            if worker.ping():
+                return
+            logger.warning("[LibreOfficePool] worker #%s failed health check, restarting", worker.index)
+        elif worker.last_ok:
+            logger.warning("[LibreOfficePool] worker #%s is dead, restarting", worker.index)
+        if worker.last_ok:
+            with self._lock:
+                self._stats["restarts"] += 1
+        worker.start()
+
+    def convert(self, xlsx_path: str, pdf_path: str) -> int:
+        """
+        將 xlsx_path 轉為 pdf_path，回傳本次轉檔耗時(ms)。
+        """
+        worker = self._acquire()
+        t0 = time.monotonic()
+        try:
+            self._ensure_healthy(worker)
+            resp = worker.request(
+                {"op": "convert", "src": os.path.abspath(xlsx_path), "dst": os.path.abspath(pdf_path)},
+                self.convert_timeout
+            )
+            if not resp.get("ok"):
+                raise ConversionError(f"LibreOffice PDF conversion failed: {resp.get('error')}")
+            worker.last_ok = time.monotonic()
+        except ConversionError:
+            with self._lock:
+                self._stats["failures"] += 1
+            raise
+        finally:
+            self._idle.put(worker)
+
+        elapsed_ms = int((time.monotonic() - t0) * 1000)
+        with self._lock:
+            self._stats["conversions"] += 1
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["last_ms"] = elapsed_ms
+            self._stats["max_ms"] = max(self._stats["max_ms"], elapsed_ms)
+        logger.info("[LibreOfficePool] converted %s in %d ms (worker #%s)",
+                    os.path.basename(xlsx_path), elapsed_ms, worker.index)
+        return elapsed_ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["waiting"] = self._waiting
+        s["size"] = self.size
+        s["max_queue"] = self.max_queue
+        s["idle"] = self._idle.qsize()
+        s["alive"] = sum(1 for w in self._workers if w.is_alive())
+        s["avg_ms"] = int(s["total_ms"] / s["conversions"]) if s["conversions"] else 0
+        return s
+
+    def shutdown(self):
+        for w in self._workers:
+            w.stop()
+
+
+# ------------------------------------------------------------
+#  per-process singleton
+# ------------------------------------------------------------
+
+_pool: Optional[LibreOfficePool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+_uno_python_cache = {}
+
+
+def _find_uno_python(soffice_exec: str) -> Optional[str]:
+    """
+    找出可 import uno 的 Python。順序：LIBREOFFICE_PYTHON > soffice 同目錄的 python > /usr/bin/python3
+    """
+    candidates = []
+    custom = os.environ.get("LIBREOFFICE_PYTHON")
+    if custom:
+        candidates.append(custom)
+    program_dir = os.path.dirname(os.path.realpath(soffice_exec))
+    candidates.append(os.path.join(program_dir, "python"))
+    candidates.append("/usr/bin/python3")
+
+    for exe in candidates:
+        if exe in _uno_python_cache:
+            if _uno_python_cache[exe]:
+                return exe
+            continue
+        ok = False
+        if os.path.isfile(exe):
+            try:
+                subprocess.run([exe, "-c", "import uno"], check=True, capture_output=True, timeout=30)
+                ok = True
+            except (subprocess.SubprocessError, OSError):
+                ok = False
+        _uno_python_cache[exe] = ok
+        if ok:
+            return exe
+    return None
+
+
+def get_libreoffice_pool(soffice_exec: str) -> Optional[LibreOfficePool]:
+    """
+    取得本 process 的常駐 pool；若停用 (LIBREOFFICE_POOL_SIZE=0) 或找不到可用的 uno Python，回傳 None。
+    """
+    global _pool, _pool_pid
+
+    size = _env_int("LIBREOFFICE_POOL_SIZE", 2)
+    if size <= 0:
+        return None
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == pid:
+            return _pool
+
+        python_exec = _find_uno_python(soffice_exec)
+        if not python_exec:
+            logger.warning("[LibreOfficePool] no Python with 'uno' module found; "
+                           "falling back to one soffice process per conversion.")
+            return None
+
+        # fork 之後父行程的 pool 不可共用 => 直接建立新的 (不去動父行程的子行程)
+        _pool = LibreOfficePool(
+            size=size,
+            max_queue=_env_int("LIBREOFFICE_POOL_QUEUE", 16),
+            convert_timeout=_env_float("LIBREOFFICE_CONVERT_TIMEOUT", 120.0),
+            healthcheck_interval=_env_float("LIBREOFFICE_HEALTHCHECK_INTERVAL", 30.0),
+            python_exec=python_exec,
+            soffice_exec=soffice_exec,
+        )
+        _pool_pid = pid
+        logger.info("[LibreOfficePool] created pool size=%s (python=%s)", size, python_exec)
+        return _pool
+
+
+def get_libreoffice_pool_stats() -> dict:
+    if _pool is None or _pool_pid != os.getpid():
+        return {"enabled": False}
+    stats = _pool.stats()
+    stats["enabled"] = True
+    return stats
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown()
@@ -0,0 +1,36 @@
+# backend/document_management/migrate_versions.py
+
+"""
+把既有 documents.versions 陣列搬到 document_versions collection (見 document_versions.py)。
+
+用法 (於專案根目錄，環境變數與 web 相同，至少需要 MONGO_URI)：
+    python -m backend.document_management.migrate_versions
+
+可重複執行；尚未搬移的文件在讀寫版本時也會自動搬移，因此不一定要停機執行。
+"""
+
+import logging
+import os
+
+from backend.main import create_app
+from backend.indexes import apply_indexes
+from backend.document_management.document_versions import (
+    DOCUMENT_VERSIONS_COLLECTION,
+    migrate_all_document_versions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_migration() -> dict:
+    app = create_app()
+    with app.app_context():
+        apply_indexes([DOCUMENT_VERSIONS_COLLECTION])
+        stats = migrate_all_document_versions()
+    logger.info("[migrate_versions] done: %d documents, %d versions", stats["documents"], stats["versions"])
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    print(run_migration())
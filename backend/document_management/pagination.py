@@ -0,0 +1,92 @@
+# backend/document_management/pagination.py
+
+"""
+keyset (cursor) 分頁的共用工具。
+
+skip/limit 分頁越後面越慢 (MongoDB 要先掃過前面所有筆)；keyset 分頁以上一頁最後一筆的排序鍵為起點，
+配合對應的索引，每一頁都是一次 index range scan，與資料總量無關。
+
+排序固定為 (某欄位 desc, _id desc)，_id 保證同值時順序穩定。
+cursor 是排序鍵 (欄位值, _id) 以 bson json_util 編碼再 base64url，對前端而言是不透明字串。
+"""
+
+import base64
+from typing import Any, List, Optional, Tuple
+
+from bson import json_util
+from bson.objectid import ObjectId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def clamp_limit(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    if limit is None:
+        return default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def _get_path(doc: dict, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def encode_cursor(doc: dict, sort_field: str) -> str:
+    raw = json_util.dumps([_get_path(doc, sort_field), doc["_id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, oid = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if not isinstance(oid, ObjectId):
+            raise TypeError("cursor _id is not an ObjectId")
+        return value, oid
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_query(query: dict, sort_field: str, cursor: Optional[str]) -> dict:
+    """
+    在 query 上加上「排在 cursor 之後」的條件 (排序為 sort_field desc, _id desc)。
+    desc 排序時 null / 缺欄位排在最後，所以非 null 的 cursor 之後還要接上 null 的那些。
+    """
+    if not cursor:
+        return query
+    value, oid = decode_cursor(cursor)
+    if value is None:
+        after = [{sort_field: None, "_id": {"$lt": oid}}]
+    else:
+        after = [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": oid}},
+            {sort_field: None},
+        ]
+    return {"$and": [query, {"$or": after}]} if query else {"$or": after}
+
+
+def keyset_sort(sort_field: str) -> List[Tuple[str, int]]:
+    return [(sort_field, -1), ("_id", -1)]
+
+
+def fetch_page(collection, query: dict, sort_field: str, limit: int,
+               cursor: Optional[str] = None, projection: Optional[dict] = None):
+    """
+    取一頁：回傳 (該頁的原始 documents, next_cursor or None)。
+    多取一筆判斷是否還有下一頁；projection 需包含 sort_field (由這裡補上)。
+    """
+    if projection is not None and not any(v == 0 for v in projection.values()):
+        projection = dict(projection, **{sort_field: 1})
+    rows = list(
+        collection.find(keyset_query(query, sort_field, cursor), projection)
+        .sort(keyset_sort(sort_field))
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(rows[limit - 1], sort_field) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
@@ -0,0 +1,276 @@
+# backend/document_management/render_cache.py
+
+"""
+日報產出檔 (XLSX / PDF sheet1 / PDF sheet2) 的 content-addressed render cache。
+
+cache key = sha256( daily_report_data + 報表用到的 project 欄位 + 模板檔內容 )，
+因此只要日報、專案資料與模板都沒變，就直接回傳上次產生的檔案，完全不需重新填表/轉檔。
+
+環境變數設定：
+  - RENDER_CACHE_DIR     本機 cache 目錄 (預設 <tmp>/daily_report_cache)
+  - RENDER_CACHE_MAX_MB  本機 cache 上限 (MB，預設 512；0 = 停用 cache)，超過時依最後存取時間 (LRU) 淘汰
+  - RENDER_CACHE_SCAN_INTERVAL  完整掃描 cache 目錄的最短間隔 (秒，預設 60)
+  - RENDER_CACHE_S3      設為 1 時同時寫入 S3 (AWS_S3_BUCKET 下的 render-cache/ 前綴)，本機 miss 時會先查 S3
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# artifact 名稱 => cache 內檔名
+ARTIFACT_FILES = {
+    "xlsx": "daily_report.xlsx",
+    "sheet1": "sheet1.pdf",
+    "sheet2": "sheet2.pdf",
+}
+
+# 報表實際有用到的 project 欄位 (改了其他欄位不應讓 cache 失效)
+PROJECT_FIELDS = ("name", "job_number", "contractor", "start_date", "duration_days", "duration_type")
+
+S3_PREFIX = "render-cache"
+
+_template_digest_cache: Dict[str, Any] = {}
+
+
+def template_digest(template_path: str) -> str:
+    """
+    模板檔內容的 sha256；以 (mtime, size) 判斷是否需要重算。
+    """
+    st = os.stat(template_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _template_digest_cache.get(template_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    h = hashlib.sha256()
+    with open(template_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    _template_digest_cache[template_path] = (stamp, digest)
+    return digest
+
+
+def compute_render_key(site_diary_doc: Dict[str, Any], project_doc: Dict[str, Any], template_path: str) -> str:
+    payload = {
+        "daily_report_data": site_diary_doc.get("daily_report_data") or {},
+        "project": {k: project_doc.get(k) for k in PROJECT_FIELDS},
+        "template": template_digest(template_path),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    本機磁碟 cache (可選擇同步到 S3)。
+    目錄結構：<cache_dir>/<key[:2]>/<key>/{daily_report.xlsx, sheet1.pdf, sheet2.pdf}
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int,
+                 s3_client_factory: Optional[Callable] = None, s3_bucket: str = "",
+                 scan_interval: float = 60.0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.s3_client_factory = s3_client_factory
+        self.s3_bucket = s3_bucket
+        self._lock = threading.Lock()
+        # 用量以「上次完整掃描的結果 + 之後本行程 put 的大小」估計，只有估計值超過上限、
+        # 或距上次掃描超過 scan_interval (其他 process 也會寫入) 時才完整掃描目錄
+        self.scan_interval = scan_interval
+        self._approx_bytes: Optional[int] = None
+        self._last_scan = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ---------------- 路徑 ----------------
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _artifact_path(self, key: str, artifact: str) -> str:
+        return os.path.join(self._entry_dir(key), ARTIFACT_FILES[artifact])
+
+    def _s3_key(self, key: str, artifact: str) -> str:
+        return f"{S3_PREFIX}/{key}/{ARTIFACT_FILES[artifact]}"
+
+    @property
+    def s3_enabled(self) -> bool:
+        return bool(self.s3_client_factory and self.s3_bucket)
+
+    # ---------------- 讀寫 ----------------
+
+    def get(self, key: str, artifact: str) -> Optional[str]:
+        """
+        回傳 cache 內的檔案路徑；其他 process 隨時可能淘汰該 entry，
+        需要保留到稍後才讀的呼叫端應先 link / 複製到自己的 scratch 目錄。
+        """
+        path = self._artifact_path(key, artifact)
+        if os.path.isfile(path):
+            try:
+                os.utime(path, None)  # 更新存取時間 => LRU
+            except OSError:
+                pass
+            return path
+
+        if self.s3_enabled:
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.s3_client_factory().download_file(self.s3_bucket, self._s3_key(key, artifact), tmp_path)
+                os.replace(tmp_path, path)
+                return path
+            except ClientError:
+                pass
+            except Exception as e:
+                logger.warning("[RenderCache] S3 lookup failed key=%s: %s", key, e)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return None
+
+    def put(self, key: str, artifact: str, src_path: str) -> str:
+        path = self._artifact_path(key, artifact)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        added = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)  # atomic，避免其他 worker 讀到寫一半的檔
+
+        if self.s3_enabled:
+            try:
+                self.s3_client_factory().upload_file(path, self.s3_bucket, self._s3_key(key, artifact))
+            except Exception as e:
+                logger.warning("[RenderCache] S3 upload failed key=%s: %s", key, e)
+
+        self._maybe_evict(added)
+        return path
+
+    def invalidate(self, key: str):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        if self.s3_enabled:
+            try:
+                self.s3_client_factory().delete_objects(
+                    Bucket=self.s3_bucket,
+                    Delete={"Objects": [{"Key": self._s3_key(key, a)} for a in ARTIFACT_FILES]}
+                )
+            except Exception as e:
+                logger.warning("[RenderCache] S3 invalidate failed key=%s: %s", key, e)
+
+    # ---------------- 淘汰 ----------------
+
+    def usage(self) -> Dict[str, int]:
+        total = 0
+        entries = 0
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entries += 1
+                total += self._dir_size(os.path.join(prefix_dir, key))[0]
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes}
+
+    @staticmethod
+    def _dir_size(entry_dir: str):
+        size = 0
+        last_access = 0.0
+        try:
+            for name in os.listdir(entry_dir):
+                st = os.stat(os.path.join(entry_dir, name))
+                size += st.st_size
+                last_access = max(last_access, st.st_mtime)
+        except OSError:
+            pass
+        return size, last_access
+
+    def _maybe_evict(self, added: int):
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += added
+            due = (
+                self._approx_bytes is None
+                or self._approx_bytes > self.max_bytes
+                or time.time() - self._last_scan >= self.scan_interval
+            )
+        if due:
+            self._evict()
+
+    def _evict(self):
+        """
+        完整掃描並淘汰到上限的 90% 以下 (留一點空間，避免之後每次 put 都要再掃描)。
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for prefix in os.listdir(self.cache_dir):
+                prefix_dir = os.path.join(self.cache_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for key in os.listdir(prefix_dir):
+                    entry_dir = os.path.join(prefix_dir, key)
+                    size, last_access = self._dir_size(entry_dir)
+                    entries.append((last_access, size, entry_dir))
+                    total += size
+
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                entries.sort()  # 最久沒用的在前
+                for _, size, entry_dir in entries:
+                    if total <= target:
+                        break
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    total -= size
+                    logger.debug("[RenderCache] evicted %s (%d bytes)", entry_dir, size)
+
+            self._approx_bytes = total
+            self._last_scan = time.time()
+
+
+_render_cache: Optional[RenderCache] = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache(s3_client_factory: Optional[Callable] = None) -> Optional[RenderCache]:
+    """
+    取得 process 共用的 RenderCache；RENDER_CACHE_MAX_MB=0 時回傳 None (停用)。
+    """
+    global _render_cache
+    if _render_cache is not None:
+        return _render_cache
+
+    try:
+        max_mb = int(os.environ.get("RENDER_CACHE_MAX_MB", 512))
+    except ValueError:
+        max_mb = 512
+    if max_mb <= 0:
+        return None
+
+    with _render_cache_lock:
+        if _render_cache is None:
+            cache_dir = os.environ.get("RENDER_CACHE_DIR") or os.path.join(
+                tempfile.gettempdir(), "daily_report_cache"
+            )
+            use_s3 = os.environ.get("RENDER_CACHE_S3", "").lower() in ("1", "true", "yes")
+            try:
+                scan_interval = float(os.environ.get("RENDER_CACHE_SCAN_INTERVAL", 60))
+            except ValueError:
+                scan_interval = 60.0
+            _render_cache = RenderCache(
+                cache_dir=cache_dir,
+                max_bytes=max_mb * 1024 * 1024,
+                s3_client_factory=s3_client_factory if use_s3 else None,
+                s3_bucket=os.environ.get("AWS_S3_BUCKET", "") if use_s3 else "",
+                scan_interval=scan_interval,
+            )
+    return _render_cache
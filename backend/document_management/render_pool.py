@@ -0,0 +1,311 @@
+# backend/document_management/render_pool.py
+
+"""
+多筆日報下載 (ZIP job) 的平行 render。
+
+填表 (openpyxl) 與 LibreOffice 轉檔都是 CPU / process bound，單一 greenlet 逐筆處理時
+其餘核心都閒著。這裡用一個 per-process 的 ProcessPoolExecutor 把日報分成小 chunk 平行 render：
+  - 每個子行程自己帶一個常駐 LibreOffice instance (LIBREOFFICE_POOL_SIZE=1)，
+    或在無 uno 時以獨立 user profile 跑 soffice CLI，彼此不互相卡住
+  - 結果仍依輸入順序 yield (寫入 ZIP 的順序不變)；子行程每產完一筆日報就經由 queue 回報，進度以「筆」為單位
+    (PDF 仍是一個 chunk 一次批次轉檔，所以同一 chunk 的日報會在轉檔完成時一起回報)
+  - 平行度有三層上限，避免一個大匯出把 CPU 吃光而拖慢互動式的單筆下載 (單筆下載仍在 web worker 內 render)：
+      RENDER_MACHINE_MAX_PARALLEL 整台機器 (所有 web worker 與 job worker process) 同時 render 的 chunk 上限
+                                  (預設 CPU 數的一半)；以 <SCRATCH_DIR>/.render_slots/slot-<i>.lock 的
+                                  non-blocking flock 佔用，process 結束 (含被砍掉) 時 slot 自動釋放
+      RENDER_POOL_WORKERS         每個 process 的子行程數 (預設 CPU 數的一半；0 = 停用，退回在 job 內逐筆 render)
+      RENDER_JOB_MAX_PARALLEL     單一 job 最多同時佔用的子行程數 (預設 2)
+    每個 process 仍各自有 executor (閒置的子行程只佔記憶體)，實際同時在 render 的數量由機器層級的 slot 決定。
+"""
+
+import atexit
+import concurrent.futures
+import fcntl
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.document_management.scratch import (
+    current_scratch_owner,
+    get_scratch_space,
+    new_owner,
+    scratch_mkdtemp,
+    scratch_owner,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_render_pool_size() -> int:
+    return max(0, _env_int("RENDER_POOL_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+
+def get_job_max_parallel() -> int:
+    return max(1, _env_int("RENDER_JOB_MAX_PARALLEL", 2))
+
+
+def get_machine_max_parallel() -> int:
+    return max(1, _env_int("RENDER_MACHINE_MAX_PARALLEL", max(1, (os.cpu_count() or 2) // 2)))
+
+
+# 等待機器層級 slot 時的輪詢間隔 (秒)
+_SLOT_POLL_INTERVAL = 0.1
+
+
+# ---------------- 機器層級的 slot ----------------
+
+def _render_slot_dir() -> str:
+    # scratch 清掃會略過 "." 開頭的項目
+    path = os.path.join(get_scratch_space().root, ".render_slots")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _try_acquire_machine_slot() -> Optional[int]:
+    """
+    嘗試佔用一個機器層級的 render slot；成功回傳持有 flock 的 fd (close 即釋放)，全部被佔用則回傳 None。
+    從隨機位置開始找，避免所有 process 都搶 slot-0。
+    """
+    directory = _render_slot_dir()
+    count = get_machine_max_parallel()
+    start = random.randrange(count)
+    for k in range(count):
+        fd = os.open(os.path.join(directory, f"slot-{(start + k) % count}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+    return None
+
+
+# ---------------- 子行程 ----------------
+
+def _init_render_worker():
+    # 每個子行程只開一個常駐 LibreOffice instance；CLI 模式則各用獨立 profile
+    os.environ["LIBREOFFICE_POOL_SIZE"] = "1"
+    # profile 放在子行程自己的 scratch owner 底下：存活期間持有鎖 (清掃不會刪)，正常結束時 atexit 刪除，
+    # 子行程被砍掉則由清掃依 SCRATCH_MAX_AGE_SECONDS 回收
+    owner = new_owner("lo-profile")
+    space = get_scratch_space()
+    space.acquire(owner)
+    atexit.register(space.release, owner)
+    os.environ["LIBREOFFICE_PROFILE_DIR"] = scratch_mkdtemp(prefix="lo_cli_profile_", owner=owner)
+
+
+def _render_chunk(docs: List[Dict[str, Any]], file_type: str, project_doc: dict,
+                  template_path: str, owner: Optional[str] = None,
+                  progress: Optional[Any] = None, chunk_index: int = 0) -> List[Dict[str, str]]:
+    """
+    於子行程中執行 (不需 Flask app context)；回傳與 docs 同順序的 [{artifact: path}]。
+    owner：產出檔歸屬的 scratch owner (由父行程負責刪除)。
+    progress：父行程的 Manager queue；每產完一筆 put(chunk_index)。
+    """
+    from backend.document_management.services import render_daily_report_files
+
+    results = []
+    with scratch_owner(owner or new_owner("anon"), delete=False):
+        for _, files in render_daily_report_files(
+                docs, file_type, chunk_size=len(docs), project_doc=project_doc, template_path=template_path):
+            results.append(files)
+            if progress is not None:
+                progress.put(chunk_index)
+    return results
+
+
+# ---------------- executor ----------------
+
+_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_global_slots: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+_progress_manager = None
+_progress_manager_pid: Optional[int] = None
+
+
+def _get_executor():
+    """
+    per-process 的 (executor, 全域 slot semaphore)；RENDER_POOL_WORKERS=0 時回傳 (None, None)。
+    以 spawn 啟動子行程：不繼承 gevent hub / Mongo 連線 / LibreOffice pool 等 fork 後不安全的狀態。
+    """
+    global _executor, _executor_pid, _global_slots
+    size = get_render_pool_size()
+    if size <= 0:
+        return None, None
+
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor, _global_slots
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_worker,
+            )
+            _executor_pid = pid
+            _global_slots = threading.BoundedSemaphore(size)
+            logger.info("[render_pool] started %d render processes (pid=%d)", size, pid)
+    return _executor, _global_slots
+
+
+def _new_progress_queue():
+    """
+    子行程回報逐筆進度用的 queue (per-process 的 Manager 於第一次需要時才啟動；spawn 的子行程只能拿 proxy)。
+    """
+    global _progress_manager, _progress_manager_pid
+    pid = os.getpid()
+    with _executor_lock:
+        if _progress_manager is None or _progress_manager_pid != pid:
+            _progress_manager = multiprocessing.get_context("spawn").Manager()
+            _progress_manager_pid = pid
+    return _progress_manager.Queue()
+
+
+def render_daily_report_files_parallel(site_diary_docs: List[Dict[str, Any]], file_type: str,
+                                       project_doc: dict, template_path: str,
+                                       max_parallel: Optional[int] = None,
+                                       on_progress: Optional[Callable[[int], None]] = None,
+                                       should_stop: Optional[Callable[[], bool]] = None):
+    """
+    與 services.render_daily_report_files 相同介面的 generator：依輸入順序 yield (doc, {artifact: path})。
+    - on_progress(已完成筆數)：子行程每產完一筆 (或多筆) 日報就呼叫 (完成順序可能與輸入順序不同)
+    - should_stop()：回傳 True 時取消尚未開始的 chunk 並結束
+    RENDER_POOL_WORKERS=0 時直接在本行程逐筆 render。
+    """
+    from backend.document_management.services import render_daily_report_files
+
+    executor, global_slots = _get_executor()
+    if executor is None:
+        for done, item in enumerate(render_daily_report_files(
+                site_diary_docs, file_type, project_doc=project_doc, template_path=template_path), start=1):
+            if should_stop and should_stop():
+                return
+            yield item
+            if on_progress:
+                on_progress(done)
+        return
+
+    per_job = max(1, min(max_parallel or get_job_max_parallel(), get_render_pool_size()))
+    owner = current_scratch_owner()
+    if owner is not None:
+        # 子行程會在這個 owner 底下產檔：先在本行程建立並持有 (lazy 的 request owner 才會在 release 時刪除)
+        get_scratch_space().ensure(owner)
+
+    # chunk 夠小才平行得起來，又不能太小 (每個 chunk 的 PDF 是一次批次轉檔)
+    batch_size = max(1, _env_int("LIBREOFFICE_BATCH_SIZE", 20))
+    chunk_size = max(1, min(batch_size, math.ceil(len(site_diary_docs) / (per_job * 2))))
+    chunks = [site_diary_docs[i:i + chunk_size] for i in range(0, len(site_diary_docs), chunk_size)]
+
+    in_flight: Dict[concurrent.futures.Future, Tuple[int, int]] = {}   # future => (chunk index, slot fd)
+    results: Dict[int, List[Dict[str, str]]] = {}
+    next_submit = 0
+    next_yield = 0
+
+    # 每個 chunk 已完成的筆數；子行程的逐筆回報可能晚於 future 完成才收到，所以以 chunk 為單位記、取較大者
+    progress_queue = _new_progress_queue() if on_progress else None
+    chunk_done = [0] * len(chunks)
+    reported = 0
+
+    def report_progress():
+        nonlocal reported
+        if progress_queue is not None:
+            while True:
+                try:
+                    idx = progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+                chunk_done[idx] = min(chunk_done[idx] + 1, len(chunks[idx]))
+        finished = sum(chunk_done)
+        if on_progress and finished > reported:
+            reported = finished
+            on_progress(finished)
+
+    def acquire_slot(blocking: bool) -> Optional[int]:
+        # 先佔本 process 的 slot，再佔機器層級的 slot (等待時輪詢，並可被 should_stop 中斷)
+        if not global_slots.acquire(blocking=blocking):
+            return None
+        fd = _try_acquire_machine_slot()
+        while fd is None and blocking and not (should_stop and should_stop()):
+            time.sleep(_SLOT_POLL_INTERVAL)
+            fd = _try_acquire_machine_slot()
+        if fd is None:
+            global_slots.release()
+        return fd
+
+    def release_slot(fd: int):
+        os.close(fd)
+        global_slots.release()
+
+    try:
+        while next_yield < len(chunks):
+            if should_stop and should_stop():
+                return
+
+            # 補滿本 job 的平行額度；手上已有 chunk 在跑時不等待 slot，改先處理已完成的結果
+            while next_submit < len(chunks) and len(in_flight) < per_job:
+                fd = acquire_slot(blocking=not in_flight)
+                if fd is None:
+                    break
+                try:
+                    future = executor.submit(
+                        _render_chunk, chunks[next_submit], file_type, project_doc, template_path, owner,
+                        progress_queue, next_submit
+                    )
+                except Exception:
+                    release_slot(fd)
+                    raise
+                in_flight[future] = (next_submit, fd)
+                next_submit += 1
+
+            if next_yield not in results:
+                # 要回報進度時縮短等待，子行程的逐筆回報才不會被延遲到 chunk 結束
+                done, _ = concurrent.futures.wait(
+                    list(in_flight), timeout=0.2 if progress_queue is not None else 1.0,
+                    return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    idx, fd = in_flight.pop(future)
+                    release_slot(fd)
+                    results[idx] = future.result()
+                    chunk_done[idx] = len(chunks[idx])
+                report_progress()
+
+            while next_yield in results:
+                for doc, files in zip(chunks[next_yield], results.pop(next_yield)):
+                    if should_stop and should_stop():
+                        return
+                    yield doc, files
+                next_yield += 1
+    finally:
+        # 已開始執行的 chunk 無法取消，等它結束時才歸還 slot
+        for future, (_, fd) in in_flight.items():
+            if future.cancel():
+                release_slot(fd)
+            else:
+                future.add_done_callback(lambda _, fd=fd: release_slot(fd))
+
+
+def get_render_pool_stats() -> dict:
+    size = get_render_pool_size()
+    return {
+        "enabled": size > 0,
+        "workers": size,
+        "job_max_parallel": get_job_max_parallel(),
+        "machine_max_parallel": get_machine_max_parallel(),
+        "started": _executor is not None and _executor_pid == os.getpid(),
+    }
@@ -2,19 +2,16 @@
 
 import logging
 import os
-import uuid
 import zipfile
-import tempfile
-import threading
-import time
 from datetime import datetime
+from urllib.parse import unquote
 
-import gevent
-
-from flask import Blueprint, request, jsonify, abort, Response, stream_with_context, send_file, current_app
+from flask import Blueprint, request, jsonify, abort, Response, stream_with_context, send_file, current_app, g, redirect
 from bson.objectid import ObjectId
 
 from backend.db import mongo, get_next_sequence
+from backend.document_management.document_counts import get_document_count
+from backend.document_management.pagination import clamp_limit, fetch_page, keyset_sort
 from backend.document_management.services import (
     create_document,
     get_document,
@@ -22,21 +19,76 @@ from backend.document_management.services import (
     delete_document,
     list_documents,
     add_document_version,
+    add_document_version_from_stream,
+    create_version_upload,
+    finalize_version_upload,
+    get_version_download_url,
     get_document_versions,
-    generate_diary_xlsx_only,
-    generate_diary_pdf_sheet
+    get_daily_report_files,
+    invalidate_daily_report_cache,
+    get_s3_client,
+    _get_daily_report_template_path,
+    _get_project_doc,
+    DAILY_REPORT_ARTIFACTS
+)
+from backend.document_management.libreoffice_pool import get_libreoffice_pool_stats
+from backend.document_management.render_pool import get_render_pool_stats, render_daily_report_files_parallel
+from backend.document_management.export_jobs import (
+    DAILY_REPORT_ZIP_JOB,
+    daily_report_arcname,
+    iter_daily_report_zip_entries,
+    load_daily_report_docs,
+    start_job_inline
+)
+from backend.document_management.zip_stream import iter_zip_stream
+from backend.document_management.scratch import (
+    bind_request_scratch,
+    get_scratch_space,
+    release_request_scratch,
+    scratch_mkdtemp
+)
+from backend.jobs import (
+    create_job,
+    get_job,
+    get_job_execution_mode,
+    is_job_expired,
+    iter_job_events,
+    latest_job_event_id
 )
 
 document_bp = Blueprint("document_bp", __name__)
 logger = logging.getLogger(__name__)
 
-# -------------------- SSE Job store (用於多筆下載) --------------------
-# ★ 新增 expires_at: time.time() + 1800 (半小時後過期)
-progress_store = {}  # job_id -> {
-#   "status":"in_progress"|"done"|"error",
-#   "progress":..., "file_path":..., "error_msg":"",
-#   "expires_at": float(timestamp)
-# }
+
+# -------------------- Scratch space (見 scratch.py) --------------------
+# 每個 request render 出來的暫存檔都歸屬同一個 owner，response 送完 (含 streaming) 後一併刪除
+# (owner 是 lazy 的：沒有產檔的 request 不會建立目錄)
+
+@document_bp.before_request
+def _bind_request_scratch():
+    g.scratch_owner, g.scratch_token = bind_request_scratch()
+
+
+@document_bp.after_request
+def _release_request_scratch(response):
+    owner = g.pop("scratch_owner", None)
+    token = g.pop("scratch_token", None)
+    if owner is not None:
+        response.call_on_close(lambda: release_request_scratch(owner, token))
+    return response
+
+
+@document_bp.teardown_request
+def _teardown_request_scratch(exc):
+    # 發生例外時 after_request 不會執行，在此補刪
+    owner = g.pop("scratch_owner", None)
+    if owner is not None:
+        release_request_scratch(owner, g.pop("scratch_token", None))
+
+
+def _is_truthy(value) -> bool:
+    return (value or "").strip().lower() in ("1", "true", "yes")
+
 
 # =====================================================================
 # 通用文件 CRUD
@@ -49,13 +101,31 @@ def api_list_documents():
     可用 query param 例如:
       - ?project_id=123
       - ?doc_type=DAILY_REPORT / MAT / RFI / ...
+      - ?view=summary (預設) | full
+          summary：id / title / doc_type / project_id / daily_report_id /
+                   created_at / updated_at / version_count / latest_version
+          full   ：整筆文件 (含 description、daily_report_data 等，不含版本歷史)
+      - ?fields=title,updated_at,daily_report_data.report_date  只取指定欄位 (優先於 view)
+      - ?limit=50&cursor=...&total=1  分頁 (created_at 新到舊)，回傳 { "items", "next_cursor", "total" }
+          下一頁以 next_cursor 當 cursor (null 表示沒有下一頁)；total=1 才回傳總數 (快取計數)
+          不帶 limit / cursor 時回傳全部 (陣列，舊行為)
     """
     project_id = request.args.get("project_id", "").strip()
     doc_type = request.args.get("doc_type", "").strip()
+    view = request.args.get("view", "summary").strip() or "summary"
+    fields_arg = request.args.get("fields", "").strip()
+    fields = fields_arg.split(",") if fields_arg else None
 
     try:
-        docs = list_documents(project_id=project_id, doc_type=doc_type)
+        docs = list_documents(
+            project_id=project_id, doc_type=doc_type, view=view, fields=fields,
+            limit=request.args.get("limit", type=int),
+            cursor=request.args.get("cursor") or None,
+            with_total=_is_truthy(request.args.get("total"))
+        )
         return jsonify(docs), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as ex:
         logger.exception("[DEBUG] api_list_documents error:")
         return jsonify({"error": str(ex)}), 500
@@ -166,14 +236,118 @@ def api_add_document_version(doc_id):
         return jsonify({"error": str(ex)}), 500
 
 
+@document_bp.route("/<doc_id>/versions/upload", methods=["POST"])
+def api_upload_document_version(doc_id):
+    """
+    新增一個版本 (串流上傳，不需 base64)：
+      - multipart/form-data：欄位 file (檔案)、version_note、filename (選填，預設為上傳檔名)
+      - 其他 Content-Type：body 即檔案內容；?filename=...&version_note=...
+        (或 header X-Filename，需 URL encode)
+    檔案邊收邊以 S3 multipart upload 上傳，記憶體用量與檔案大小無關。
+    原本 POST /<doc_id>/versions (base64_file) 仍保留。
+    """
+    boundary = None
+    if request.mimetype == "multipart/form-data":
+        boundary = request.mimetype_params.get("boundary", "").encode("latin-1")
+        if not boundary:
+            return jsonify({"error": "Missing multipart boundary"}), 400
+
+    filename = request.args.get("filename") or unquote(request.headers.get("X-Filename", ""))
+    version_note = request.args.get("version_note", "")
+    try:
+        ver_id = add_document_version_from_stream(
+            doc_id,
+            request.stream,
+            boundary=boundary,
+            filename=filename,
+            version_note=version_note,
+            content_type=None if boundary else request.mimetype or None
+        )
+        return jsonify({"message": "Version added", "version_id": ver_id}), 201
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as ex:
+        logger.exception("[DEBUG] api_upload_document_version error:")
+        return jsonify({"error": str(ex)}), 500
+
+
+@document_bp.route("/<doc_id>/versions/presign", methods=["POST"])
+def api_presign_document_version(doc_id):
+    """
+    取得直傳 S3 的 presigned PUT URL (檔案不經過 Flask worker)。
+    body JSON: { "filename": "...", "content_type": "application/pdf", "sha256": "<hex，選填>" }
+    回傳 { "upload_id", "s3_key", "url", "method": "PUT", "headers", "expires_in", "exists" }
+    上傳完成後呼叫 POST /<doc_id>/versions/finalize
+    有帶 sha256 且相同內容已存在時 exists=true、url=null：不必上傳，直接 finalize
+    """
+    data = request.json or {}
+    try:
+        upload = create_version_upload(doc_id, data.get("filename", ""), data.get("content_type"),
+                                       sha256=data.get("sha256"))
+        return jsonify(upload), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as ex:
+        logger.exception("[DEBUG] api_presign_document_version error:")
+        return jsonify({"error": str(ex)}), 500
+
+
+@document_bp.route("/<doc_id>/versions/finalize", methods=["POST"])
+def api_finalize_document_version(doc_id):
+    """
+    presigned PUT 完成後，確認檔案已在 S3 並寫入新版本。
+    body JSON: { "upload_id": "...", "version_note": "..." }
+    """
+    data = request.json or {}
+    try:
+        ver_id = finalize_version_upload(doc_id, data.get("upload_id", ""), data.get("version_note", ""))
+        return jsonify({"message": "Version added", "version_id": ver_id}), 201
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as ex:
+        logger.exception("[DEBUG] api_finalize_document_version error:")
+        return jsonify({"error": str(ex)}), 500
+
+
+@document_bp.route("/<doc_id>/versions/<version_id>/download", methods=["GET"])
+def api_download_document_version(doc_id, version_id):
+    """
+    取得版本檔案的 presigned GET URL：
+      - 預設回傳 JSON { "url", "filename", "expires_in" }
+      - ?redirect=1 則直接 302 轉到 S3
+    """
+    try:
+        info = get_version_download_url(doc_id, version_id)
+    except FileNotFoundError as fex:
+        return jsonify({"error": str(fex)}), 404
+    except Exception as ex:
+        logger.exception("[DEBUG] api_download_document_version error:")
+        return jsonify({"error": str(ex)}), 500
+
+    if request.args.get("redirect", "").lower() in ("1", "true", "yes"):
+        return redirect(info["url"], code=302)
+    return jsonify(info), 200
+
+
 @document_bp.route("/<doc_id>/versions", methods=["GET"])
 def api_get_document_versions(doc_id):
     """
-    取得某文件的所有版本列表
+    取得某文件的版本列表
+      - ?limit=50&cursor=...：分頁 (新到舊)，回傳 { "items", "next_cursor" }；limit 預設 DEFAULT_PAGE_SIZE，
+        下一頁以 next_cursor 當 cursor，next_cursor 為 null 表示沒有下一頁
+      - ?all=1：所有版本 (舊到新) 的陣列，即原本的回傳格式
     """
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor") or None
     try:
-        versions = get_document_versions(doc_id)
+        versions = get_document_versions(
+            doc_id, limit=limit, cursor=cursor, all_versions=_is_truthy(request.args.get("all"))
+        )
         return jsonify(versions), 200
+    except FileNotFoundError as fex:
+        return jsonify({"error": str(fex)}), 404
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as ex:
         logger.exception("[DEBUG] api_get_document_versions error:")
         return jsonify({"error": str(ex)}), 500
@@ -188,15 +362,33 @@ def _build_daily_report_query(project_id: int):
     return {"project_id": project_id, "doc_type": "DAILY_REPORT"}
 
 
+DAILY_REPORT_SORT_FIELD = "daily_report_data.report_date"
+
+# 日報列表只讀列表用得到的欄位 (不讀 daily_report_data 其餘內容與版本歷史)
+DAILY_REPORT_LIST_PROJECTION = {
+    "daily_report_id": 1,
+    "updated_at": 1,
+    **{f"daily_report_data.{k}": 1 for k in (
+        "report_date", "weather_morning", "weather_noon", "day_count",
+        "summary", "staff_ids", "workers", "machines",
+    )},
+}
+
+
 @document_bp.route("/daily-reports", methods=["GET"])
 def list_daily_reports():
     """
     取得指定 project_id 的所有日報文件，並以 report_date(降冪)排序
       GET /api/documents/daily-reports?project_id=xxx
+    分頁：?limit=50&cursor=...&total=1 => { "items", "next_cursor", "total" }
+      (keyset 分頁，第一頁與之後每一頁都是一次索引範圍查詢；不帶 limit / cursor 時回傳全部陣列)
     """
     project_id = request.args.get("project_id", "")
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor") or None
+    paginated = limit is not None or cursor is not None
     if not project_id.isdigit():
-        return jsonify([]), 200
+        return jsonify({"items": [], "next_cursor": None} if paginated else []), 200
     pid = int(project_id)
 
     # 直接按 daily_report_data.report_date 進行排序 (descending)
@@ -204,31 +396,44 @@ def list_daily_reports():
         "doc_type": "DAILY_REPORT",
         "project_id": pid
     }
-    docs_cursor = mongo.db["documents"].find(query).sort("daily_report_data.report_date", -1)
-
-    output = []
-    for d in docs_cursor:
-        dr = d.get("daily_report_data", {})
-        item = {
-            "doc_db_id": str(d["_id"]),              # documents表的 str(ObjectId)
-            "id": d.get("daily_report_id"),          # 整數
-            "report_date": dr.get("report_date") or "",
-            "weather_morning": dr.get("weather_morning", ""),
-            "weather_noon": dr.get("weather_noon", ""),
-            "day_count": dr.get("day_count", None),
-            "summary": dr.get("summary", ""),
-            "staff_ids": dr.get("staff_ids", []),
-            "workers": dr.get("workers", {}),
-            "machines": dr.get("machines", {}),
-        }
-        uat = d.get("updated_at")
-        if isinstance(uat, datetime):
-            # 將原本 T 時區資訊移除，改成更易讀的格式
-            item["updated_at"] = uat.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            item["updated_at"] = ""
-        output.append(item)
-    return jsonify(output), 200
+    if paginated:
+        try:
+            rows, next_cursor = fetch_page(
+                mongo.db["documents"], query, DAILY_REPORT_SORT_FIELD, clamp_limit(limit), cursor,
+                DAILY_REPORT_LIST_PROJECTION
+            )
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        page = {"items": [_daily_report_list_item(d) for d in rows], "next_cursor": next_cursor}
+        if _is_truthy(request.args.get("total")):
+            page["total"] = get_document_count(pid, "DAILY_REPORT")
+        return jsonify(page), 200
+
+    docs_cursor = mongo.db["documents"].find(query, DAILY_REPORT_LIST_PROJECTION).sort(keyset_sort(DAILY_REPORT_SORT_FIELD))
+    return jsonify([_daily_report_list_item(d) for d in docs_cursor]), 200
+
+
+def _daily_report_list_item(d: dict) -> dict:
+    dr = d.get("daily_report_data") or {}
+    item = {
+        "doc_db_id": str(d["_id"]),              # documents表的 str(ObjectId)
+        "id": d.get("daily_report_id"),          # 整數
+        "report_date": dr.get("report_date") or "",
+        "weather_morning": dr.get("weather_morning", ""),
+        "weather_noon": dr.get("weather_noon", ""),
+        "day_count": dr.get("day_count", None),
+        "summary": dr.get("summary", ""),
+        "staff_ids": dr.get("staff_ids", []),
+        "workers": dr.get("workers", {}),
+        "machines": dr.get("machines", {}),
+    }
+    uat = d.get("updated_at")
+    if isinstance(uat, datetime):
+        # 將原本 T 時區資訊移除，改成更易讀的格式
+        item["updated_at"] = uat.strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        item["updated_at"] = ""
+    return item
 
 
 @document_bp.route("/daily-reports", methods=["POST"])
@@ -289,6 +494,9 @@ def update_daily_report(report_id):
     if not doc:
         abort(404, description="Daily report not found")
 
+    # 舊內容的 render cache 失效 (只影響這一筆)
+    invalidate_daily_report_cache(doc)
+
     dr_data = doc.get("daily_report_data", {})
     dr_data["report_date"] = data.get("report_date", "")
     dr_data["weather_morning"] = data.get("weather_morning", "")
@@ -324,6 +532,8 @@ def delete_daily_report(report_id):
     if not doc:
         abort(404, "Daily report not found")
 
+    invalidate_daily_report_cache(doc)
+
     doc_id = str(doc["_id"])
     ok = delete_document(doc_id)
     if not ok:
@@ -333,19 +543,22 @@ def delete_daily_report(report_id):
 
 
 # ===================================================================
-# [單筆下載] - XLSX / PDF(sheet1) / PDF(sheet2)
+# [單筆下載] - XLSX / PDF(sheet1) / PDF(sheet2) / 全部(ZIP)
 # ===================================================================
 
 @document_bp.route("/daily-report/<int:report_id>/download", methods=["GET"])
 def download_single_daily_report(report_id):
     """
-    單筆下載日報；query param: file_type=xlsx|sheet1|sheet2
+    單筆下載日報；query param: file_type=xlsx|sheet1|sheet2|all
+      - all => 一次填表產出 xlsx + 兩份 PDF，打包成 ZIP 下載
     GET /api/documents/daily-report/<report_id>/download?project_id=xxx&file_type=xxx
     """
     project_id = request.args.get("project_id", "")
     file_type = request.args.get("file_type", "xlsx").strip()
     if not project_id.isdigit():
         abort(400, description="Invalid project_id")
+    if file_type not in DAILY_REPORT_ARTIFACTS:
+        abort(400, description="Unsupported file_type")
 
     doc = mongo.db["documents"].find_one({
         "doc_type": "DAILY_REPORT",
@@ -359,19 +572,112 @@ def download_single_daily_report(report_id):
     raw_date = dr_data.get("report_date", "")
     date_str_for_filename = raw_date.replace("-", "") if raw_date else "noDate"
 
-    if file_type == "xlsx":
-        out_path = generate_diary_xlsx_only(doc)
-        download_name = f"{date_str_for_filename}_daily_report.xlsx"
-    elif file_type == "sheet1":
-        out_path = generate_diary_pdf_sheet(doc, sheet_name="sheet1")
-        download_name = f"{date_str_for_filename}_daily_report.pdf"
-    elif file_type == "sheet2":
-        out_path = generate_diary_pdf_sheet(doc, sheet_name="sheet2")
-        download_name = f"{date_str_for_filename}_worker_log.pdf"
+    # 內容未變時直接由 render cache 回傳
+    files = get_daily_report_files(doc, file_type)
+
+    if file_type != "all":
+        return send_file(
+            files[file_type],
+            as_attachment=True,
+            download_name=daily_report_arcname(date_str_for_filename, file_type)
+        )
+
+    temp_dir = scratch_mkdtemp(prefix="daily_all_")
+    zip_path = os.path.join(temp_dir, f"{date_str_for_filename}_daily_report_all.zip")
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for artifact in DAILY_REPORT_ARTIFACTS["all"]:
+            zf.write(files[artifact], arcname=daily_report_arcname(date_str_for_filename, artifact))
+    return send_file(zip_path, as_attachment=True, download_name=os.path.basename(zip_path))
+
+
+# ===================================================================
+# 轉檔狀態 (LibreOffice pool 大小 / 排隊數 / 轉檔耗時)
+# ===================================================================
+
+@document_bp.route("/daily-report/render-status", methods=["GET"])
+def daily_report_render_status():
+    """
+    回傳本 worker process 的 LibreOffice 常駐 pool 狀態：
+      size / idle / waiting / max_queue / conversions / failures / restarts / avg_ms / last_ms / max_ms
+    以及多筆下載的平行 render 設定 (render_pool)、暫存空間用量 (scratch)。
+    """
+    return jsonify({
+        "libreoffice_pool": get_libreoffice_pool_stats(),
+        "render_pool": get_render_pool_stats(),
+        "scratch": get_scratch_space().usage(),
+    }), 200
+
+
+# ===================================================================
+# [多筆下載 - Streaming ZIP] - 邊 render 邊送出，不落地整個 ZIP
+# ===================================================================
+
+@document_bp.route("/daily-report/multi_download_stream", methods=["GET", "POST"])
+def daily_report_multi_download_stream():
+    """
+    多筆下載 (串流 ZIP)：每 render 完一份日報就把它的 entry 寫進 response，
+    瀏覽器立即開始收資料，server 也不需要在磁碟上保留整個 ZIP。
+      GET  ?project_id=123&diary_ids=1,2,3&file_type=xlsx|sheet1|sheet2|all
+      POST body JSON: { "project_id":123, "diary_ids":[...], "file_type":"..." }
+    壓縮方式由 STREAM_ZIP_COMPRESSION 控制 (deflated (預設) | stored)。
+    注意：串流開始後就無法再回傳錯誤狀態碼；中途失敗時連線會被中斷 (瀏覽器顯示下載失敗)。
+    """
+    if request.method == "POST":
+        data = request.json or {}
+        project_id = data.get("project_id")
+        diary_ids = data.get("diary_ids", [])
+        file_type = data.get("file_type", "xlsx")
     else:
-        abort(400, description="Unsupported file_type")
+        project_id = request.args.get("project_id", type=int)
+        raw_ids = request.args.get("diary_ids", "")
+        try:
+            diary_ids = [int(x) for x in raw_ids.split(",") if x.strip()]
+        except ValueError:
+            return jsonify({"error": "Invalid diary_ids"}), 400
+        file_type = request.args.get("file_type", "xlsx")
 
-    return send_file(out_path, as_attachment=True, download_name=download_name)
+    if not project_id or not isinstance(diary_ids, list) or not diary_ids:
+        return jsonify({"error": "Missing project_id or diary_ids"}), 400
+    if file_type not in DAILY_REPORT_ARTIFACTS:
+        return jsonify({"error": f"Unsupported file_type={file_type}"}), 400
+
+    docs = load_daily_report_docs(project_id, diary_ids)
+    if not docs:
+        return jsonify({"error": "No daily reports found"}), 404
+    try:
+        project_doc = _get_project_doc(docs[0])
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+
+    compression = (
+        zipfile.ZIP_STORED
+        if os.environ.get("STREAM_ZIP_COMPRESSION", "deflated").strip().lower() == "stored"
+        else zipfile.ZIP_DEFLATED
+    )
+    template_path = _get_daily_report_template_path()
+
+    @stream_with_context
+    def generate_zip():
+        rendered = render_daily_report_files_parallel(
+            docs, file_type, project_doc=project_doc, template_path=template_path
+        )
+        try:
+            yield from iter_zip_stream(iter_daily_report_zip_entries(rendered), compression)
+        except Exception:
+            logger.exception("[DEBUG] multi_download_stream error:")
+            raise
+
+    zip_filename = f"multiple_diaries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(
+        generate_zip(),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={zip_filename}",
+            # 避免反向代理 (nginx 等) 把整個 response 緩衝完才送出
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-store",
+        }
+    )
 
 
 # ===================================================================
@@ -382,7 +688,7 @@ def download_single_daily_report(report_id):
 def daily_report_multi_download_async():
     """
     非同步多筆下載 SSE:
-      body JSON: { "project_id":123, "diary_ids":[...], "file_type":"xlsx|sheet1|sheet2" }
+      body JSON: { "project_id":123, "diary_ids":[...], "file_type":"xlsx|sheet1|sheet2|all" }
     回傳 { "job_id":... }
     前端再用 SSE(/api/documents/daily-report/progress-sse/<job_id>) 監聽
     完成後拿 /api/documents/daily-report/multi_download_result?job_id=xxx
@@ -395,145 +701,97 @@ def daily_report_multi_download_async():
     if not project_id or not isinstance(diary_ids, list):
         return jsonify({"error": "Missing project_id or diary_ids"}), 400
 
-    job_id = str(uuid.uuid4())
-    # ★ 設定到期時間 (半小時後)
-    expires_at = time.time() + 1800
-
-    progress_store[job_id] = {
-        "status": "in_progress",
-        "progress": 0,
-        "file_path": None,
-        "error_msg": "",
-        "expires_at": expires_at
-    }
-
-    try:
-        flask_app = current_app._get_current_object()
-    except Exception as e:
-        logger.exception("[DEBUG] Failed to get current_app object:")
-        return jsonify({"error": f"Cannot get Flask app object: {e}"}), 500
-
-    t = threading.Thread(
-        target=_background_zip_generation,
-        args=(flask_app, job_id, project_id, diary_ids, file_type),
-        daemon=True
-    )
-    t.start()
-
-    return jsonify({"job_id": job_id}), 200
-
-
-def _background_zip_generation(app, job_id, project_id, diary_ids, file_type):
-    logger.debug(
-        "[_background_zip_generation] Start job_id=%s project_id=%s diary_ids=%s file_type=%s",
-        job_id, project_id, diary_ids, file_type
-    )
+    job = create_job(DAILY_REPORT_ZIP_JOB, {
+        "project_id": project_id,
+        "diary_ids": diary_ids,
+        "file_type": file_type,
+    })
+    job_id = job["job_id"]
 
-    with app.app_context():
-        from backend.document_management.services import (
-            generate_diary_xlsx_only,
-            generate_diary_pdf_sheet
-        )
+    # JOB_EXECUTION=worker 時交給獨立的 `python -m backend.worker` 認領
+    if get_job_execution_mode() == "inline":
         try:
-            total = len(diary_ids)
-            if total == 0:
-                raise ValueError("No diaries specified.")
-
-            temp_dir = tempfile.mkdtemp(prefix="multi_daily_")
-            zip_filename = f"multiple_diaries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for idx, d_id in enumerate(diary_ids, start=1):
-                    # 若該 job 已非 in_progress 狀態就結束
-                    if progress_store[job_id]["status"] != "in_progress":
-                        logger.debug("[DEBUG] Job %s no longer in progress, break the loop.", job_id)
-                        return
-
-                    progress_store[job_id]["progress"] = int(idx * 100 / total)
-
-                    doc = mongo.db["documents"].find_one({
-                        "doc_type": "DAILY_REPORT",
-                        "daily_report_id": d_id,
-                        "project_id": int(project_id)
-                    })
-                    if not doc:
-                        logger.debug(f"[DEBUG] Diary ID={d_id} not found, skipping.")
-                        continue
-
-                    dr_data = doc.get("daily_report_data", {})
-                    raw_date = dr_data.get("report_date", "")
-                    date_str = raw_date.replace("-", "") if raw_date else f"ID{d_id}"
-
-                    if file_type == 'xlsx':
-                        path_ = generate_diary_xlsx_only(doc)
-                        arcname_ = f"{date_str}_daily_report.xlsx"
-                    elif file_type == 'sheet1':
-                        path_ = generate_diary_pdf_sheet(doc, sheet_name='sheet1')
-                        arcname_ = f"{date_str}_daily_report.pdf"
-                    elif file_type == 'sheet2':
-                        path_ = generate_diary_pdf_sheet(doc, sheet_name='sheet2')
-                        arcname_ = f"{date_str}_worker_log.pdf"
-                    else:
-                        logger.error(f"[DEBUG] Unsupported file_type={file_type}, skipping this doc.")
-                        continue
-
-                    zf.write(path_, arcname=arcname_)
-
-            progress_store[job_id]["status"] = "done"
-            progress_store[job_id]["progress"] = 100
-            progress_store[job_id]["file_path"] = zip_path
-
-            logger.debug("[_background_zip_generation] Job done. file_path=%s", zip_path)
-
+            flask_app = current_app._get_current_object()
         except Exception as e:
-            logger.exception("[DEBUG] background_zip_generation error:")
-            progress_store[job_id]["status"] = "error"
-            progress_store[job_id]["error_msg"] = str(e)
+            logger.exception("[DEBUG] Failed to get current_app object:")
+            return jsonify({"error": f"Cannot get Flask app object: {e}"}), 500
+        start_job_inline(flask_app, job_id)
+
+    return jsonify({"job_id": job_id}), 200
 
 
 @document_bp.route("/daily-report/progress-sse/<job_id>", methods=["GET"])
 def daily_report_progress_sse(job_id):
     """
     SSE：前端監看多筆下載進度
+    (由 job 發佈的進度事件推送，見 backend/jobs.py；閒置時每 SSE_KEEPALIVE_SECONDS 秒送一次 keep-alive 註解)
     """
 
+    try:
+        keepalive_seconds = float(os.environ.get("SSE_KEEPALIVE_SECONDS", 15))
+    except ValueError:
+        keepalive_seconds = 15.0
+
+    def _job_state(job_info):
+        return {
+            "progress": job_info.get("progress", 0),
+            "status": job_info.get("status", "unknown"),
+            "error_msg": job_info.get("error_msg", "")
+        }
+
+    def _expired_event(job_info):
+        return _sse_pack({
+            "progress": job_info.get("progress", 0),
+            "status": "error",
+            "error_msg": "Job expired"
+        }, event="error")
+
     @stream_with_context
     def generate_stream():
-        while True:
-            job_info = progress_store.get(job_id)
-            if not job_info:
-                yield _sse_pack({"error": "Invalid job_id"}, event="error")
-                break
-
-            # ★ 若已過期，改成 error
-            if time.time() > job_info.get("expires_at", 0):
-                job_info["status"] = "error"
-                job_info["error_msg"] = "Job expired"
-                yield _sse_pack({
-                    "progress": job_info.get("progress", 0),
-                    "status": "error",
-                    "error_msg": "Job expired"
-                }, event="error")
-                break
-
-            data_dict = {
-                "progress": job_info.get("progress", 0),
-                "status": job_info.get("status", "unknown"),
-                "error_msg": job_info.get("error_msg", "")
-            }
+        # 先記下目前最新的事件，再讀 job 狀態 => 兩者之間發生的事件不會漏掉
+        after_id = latest_job_event_id()
+
+        # job 存在 MongoDB，任何一個 web worker 都讀得到
+        job_info = get_job(job_id)
+        if not job_info:
+            yield _sse_pack({"error": "Invalid job_id"}, event="error")
+            return
+
+        # ★ 若已過期，改成 error
+        if is_job_expired(job_info):
+            yield _expired_event(job_info)
+            return
+
+        last_sent = _job_state(job_info)
+        yield _sse_pack(last_sent)
+        if last_sent["status"] in ("done", "error"):
+            return
+
+        # 阻塞等待 render job 發佈的進度事件，有變化才送；閒置時只送 keep-alive 註解
+        for event in iter_job_events(job_id, after_id=after_id, wait_seconds=keepalive_seconds):
+            if event is None:
+                # 一段時間沒有事件：順便確認 job 仍存在、未過期 (也補上萬一遺失的事件)
+                job_info = get_job(job_id)
+                if not job_info or is_job_expired(job_info):
+                    yield _expired_event(job_info or {})
+                    return
+                event = _job_state(job_info)
+                if event == last_sent:
+                    yield ": keep-alive\n\n"
+                    continue
+
+            if event == last_sent:
+                continue
 
             logger.debug(
                 "[SSE Debug] job_id=%s, progress=%s, status=%s",
-                job_id, data_dict["progress"], data_dict["status"]
+                job_id, event["progress"], event["status"]
             )
+            last_sent = event
+            yield _sse_pack(event)
 
-            yield _sse_pack(data_dict)
-
-            if data_dict["status"] in ("done", "error"):
-                break
-
-            gevent.sleep(1)
+            if event["status"] in ("done", "error"):
+                return
 
     return Response(generate_stream(), mimetype='text/event-stream')
 
@@ -555,7 +813,7 @@ def daily_report_multi_download_result():
       GET /api/documents/daily-report/multi_download_result?job_id=xxx
     """
     job_id = request.args.get("job_id", "")
-    job_info = progress_store.get(job_id)
+    job_info = get_job(job_id)
     if not job_info:
         return jsonify({"error": "Invalid job_id"}), 400
 
@@ -563,13 +821,31 @@ def daily_report_multi_download_result():
         return jsonify({"error": f"Job not done. status={job_info['status']}"}), 400
 
     # ★ 再檢查是否過期
-    if time.time() > job_info.get("expires_at", 0):
+    if is_job_expired(job_info):
         return jsonify({"error": "Job expired"}), 400
 
-    zip_path = job_info["file_path"]
-    if not zip_path or not os.path.isfile(zip_path):
-        return jsonify({"error": "File not found"}), 404
+    result = job_info.get("result") or {}
+    zip_path = result.get("file_path")
+    filename = result.get("filename") or os.path.basename(zip_path or "") or "multiple_diaries.zip"
+
+    if zip_path and os.path.isfile(zip_path):
+        # 預設 as_attachment=True 時，多數瀏覽器會彈出下載對話框或直接下載
+        return send_file(zip_path, as_attachment=True, download_name=filename)
+
+    # ZIP 由其他主機的 worker 產生 => 從 S3 串流回傳
+    if result.get("s3_key"):
+        try:
+            obj = get_s3_client().get_object(Bucket=os.environ.get("AWS_S3_BUCKET", ""), Key=result["s3_key"])
+        except Exception as e:
+            logger.exception("[DEBUG] multi_download_result S3 error:")
+            return jsonify({"error": f"File not found: {e}"}), 404
+        return Response(
+            stream_with_context(obj["Body"].iter_chunks(chunk_size=1024 * 1024)),
+            mimetype="application/zip",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "Content-Length": str(obj.get("ContentLength", "")),
+            }
+        )
 
-    filename = os.path.basename(zip_path)
-    # 預設 as_attachment=True 時，多數瀏覽器會彈出下載對話框或直接下載
-    return send_file(zip_path, as_attachment=True, download_name=filename)
+    return jsonify({"error": "File not found"}), 404
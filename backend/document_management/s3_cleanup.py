@@ -0,0 +1,215 @@
+# backend/document_management/s3_cleanup.py
+
+"""
+S3 物件的批次 / 背景刪除。
+
+原本 delete_document 對每個版本同步呼叫一次 delete_object，版本多時 request 要等很多次往返。
+現在：
+  1. 要刪的 key 先寫進 `s3_orphans` collection (確定刪掉前都查得到，不會默默留下孤兒檔)
+  2. Mongo 的文件刪除立即返回
+  3. 每個 process 的背景 cleaner 以 delete_objects 一次最多 1000 個 key 批次刪除；
+     成功的從 s3_orphans 移除，失敗的以指數退避重試，超過 S3_CLEANUP_MAX_ATTEMPTS 次標記為 failed 供人工檢查
+
+環境變數：
+  - S3_CLEANUP_INTERVAL      沒有新工作時的輪詢間隔 (秒，預設 30)
+  - S3_CLEANUP_MAX_ATTEMPTS  最多重試次數 (預設 10)
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from backend.db import mongo
+from backend.document_management.s3_client import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+S3_ORPHANS_COLLECTION = "s3_orphans"
+DELETE_BATCH_SIZE = 1000  # delete_objects 單次上限
+
+ORPHAN_PENDING = "pending"
+ORPHAN_FAILED = "failed"
+
+_LEASE_SECONDS = 300
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _orphans():
+    return mongo.db[S3_ORPHANS_COLLECTION]
+
+
+def enqueue_s3_deletes(keys: Iterable[str], source: str = "", bucket: Optional[str] = None,
+                       delay_seconds: float = 0) -> int:
+    """
+    將 key 加入待刪除佇列並喚醒 cleaner；回傳新加入的數量 (已在佇列中的 key 略過)。
+    delay_seconds > 0：延後到那時才刪 (例如 presigned 上傳到期前還可能被 finalize，見 cancel_s3_deletes)。
+    """
+    bucket = bucket or os.environ.get("AWS_S3_BUCKET", "")
+    now = datetime.utcnow()
+    next_attempt_at = now + timedelta(seconds=delay_seconds)
+    docs = [
+        {
+            "bucket": bucket,
+            "key": key,
+            "source": source,
+            "status": ORPHAN_PENDING,
+            "attempts": 0,
+            "last_error": "",
+            "created_at": now,
+            "next_attempt_at": next_attempt_at,
+        }
+        for key in dict.fromkeys(k for k in keys if k)
+    ]
+    if not docs:
+        return 0
+
+    inserted = len(docs)
+    try:
+        _orphans().insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # 重複 key (已在佇列中) 不算錯誤
+        errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+        if errors:
+            raise
+        inserted = e.details.get("nInserted", 0)
+
+    _cleaner.wake()
+    return inserted
+
+
+def cancel_s3_deletes(keys: Iterable[str], bucket: Optional[str] = None) -> int:
+    """
+    取消尚未執行的刪除 (例如延後刪除的 presigned 上傳已 finalize)；回傳取消的數量。
+    """
+    bucket = bucket or os.environ.get("AWS_S3_BUCKET", "")
+    keys = [k for k in keys if k]
+    if not keys:
+        return 0
+    return _orphans().delete_many(
+        {"bucket": bucket, "key": {"$in": keys}, "status": ORPHAN_PENDING}
+    ).deleted_count
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, 30 * (2 ** max(0, attempts - 1))))
+
+
+def process_s3_orphans(limit: int = DELETE_BATCH_SIZE) -> int:
+    """
+    處理一批到期的待刪除 key (同一 bucket 一次 delete_objects)；回傳處理的數量。
+    多個 process 同時處理時以 lease (next_attempt_at 往後推) 避免重複；就算重複，S3 刪除也是冪等的。
+    """
+    now = datetime.utcnow()
+    due = list(_orphans().find(
+        {"status": ORPHAN_PENDING, "next_attempt_at": {"$lte": now}},
+        {"bucket": 1, "key": 1, "attempts": 1}
+    ).sort("next_attempt_at", ASCENDING).limit(limit))
+    if not due:
+        return 0
+
+    ids = [d["_id"] for d in due]
+    _orphans().update_many(
+        {"_id": {"$in": ids}, "status": ORPHAN_PENDING, "next_attempt_at": {"$lte": now}},
+        {"$set": {"next_attempt_at": now + timedelta(seconds=_LEASE_SECONDS)}}
+    )
+
+    by_bucket = {}
+    for d in due:
+        by_bucket.setdefault(d["bucket"], []).append(d)
+
+    max_attempts = _env_int("S3_CLEANUP_MAX_ATTEMPTS", 10)
+    s3_client = get_s3_client()
+    for bucket, items in by_bucket.items():
+        by_key = {d["key"]: d for d in items}
+        try:
+            resp = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": k} for k in by_key], "Quiet": False}
+            )
+            deleted = [obj["Key"] for obj in resp.get("Deleted", [])]
+            errors = {err["Key"]: f"{err.get('Code')}: {err.get('Message')}" for err in resp.get("Errors", [])}
+        except Exception as e:
+            logger.warning("[s3_cleanup] delete_objects failed bucket=%s (%d keys): %s", bucket, len(by_key), e)
+            deleted = []
+            errors = {k: str(e) for k in by_key}
+
+        if deleted:
+            _orphans().delete_many({"bucket": bucket, "key": {"$in": deleted}})
+
+        for key, message in errors.items():
+            attempts = by_key[key].get("attempts", 0) + 1
+            update = {"attempts": attempts, "last_error": message}
+            if attempts >= max_attempts:
+                update["status"] = ORPHAN_FAILED
+                logger.error("[s3_cleanup] giving up on s3://%s/%s after %d attempts: %s",
+                             bucket, key, attempts, message)
+            else:
+                update["next_attempt_at"] = datetime.utcnow() + _backoff(attempts)
+            _orphans().update_one({"_id": by_key[key]["_id"]}, {"$set": update})
+
+        logger.debug("[s3_cleanup] bucket=%s deleted=%d failed=%d", bucket, len(deleted), len(errors))
+
+    return len(due)
+
+
+class _Cleaner:
+    """
+    每個 process 一個背景 thread (gevent 下為 greenlet)：被喚醒或每 S3_CLEANUP_INTERVAL 秒處理一次佇列。
+    """
+
+    def __init__(self):
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._app = app
+            self._pid = os.getpid()
+            self._event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="s3-cleanup", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._event.set()
+
+    def _run(self):
+        interval = max(1, _env_int("S3_CLEANUP_INTERVAL", 30))
+        with self._app.app_context():
+            while True:
+                self._event.wait(interval)
+                self._event.clear()
+                try:
+                    # 一次最多 1000 個；滿批時表示可能還有，繼續處理
+                    while process_s3_orphans() >= DELETE_BATCH_SIZE:
+                        pass
+                except Exception as e:
+                    logger.warning("[s3_cleanup] cleanup loop error: %s", e)
+
+
+_cleaner = _Cleaner()
+
+
+def start_s3_cleanup(app):
+    """
+    於 create_app 時呼叫：啟動本 process 的背景 cleaner (AWS_S3_BUCKET 未設定時不啟動)。
+    """
+    if not os.environ.get("AWS_S3_BUCKET"):
+        return
+    _cleaner.start(app)
+    _cleaner.wake()  # 啟動時先處理重啟前留下的 key
@@ -0,0 +1,105 @@
+# backend/document_management/s3_client.py
+
+"""
+process 共用的 S3 client。
+
+原本每次上傳 / 刪除都 new 一個 boto3 Session + client：重新讀 credentials、重建 endpoint resolver，
+而且 HTTP 連線池用完就丟 (每次都要重新 TCP + TLS handshake)。
+這裡每個 process 只建一個 client (boto3 client 本身是 thread-safe 的)，連線池跨 request 重用。
+
+fork-safety：client 以建立時的 pid 標記，gunicorn fork 出 worker (或其他 fork) 後，
+子行程第一次取用時會重建自己的 client，不會與父行程共用 socket。
+
+環境變數：
+  - AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY / AWS_DEFAULT_REGION (預設 ap-southeast-1)
+  - S3_MAX_POOL_CONNECTIONS  連線池大小 (預設 32)
+  - S3_ENDPOINT_URL          指向本機 S3 相容服務 (MinIO / moto server 等，測試用)
+  - S3_ADDRESSING_STYLE      auto | path | virtual (有 S3_ENDPOINT_URL 時預設 path)
+"""
+
+import logging
+import os
+import threading
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def create_s3_client():
+    """
+    建立一個新的 S3 client (不快取)；一般請用 get_s3_client()。
+    """
+    aws_access_key = os.environ.get("AWS_ACCESS_KEY_ID", "")
+    aws_secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY", "")
+    bucket_region = os.environ.get("AWS_DEFAULT_REGION", "ap-southeast-1")
+    endpoint_url = os.environ.get("S3_ENDPOINT_URL") or None
+
+    if not aws_access_key or not aws_secret_key:
+        logger.warning("AWS_ACCESS_KEY_ID 或 AWS_SECRET_ACCESS_KEY 未設置，S3 上傳可能失敗。")
+
+    addressing_style = os.environ.get("S3_ADDRESSING_STYLE") or ("path" if endpoint_url else "auto")
+    config = Config(
+        max_pool_connections=max(1, _env_int("S3_MAX_POOL_CONNECTIONS", 32)),
+        retries={"max_attempts": 5, "mode": "standard"},
+        s3={"addressing_style": addressing_style},
+    )
+
+    session = boto3.session.Session(
+        aws_access_key_id=aws_access_key,
+        aws_secret_access_key=aws_secret_key,
+        region_name=bucket_region
+    )
+    return session.client("s3", endpoint_url=endpoint_url, config=config)
+
+
+def get_s3_client():
+    """
+    回傳此 process 共用的 S3 client (第一次呼叫時建立；fork 後的子行程會自動重建)。
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    client = _client
+    if client is not None and _client_pid == pid:
+        return client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = create_s3_client()
+            _client_pid = pid
+            logger.debug("[s3_client] created S3 client for pid=%d", pid)
+        return _client
+
+
+def reset_s3_client():
+    """
+    丟棄快取的 client (例如測試中更改了環境變數)。
+    """
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
+
+
+if hasattr(os, "register_at_fork"):
+    # fork 後的子行程不得沿用父行程的連線池；lock 也重新建立，避免 fork 當下被持有
+    def _after_fork_in_child():
+        global _client, _client_pid, _client_lock
+        _client = None
+        _client_pid = None
+        _client_lock = threading.Lock()
+
+    os.register_at_fork(after_in_child=_after_fork_in_child)
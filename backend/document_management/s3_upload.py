@@ -0,0 +1,154 @@
+# backend/document_management/s3_upload.py
+
+"""
+串流上傳到 S3 (multipart upload)。
+
+原本的版本上傳是 base64 JSON：Flask 先 parse 一個比檔案大 1/3 的 JSON 字串，再 b64decode 成另一份完整 bytes。
+這裡把 request body 一邊讀一邊以固定大小的 part 丟給 S3 multipart upload，
+每個上傳最多只佔用一個 part 的記憶體，與檔案大小無關。
+
+  - S3_UPLOAD_PART_MB  每個 part 的大小 (MB，預設 8；S3 規定除最後一個 part 外至少 5MB)
+"""
+
+import logging
+import os
+from typing import Callable, Iterable, Optional
+
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+
+def get_part_size() -> int:
+    try:
+        part_mb = int(os.environ.get("S3_UPLOAD_PART_MB", 8))
+    except ValueError:
+        part_mb = 8
+    return max(MIN_PART_SIZE, part_mb * 1024 * 1024)
+
+
+class S3MultipartWriter:
+    """
+    以 write() 推入資料，滿一個 part 就上傳；close() 完成上傳並回傳總大小。
+    整個檔案小於一個 part 時改用單次 put_object (省掉 multipart 的 create/complete 兩次往返)。
+    發生錯誤時呼叫 abort()，S3 上不會留下未完成的 multipart upload。
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, part_size: Optional[int] = None,
+                 content_type: Optional[str] = None, on_chunk: Optional[Callable[[bytes], None]] = None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size or get_part_size()
+        self.content_type = content_type
+        self.on_chunk = on_chunk
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts = []
+        self._closed = False
+
+    def _extra_args(self) -> dict:
+        return {"ContentType": self.content_type} if self.content_type else {}
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        if self.on_chunk:
+            self.on_chunk(data)
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+
+    def _upload_part(self, body: bytes):
+        if self._upload_id is None:
+            resp = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self._extra_args())
+            self._upload_id = resp["UploadId"]
+        part_number = len(self._parts) + 1
+        resp = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=body
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+
+    def close(self) -> int:
+        if self._closed:
+            return self.size
+        if self._upload_id is None:
+            self.s3_client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self._extra_args())
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+        self._buffer = bytearray()
+        self._closed = True
+        return self.size
+
+    def abort(self):
+        self._buffer = bytearray()
+        self._closed = True
+        if self._upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.warning("[S3MultipartWriter] abort failed key=%s: %s", self.key, e)
+
+
+def iter_stream(stream, chunk_size: int = READ_CHUNK) -> Iterable[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_multipart_form(stream, boundary: bytes, max_field_size: int = 1024 * 1024):
+    """
+    串流 parse multipart/form-data (不把檔案存到記憶體或暫存檔)。
+    yield 以下事件：
+      ("field", name, value: str)
+      ("file", name, filename, content_type)   # 接著是此檔案的 ("data", bytes) ... ("file_end",)
+      ("data", bytes)
+      ("file_end",)
+    """
+    decoder = MultipartDecoder(boundary, max_form_memory_size=max_field_size)
+    current = None   # ("field", name, bytearray) | ("file", ...)
+    chunks = iter_stream(stream)
+    finished = False
+
+    while not finished:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            chunk = next(chunks, None)
+            decoder.receive_data(chunk)  # None => 串流結束
+            continue
+        if isinstance(event, Epilogue):
+            finished = True
+        elif isinstance(event, Field):
+            current = ("field", event.name, bytearray())
+        elif isinstance(event, File):
+            current = ("file", event.name)
+            yield ("file", event.name, event.filename, event.headers.get("Content-Type"))
+        elif isinstance(event, Data):
+            if current is None:
+                continue
+            if current[0] == "field":
+                current[2].extend(event.data)
+                if not event.more_data:
+                    yield ("field", current[1], current[2].decode("utf-8", errors="replace"))
+                    current = None
+            else:
+                if event.data:
+                    yield ("data", event.data)
+                if not event.more_data:
+                    yield ("file_end",)
+                    current = None
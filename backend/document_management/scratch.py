@@ -0,0 +1,365 @@
+# backend/document_management/scratch.py
+
+"""
+render 暫存空間 (scratch space) 管理。
+
+原本各處直接 tempfile.mkdtemp 且從不刪除，長時間執行的容器會把 /tmp 塞滿
+(填好的 xlsx、single-sheet xlsx、PDF、ZIP...)。這裡統一管理所有 render 目錄：
+
+  <SCRATCH_DIR>/<owner>/<prefix>xxxx/...
+
+  - owner = 一個 request (req-...) 或一個 job (job-...)；同一 owner 的目錄一起建立、一起刪除
+      * request：response 送完 (call_on_close) 即刪除
+      * job    ：中間產物在 job 結束時刪除；結果 ZIP 保留到 job 到期 (owner 目錄內的 .expires)
+  - 目前 owner 以 contextvar 傳遞 (見 scratch_owner() / bind_request_scratch())，render 子行程由呼叫端明確帶入
+  - request owner 是 lazy 的：before_request 只決定 owner 名稱，第一次 scratch_mkdtemp() 才建立目錄並上鎖；
+    沒有產檔的 request (列表、CRUD、SSE...) 完全不碰磁碟
+  - 使用中的 owner 對其目錄內的 .lock 持有 flock 共享鎖 (每個 process 各自持有，含 render 子行程)；
+    清掃要刪除 owner 前先取得排他鎖 (non-blocking)，取不到 = 某個 process 還在用，跳過。
+    同一台機器上的所有 web worker / job worker 因此不會刪到彼此使用中的目錄
+  - 定期清掃 (最多每 SCRATCH_SWEEP_INTERVAL 秒一次)：刪除已到期、或超過 SCRATCH_MAX_AGE_SECONDS 的孤兒 owner
+  - 總用量超過 SCRATCH_QUOTA_MB 時，依最後修改時間 (LRU) 淘汰沒有任何 process 使用中、且未設定未來到期時間的 owner
+    (.expires 還沒到的 owner 例如 job 的結果 ZIP，一律保留到到期)
+
+環境變數：
+  - SCRATCH_DIR             根目錄 (預設 <tmp>/render_scratch)
+  - SCRATCH_QUOTA_MB        上限 (MB，預設 2048)
+  - SCRATCH_MAX_AGE_SECONDS 沒有到期時間的 owner 最多保留多久 (預設 7200)
+  - SCRATCH_SWEEP_INTERVAL  清掃間隔 (秒，預設 60)
+"""
+
+import contextlib
+import contextvars
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_EXPIRES_FILE = ".expires"
+_LOCK_FILE = ".lock"
+
+# 取得 owner 共享鎖時，若清掃正在刪除它，等待後重試的間隔 (秒)
+_LOCK_RETRY_INTERVAL = 0.05
+
+_current_owner: contextvars.ContextVar = contextvars.ContextVar("scratch_owner", default=None)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class ScratchSpace:
+
+    def __init__(self, root: str, quota_bytes: int, max_age_seconds: int, sweep_interval: int):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval = sweep_interval
+        self._active: Dict[str, int] = {}   # 本行程使用中的 owner => 參考數
+        self._lock_fds: Dict[str, int] = {}  # 本行程持有共享鎖的 owner => .lock 的 fd
+        self._pending: Set[str] = set()      # 已綁定 (lazy) 但還沒建立目錄的 owner
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    # ---------------- owner ----------------
+
+    def owner_dir(self, owner: str) -> str:
+        return os.path.join(self.root, owner)
+
+    def acquire(self, owner: str, expires_at: Optional[float] = None):
+        with self._lock:
+            count = self._active.get(owner, 0) + 1
+            self._active[owner] = count
+        if count == 1:
+            fd = self._lock_owner(owner)
+            with self._lock:
+                self._lock_fds[owner] = fd
+        if expires_at is not None:
+            self.set_expiry(owner, expires_at)
+
+    def bind_lazy(self, owner: str):
+        """
+        登記 owner 但先不建立目錄；第一次 ensure() (例如 mkdtemp) 時才 acquire。
+        """
+        with self._lock:
+            self._pending.add(owner)
+
+    def ensure(self, owner: str):
+        """
+        lazy 綁定的 owner 第一次要用時 acquire (建立目錄 + 上鎖)；其他 owner 不做事。
+        """
+        with self._lock:
+            if owner not in self._pending:
+                return
+            self._pending.discard(owner)
+        self.acquire(owner)
+
+    def release_lazy(self, owner: str):
+        """
+        bind_lazy() 的對應：從沒用過 => 只移除登記；用過 => release 並刪除目錄。
+        """
+        with self._lock:
+            if owner in self._pending:
+                self._pending.discard(owner)
+                return
+        self.release(owner, delete=True)
+
+    def _lock_owner(self, owner: str) -> int:
+        """
+        對 owner 的 .lock 取得共享鎖並回傳 fd。
+        清掃持有排他鎖 (正在刪除) 時等它刪完；鎖到的檔案若已被刪除 (inode 不同) 就重建目錄再鎖一次。
+        """
+        path = os.path.join(self.owner_dir(owner), _LOCK_FILE)
+        while True:
+            os.makedirs(self.owner_dir(owner), exist_ok=True)
+            try:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                time.sleep(_LOCK_RETRY_INTERVAL)
+                continue
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def set_expiry(self, owner: str, expires_at: float):
+        os.makedirs(self.owner_dir(owner), exist_ok=True)
+        with open(os.path.join(self.owner_dir(owner), _EXPIRES_FILE), "w") as f:
+            f.write(str(float(expires_at)))
+
+    def release(self, owner: str, delete: bool = True):
+        """
+        本行程不再使用 owner；delete=True 時 (且沒有其他使用者) 立即刪除其所有目錄。
+        """
+        with self._lock:
+            count = self._active.get(owner, 0) - 1
+            if count > 0:
+                self._active[owner] = count
+                return
+            self._active.pop(owner, None)
+            fd = self._lock_fds.pop(owner, None)
+        try:
+            if delete:
+                shutil.rmtree(self.owner_dir(owner), ignore_errors=True)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def mkdtemp(self, prefix: str = "tmp", owner: Optional[str] = None) -> str:
+        # 沒有 owner (例如 benchmark / CLI 直接呼叫) => 自成一個 owner，由清掃依存活時間刪除
+        owner = owner or _current_owner.get() or new_owner("anon")
+        self.ensure(owner)
+        self.maybe_sweep()
+        base = self.owner_dir(owner)
+        os.makedirs(base, exist_ok=True)
+        return tempfile.mkdtemp(prefix=prefix, dir=base)
+
+    # ---------------- 清掃 / 淘汰 ----------------
+
+    def _owner_info(self, owner: str):
+        """
+        回傳 (大小, 最後修改時間, 到期時間 or None)。
+        """
+        path = self.owner_dir(owner)
+        size = 0
+        last_mtime = 0.0
+        for dirpath, _, filenames in os.walk(path):
+            try:
+                last_mtime = max(last_mtime, os.stat(dirpath).st_mtime)
+            except OSError:
+                pass
+            for name in filenames:
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                size += st.st_size
+                last_mtime = max(last_mtime, st.st_mtime)
+
+        expires_at = None
+        try:
+            with open(os.path.join(path, _EXPIRES_FILE)) as f:
+                expires_at = float(f.read().strip())
+        except (OSError, ValueError):
+            pass
+        return size, last_mtime, expires_at
+
+    def _remove_if_unused(self, owner: str) -> bool:
+        """
+        取得 owner 的排他鎖 (non-blocking) 後刪除；任何 process (含本行程) 還持有共享鎖 => 不刪，回傳 False。
+        刪除期間持有排他鎖，同時要 acquire 這個 owner 的 process 會等刪完再重建。
+        """
+        try:
+            fd = os.open(os.path.join(self.owner_dir(owner), _LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            # 目錄已被其他 process 刪掉
+            return True
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            shutil.rmtree(self.owner_dir(owner), ignore_errors=True)
+            return True
+        finally:
+            os.close(fd)
+
+    def maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        try:
+            self.sweep()
+        except Exception as e:
+            logger.warning("[ScratchSpace] sweep failed: %s", e)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            active = set(self._active)
+
+        owners = []
+        total = 0
+        for owner in os.listdir(self.root):
+            # "." 開頭的是其他模組的共用檔案 (例如 render_pool 的 .render_slots)，不是 owner
+            if owner.startswith(".") or not os.path.isdir(self.owner_dir(owner)):
+                continue
+            size, last_mtime, expires_at = self._owner_info(owner)
+            expired = (expires_at is not None and now > expires_at) or (
+                expires_at is None and now - last_mtime > self.max_age_seconds
+            )
+            if expired and owner not in active and self._remove_if_unused(owner):
+                logger.debug("[ScratchSpace] removed expired %s (%d bytes)", owner, size)
+                continue
+            total += size
+            # 未到期的 owner (例如 job 結果) 不參與淘汰
+            if expires_at is None or expired:
+                owners.append((last_mtime, size, owner))
+
+        if total <= self.quota_bytes:
+            return
+
+        owners.sort()  # 最久沒動的在前
+        for _, size, owner in owners:
+            if total <= self.quota_bytes:
+                break
+            if owner in active or not self._remove_if_unused(owner):
+                continue
+            total -= size
+            logger.info("[ScratchSpace] quota exceeded, evicted %s (%d bytes)", owner, size)
+        if total > self.quota_bytes:
+            logger.warning("[ScratchSpace] still over quota after eviction: %d bytes in use", total)
+
+    def usage(self) -> dict:
+        total = 0
+        owners = 0
+        for owner in os.listdir(self.root):
+            if owner.startswith(".") or not os.path.isdir(self.owner_dir(owner)):
+                continue
+            owners += 1
+            total += self._owner_info(owner)[0]
+        with self._lock:
+            active = len(self._active)
+        return {
+            "root": self.root,
+            "bytes": total,
+            "quota_bytes": self.quota_bytes,
+            "owners": owners,
+            "active_owners": active,
+        }
+
+
+_scratch: Optional[ScratchSpace] = None
+_scratch_lock = threading.Lock()
+
+
+def get_scratch_space() -> ScratchSpace:
+    global _scratch
+    if _scratch is not None:
+        return _scratch
+    with _scratch_lock:
+        if _scratch is None:
+            _scratch = ScratchSpace(
+                root=os.environ.get("SCRATCH_DIR") or os.path.join(tempfile.gettempdir(), "render_scratch"),
+                quota_bytes=max(1, _env_int("SCRATCH_QUOTA_MB", 2048)) * 1024 * 1024,
+                max_age_seconds=_env_int("SCRATCH_MAX_AGE_SECONDS", 7200),
+                sweep_interval=_env_int("SCRATCH_SWEEP_INTERVAL", 60),
+            )
+    return _scratch
+
+
+def new_owner(kind: str) -> str:
+    return f"{kind}-{uuid.uuid4().hex}"
+
+
+def current_scratch_owner() -> Optional[str]:
+    return _current_owner.get()
+
+
+@contextlib.contextmanager
+def scratch_owner(owner: str, delete: bool = True, expires_at: Optional[float] = None):
+    """
+    在此區塊內呼叫 scratch_mkdtemp() 建立的目錄都屬於 owner；
+    離開時 delete=True 則刪除 (例如 job 的中間產物)，否則留給 .expires / 清掃處理。
+    """
+    space = get_scratch_space()
+    space.acquire(owner, expires_at)
+    token = _current_owner.set(owner)
+    try:
+        yield owner
+    finally:
+        _current_owner.reset(token)
+        space.release(owner, delete=delete)
+
+
+def scratch_mkdtemp(prefix: str = "tmp", owner: Optional[str] = None) -> str:
+    """
+    tempfile.mkdtemp 的替代品：目錄建立在目前 owner (或指定 owner) 底下。
+    """
+    return get_scratch_space().mkdtemp(prefix, owner)
+
+
+# ---------------- Flask request 綁定 ----------------
+
+def bind_request_scratch():
+    """
+    於 before_request 呼叫：此 request 內建立的 scratch 目錄都屬於同一個 owner。
+    只設定 contextvar，目錄與鎖等第一次 scratch_mkdtemp() 才建立。
+    回傳 (owner, contextvar token)；搭配 release_request_scratch() 使用。
+    """
+    owner = new_owner("req")
+    get_scratch_space().bind_lazy(owner)
+    return owner, _current_owner.set(owner)
+
+
+def release_request_scratch(owner: str, token):
+    """
+    response 送完 (含 streaming) 後呼叫：還原 contextvar 並刪除此 request 的所有 scratch 目錄
+    (沒有建立過任何目錄時不碰磁碟)。
+    """
+    try:
+        if token is not None:
+            _current_owner.reset(token)
+    except (ValueError, RuntimeError):
+        # 在不同的 context 中關閉 (例如 WSGI server 於其他 greenlet 呼叫 close)
+        pass
+    get_scratch_space().release_lazy(owner)
@@ -1,74 +1,100 @@
 # backend/document_management/services.py
 
+import io
 import os
 import base64
 import uuid
 import logging
 import subprocess
 import platform
-import tempfile
 import shutil
-from datetime import datetime
-from typing import Optional, Dict, Any, List
-
-import boto3
+import pathlib
+import time
+from urllib.parse import quote
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
 from botocore.exceptions import ClientError
 from flask import current_app
-from openpyxl import load_workbook
 from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
 
 from backend.db import mongo
+from backend.document_management.libreoffice_pool import (
+    ConversionError,
+    get_libreoffice_pool,
+)
+from backend.document_management.xlsx_template import get_workbook_template
+from backend.document_management.xlsx_patch import get_patch_template
+from backend.document_management.scratch import scratch_mkdtemp
+from backend.document_management.s3_client import get_s3_client
+from backend.document_management.s3_cleanup import cancel_s3_deletes, enqueue_s3_deletes
+from backend.document_management.document_counts import adjust_document_count, get_document_count
+from backend.document_management.pagination import clamp_limit, fetch_page, keyset_sort
+from backend.document_management.document_versions import (
+    DEFAULT_PAGE_SIZE,
+    ensure_versions_migrated,
+    find_version,
+    insert_version,
+    list_all_versions,
+    list_versions_page,
+    take_versions_for_delete,
+)
+from backend.document_management.blob_store import (
+    find_blob,
+    is_valid_digest,
+    new_blob_key,
+    new_hasher,
+    ref_existing_blob,
+    register_blob,
+    release_blobs,
+    release_version_files,
+    store_blob_bytes,
+)
+from backend.document_management.s3_upload import S3MultipartWriter, iter_multipart_form, iter_stream
+from backend.document_management.render_cache import (
+    RenderCache,
+    compute_render_key,
+    get_render_cache,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def get_s3_client():
-    """
-    建立並回傳 boto3 S3 client。
-    """
-    aws_access_key = os.environ.get("AWS_ACCESS_KEY_ID", "")
-    aws_secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY", "")
-    bucket_region = os.environ.get("AWS_DEFAULT_REGION", "ap-southeast-1")
-
-    if not aws_access_key or not aws_secret_key:
-        logger.warning("AWS_ACCESS_KEY_ID 或 AWS_SECRET_ACCESS_KEY 未設置，S3 上傳可能失敗。")
-
-    session = boto3.session.Session(
-        aws_access_key_id=aws_access_key,
-        aws_secret_access_key=aws_secret_key,
-        region_name=bucket_region
-    )
-    return session.client("s3")
+def _new_document_s3_key(original_filename: str) -> str:
+    ext = ""
+    if "." in original_filename:
+        ext = original_filename.split(".")[-1]
+    unique_id = str(uuid.uuid4())
+    return f"documents/{unique_id}.{ext}" if ext else f"documents/{unique_id}"
 
 
-def _upload_file_to_s3(base64_file: str, original_filename: str) -> str:
+def _upload_file_to_s3(base64_file: str, original_filename: str) -> dict:
     """
-    將 base64 編碼的檔案內容上傳到 S3，回傳 S3 key。
+    將 base64 編碼的檔案內容存成 blob (見 blob_store.py)，回傳被引用的 blob 記錄 (_id = sha256, s3_key, size)。
+    相同內容已存在時不上傳，只增加引用數。
     """
     bucket_name = os.environ.get("AWS_S3_BUCKET", "")
     if not bucket_name:
         raise ValueError("AWS_S3_BUCKET not set in environment.")
 
     s3_client = get_s3_client()
-
-    ext = ""
-    if "." in original_filename:
-        ext = original_filename.split(".")[-1]
-    unique_id = str(uuid.uuid4())
-    s3_key = f"documents/{unique_id}.{ext}" if ext else f"documents/{unique_id}"
-
     file_bytes = base64.b64decode(base64_file)
-    try:
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=s3_key,
-            Body=file_bytes
-        )
-    except ClientError as e:
-        logger.error("Failed to upload to S3: %s", e)
-        raise
 
-    return s3_key
+    def _put(s3_key: str):
+        try:
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=s3_key,
+                Body=file_bytes
+            )
+        except ClientError as e:
+            logger.error("Failed to upload to S3: %s", e)
+            raise
+
+    return store_blob_bytes(file_bytes, _put)
 
 
 # ------------------------------------------------------------
@@ -89,18 +115,24 @@ def create_document(data: Dict[str, Any]) -> str:
         "doc_type": doc_type,
         "project_id": project_id,
         "description": description,
-        "versions": [],
+        # 版本存於 document_versions (見 document_versions.py)，這裡只留最新版本摘要
+        "latest_version": None,
+        "version_count": 0,
         "daily_report_id": data.get("daily_report_id"),
         "daily_report_data": data.get("daily_report_data"),
         "created_at": datetime.now(),
         "updated_at": datetime.now()
     }
     result = mongo.db["documents"].insert_one(doc)
+    adjust_document_count(project_id, doc_type, 1)
     return str(result.inserted_id)
 
 
 def get_document(doc_id: str) -> Optional[dict]:
-    doc = mongo.db["documents"].find_one({"_id": mongo.db["documents"].object_id(doc_id)})
+    doc_oid = ObjectId(doc_id)
+    # 舊資料先搬移，讓回傳的 latest_version / version_count 正確
+    ensure_versions_migrated(doc_oid)
+    doc = mongo.db["documents"].find_one({"_id": doc_oid}, {"versions": 0})
     if not doc:
         return None
     doc["id"] = str(doc["_id"])
@@ -124,34 +156,90 @@ def update_document(doc_id: str, data: Dict[str, Any]) -> bool:
 
     update_fields["updated_at"] = datetime.now()
 
+    if "project_id" in update_fields or "doc_type" in update_fields:
+        # 改了專案 / 類型 => 同步搬移快取計數 (見 document_counts.py)
+        before = mongo.db["documents"].find_one_and_update(
+            {"_id": ObjectId(doc_id)},
+            {"$set": update_fields},
+            projection={"project_id": 1, "doc_type": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not before:
+            return False
+        new_project_id = update_fields.get("project_id", before.get("project_id"))
+        new_doc_type = update_fields.get("doc_type", before.get("doc_type"))
+        if (new_project_id, new_doc_type) != (before.get("project_id"), before.get("doc_type")):
+            adjust_document_count(before.get("project_id"), before.get("doc_type"), -1)
+            adjust_document_count(new_project_id, new_doc_type, 1)
+        return True
+
     result = mongo.db["documents"].update_one(
-        {"_id": mongo.db["documents"].object_id(doc_id)},
+        {"_id": ObjectId(doc_id)},
         {"$set": update_fields}
     )
     return (result.modified_count > 0)
 
 
 def delete_document(doc_id: str) -> bool:
-    doc = mongo.db["documents"].find_one({"_id": mongo.db["documents"].object_id(doc_id)})
+    doc = mongo.db["documents"].find_one(
+        {"_id": ObjectId(doc_id)},
+        {"project_id": 1, "doc_type": 1, "versions.s3_key": 1, "versions.sha256": 1}
+    )
     if not doc:
         return False
 
-    # 刪除所有版本檔案 (S3)
-    s3_client = get_s3_client()
-    bucket_name = os.environ.get("AWS_S3_BUCKET", "")
-    for ver in doc.get("versions", []):
-        s3_key = ver.get("s3_key", "")
-        if s3_key:
-            try:
-                s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
-            except ClientError as e:
-                logger.warning("Failed to delete S3 key=%s: %s", s3_key, e)
+    # 先刪 Mongo 記錄 (只有真的刪到的那個 request 釋放引用，避免並行刪除重複扣 refcount)
+    if mongo.db["documents"].delete_one({"_id": doc["_id"]}).deleted_count == 0:
+        return False
+    adjust_document_count(doc.get("project_id"), doc.get("doc_type"), -1)
 
-    mongo.db["documents"].delete_one({"_id": doc["_id"]})
+    # 版本檔案：釋放 blob 引用 (見 blob_store.py)；要刪的 S3 物件交給背景 cleaner 批次刪除 (見 s3_cleanup.py)
+    versions = take_versions_for_delete(doc["_id"], doc.get("versions"))
+    release_version_files(versions, source=f"documents/{doc_id}")
     return True
 
 
-def list_documents(project_id: str = "", doc_type: str = "") -> List[dict]:
+# 文件列表預設只取摘要欄位 (不含 daily_report_data / 版本歷史)
+DOCUMENT_SUMMARY_FIELDS = (
+    "title", "doc_type", "project_id", "daily_report_id",
+    "created_at", "updated_at", "version_count", "latest_version",
+)
+# 不開放給 fields= 的欄位 (舊資料的版本歷史陣列)
+_UNLISTABLE_FIELDS = {"versions"}
+
+
+def build_document_projection(view: str = "summary", fields: Optional[List[str]] = None) -> dict:
+    """
+    list 用的 Mongo projection：
+      - fields 有值：只取這些欄位 (可用 "daily_report_data.report_date" 這類子欄位)
+      - view="summary" (預設)：DOCUMENT_SUMMARY_FIELDS
+      - view="full"：除版本歷史外的所有欄位
+    """
+    if fields:
+        projection = {}
+        for name in fields:
+            name = name.strip()
+            if not name or name == "id" or name.split(".")[0] in _UNLISTABLE_FIELDS:
+                continue
+            if name.startswith("$") or not all(part.isidentifier() for part in name.split(".")):
+                raise ValueError(f"Invalid field: {name}")
+            projection[name] = 1
+        return projection or {"_id": 1}
+    if view == "full":
+        return {"versions": 0}
+    if view != "summary":
+        raise ValueError(f"Invalid view: {view}")
+    return {name: 1 for name in DOCUMENT_SUMMARY_FIELDS}
+
+
+def list_documents(project_id: str = "", doc_type: str = "", view: str = "summary",
+                   fields: Optional[List[str]] = None, limit: Optional[int] = None,
+                   cursor: Optional[str] = None, with_total: bool = False):
+    """
+    limit / cursor 皆未給：回傳所有符合的文件 (list，原本的行為)
+    否則：keyset 分頁 (created_at desc) => {"items", "next_cursor"[, "total"]}
+      with_total=True 時 total 取自快取計數 (document_counts.py)，不做 count_documents
+    """
     query = {}
     if project_id:
         try:
@@ -161,13 +249,32 @@ def list_documents(project_id: str = "", doc_type: str = "") -> List[dict]:
     if doc_type:
         query["doc_type"] = doc_type
 
-    cursor = mongo.db["documents"].find(query).sort("created_at", -1)
-    results = []
-    for d in cursor:
-        d["id"] = str(d["_id"])
-        del d["_id"]
-        results.append(d)
-    return results
+    # 以 projection 只讀需要的欄位；版本歷史一律不讀 (最新版本看 latest_version)
+    projection = build_document_projection(view, fields)
+
+    if limit is None and not cursor:
+        rows = mongo.db["documents"].find(query, projection).sort(keyset_sort("created_at"))
+        return [_format_listed_document(d) for d in rows]
+
+    rows, next_cursor = fetch_page(
+        mongo.db["documents"], query, "created_at", clamp_limit(limit), cursor, projection
+    )
+    # created_at 只是為了分頁而讀，fields= 沒要求就不回傳
+    drop_created_at = bool(fields) and "created_at" not in projection
+    page = {
+        "items": [_format_listed_document(d, drop_created_at) for d in rows],
+        "next_cursor": next_cursor,
+    }
+    if with_total:
+        page["total"] = get_document_count(query.get("project_id"), query.get("doc_type"))
+    return page
+
+
+def _format_listed_document(d: dict, drop_created_at: bool = False) -> dict:
+    d["id"] = str(d.pop("_id"))
+    if drop_created_at:
+        d.pop("created_at", None)
+    return d
 
 
 # ------------------------------------------------------------
@@ -175,7 +282,7 @@ def list_documents(project_id: str = "", doc_type: str = "") -> List[dict]:
 # ------------------------------------------------------------
 
 def add_document_version(doc_id: str, data: Dict[str, Any]) -> str:
-    doc = mongo.db["documents"].find_one({"_id": mongo.db["documents"].object_id(doc_id)})
+    doc = mongo.db["documents"].find_one({"_id": ObjectId(doc_id)}, {"_id": 1})
     if not doc:
         raise ValueError("Document not found")
 
@@ -183,49 +290,371 @@ def add_document_version(doc_id: str, data: Dict[str, Any]) -> str:
     filename = data.get("filename", "")
     base64_file = data.get("base64_file", "")
 
-    new_version_id = str(uuid.uuid4())
-    s3_key = ""
+    if not base64_file:
+        return _push_document_version(doc["_id"], version_note, filename, s3_key="")
+
+    blob = _upload_file_to_s3(base64_file, filename)
+    try:
+        return _push_document_version(
+            doc["_id"], version_note, filename,
+            s3_key=blob["s3_key"], size=blob.get("size"), sha256=blob["_id"]
+        )
+    except Exception:
+        release_blobs([blob["_id"]])
+        raise
+
+
+def add_document_version_from_stream(doc_id: str, stream, boundary: Optional[bytes] = None,
+                                     filename: str = "", version_note: str = "",
+                                     content_type: Optional[str] = None) -> str:
+    """
+    串流上傳一個新版本 (見 s3_upload.py)：request body 邊讀邊以 S3 multipart upload 上傳，記憶體用量固定。
+      - boundary 有值：body 為 multipart/form-data，檔案取第一個 file part，
+        欄位 filename / version_note 可覆寫參數 (欄位在檔案前後皆可)
+      - 否則：整個 body 即檔案內容，filename / version_note 由呼叫端給
+    """
+    bucket_name = os.environ.get("AWS_S3_BUCKET", "")
+    if not bucket_name:
+        raise ValueError("AWS_S3_BUCKET not set in environment.")
+
+    doc = mongo.db["documents"].find_one({"_id": ObjectId(doc_id)}, {"_id": 1})
+    if not doc:
+        raise ValueError("Document not found")
+
+    s3_client = get_s3_client()
+    writer = None
+    fields = {}
+    # 邊傳邊算 sha256；傳完若內容重複，register_blob 會改引用既有 blob 並刪除這份
+    hasher = new_hasher()
+    try:
+        if boundary:
+            in_file = False
+            for event in iter_multipart_form(stream, boundary):
+                kind = event[0]
+                if kind == "field":
+                    fields[event[1]] = event[2]
+                elif kind == "file":
+                    if writer is not None:
+                        raise ValueError("Only one file per upload is supported")
+                    filename = filename or event[2] or ""
+                    writer = S3MultipartWriter(
+                        s3_client, bucket_name, _new_document_s3_key(filename),
+                        content_type=event[3] or content_type, on_chunk=hasher.update
+                    )
+                    in_file = True
+                elif kind == "data" and in_file:
+                    writer.write(event[1])
+                elif kind == "file_end":
+                    in_file = False
+            if writer is None:
+                raise ValueError("No file part in upload")
+        else:
+            writer = S3MultipartWriter(
+                s3_client, bucket_name, _new_document_s3_key(filename),
+                content_type=content_type, on_chunk=hasher.update
+            )
+            for chunk in iter_stream(stream):
+                writer.write(chunk)
+        size = writer.close()
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    blob = register_blob(hasher.hexdigest(), writer.key, size)
+    try:
+        return _push_document_version(
+            doc["_id"],
+            version_note=fields.get("version_note", version_note),
+            filename=fields.get("filename") or filename,
+            s3_key=blob["s3_key"],
+            size=size,
+            sha256=blob["_id"]
+        )
+    except Exception:
+        release_blobs([blob["_id"]])
+        raise
 
-    if base64_file:
-        s3_key = _upload_file_to_s3(base64_file, filename)
 
+def _push_document_version(doc_oid: ObjectId, version_note: str, filename: str, s3_key: str,
+                           size: Optional[int] = None, sha256: Optional[str] = None) -> str:
+    new_version_id = str(uuid.uuid4())
     new_version = {
         "version_id": new_version_id,
         "version_note": version_note,
         "filename": filename,
         "s3_key": s3_key,
+        "size": size,
         "created_at": datetime.now()
     }
+    if sha256:
+        new_version["sha256"] = sha256
+    insert_version(doc_oid, new_version)
+    return new_version_id
+
+
+# ------------------------------------------------------------
+#  Presigned 直傳 / 直下載 (檔案不經過 Flask worker)
+# ------------------------------------------------------------
+# 1. POST presign  => 取得 presigned PUT URL，瀏覽器直接 PUT 到 S3
+# 2. POST finalize => 確認 S3 上已有檔案 (head_object)，才寫入 documents.versions
+# 3. GET download  => 取得既有版本 s3_key 的 presigned GET URL
+# 尚未 finalize 的上傳記錄在 document_uploads (TTL 到期自動刪除，索引見 indexes.py)。
+# presign 新 key 時同時登記一筆延到上傳到期才執行的 S3 刪除 (s3_orphans)，finalize 成功才取消；
+# 拿了 URL 上傳卻沒 finalize 的物件因此會被 s3_cleanup 刪掉。
+
+DOCUMENT_UPLOADS_COLLECTION = "document_uploads"
+
+# 上傳到期後再等多久才刪除未 finalize 的物件 (涵蓋到期前一刻開始、稍後才寫完的 finalize)
+_UPLOAD_DELETE_GRACE_SECONDS = 300
+
+
+def _get_presign_expires() -> int:
+    try:
+        return max(60, int(os.environ.get("S3_PRESIGN_EXPIRES", 900)))
+    except ValueError:
+        return 900
+
+
+def create_version_upload(doc_id: str, filename: str, content_type: Optional[str] = None,
+                          sha256: Optional[str] = None) -> dict:
+    """
+    為新版本產生 presigned PUT URL。
+    回傳 {"upload_id", "s3_key", "url", "method", "headers", "expires_in", "exists"}；
+    瀏覽器以 method + headers 將檔案 PUT 到 url 後，再呼叫 finalize_version_upload。
+
+    sha256 (檔案內容的 hex digest，選填)：
+      - 相同內容已存在 => exists=True、url=None，不需上傳，直接 finalize 即可
+      - 否則 presigned URL 帶 x-amz-checksum-sha256，S3 會拒絕內容與 hash 不符的上傳
+    """
+    bucket_name = os.environ.get("AWS_S3_BUCKET", "")
+    if not bucket_name:
+        raise ValueError("AWS_S3_BUCKET not set in environment.")
+    if not filename:
+        raise ValueError("Missing filename")
+
+    doc = mongo.db["documents"].find_one({"_id": ObjectId(doc_id)}, {"_id": 1})
+    if not doc:
+        raise ValueError("Document not found")
+
+    sha256 = (sha256 or "").lower() or None
+    if sha256 and not is_valid_digest(sha256):
+        raise ValueError("Invalid sha256")
+
+    expires_in = _get_presign_expires()
+    # 多留一些時間給 finalize
+    upload_ttl = expires_in * 2
+    upload_id = str(uuid.uuid4())
+    upload = {
+        "upload_id": upload_id,
+        "doc_id": doc["_id"],
+        "filename": filename,
+        "content_type": content_type,
+        "sha256": sha256,
+        "created_at": datetime.now(),
+        "expires_at": datetime.utcnow() + timedelta(seconds=upload_ttl),
+    }
 
-    mongo.db["documents"].update_one(
-        {"_id": doc["_id"]},
-        {
-            "$push": {"versions": new_version},
-            "$set": {"updated_at": datetime.now()}
+    blob = find_blob(sha256) if sha256 else None
+    if blob:
+        upload["s3_key"] = blob["s3_key"]
+        upload["exists"] = True
+        mongo.db[DOCUMENT_UPLOADS_COLLECTION].insert_one(upload)
+        return {
+            "upload_id": upload_id,
+            "s3_key": blob["s3_key"],
+            "url": None,
+            "method": "PUT",
+            "headers": {},
+            "expires_in": expires_in,
+            "exists": True,
         }
+
+    s3_key = new_blob_key(sha256) if sha256 else _new_document_s3_key(filename)
+    params = {"Bucket": bucket_name, "Key": s3_key}
+    headers = {}
+    if content_type:
+        params["ContentType"] = content_type
+        headers["Content-Type"] = content_type
+    if sha256:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+        params["ChecksumSHA256"] = checksum
+        headers["x-amz-checksum-sha256"] = checksum
+
+    url = get_s3_client().generate_presigned_url(
+        "put_object", Params=params, ExpiresIn=expires_in, HttpMethod="PUT"
     )
 
-    return new_version_id
+    # 上傳到期 (document_uploads 被 TTL 刪除) 後若還沒 finalize，就刪掉可能已上傳的物件
+    enqueue_s3_deletes([s3_key], source=f"presigned-upload/{upload_id}", bucket=bucket_name,
+                       delay_seconds=upload_ttl + _UPLOAD_DELETE_GRACE_SECONDS)
+
+    upload["s3_key"] = s3_key
+    upload["exists"] = False
+    mongo.db[DOCUMENT_UPLOADS_COLLECTION].insert_one(upload)
+
+    return {
+        "upload_id": upload_id,
+        "s3_key": s3_key,
+        "url": url,
+        "method": "PUT",
+        "headers": headers,
+        "expires_in": expires_in,
+        "exists": False,
+    }
+
+
+def finalize_version_upload(doc_id: str, upload_id: str, version_note: str = "") -> str:
+    """
+    確認 presigned PUT 已完成 (S3 上有該 key)，寫入新版本並回傳 version_id。
+    """
+    bucket_name = os.environ.get("AWS_S3_BUCKET", "")
+    upload = mongo.db[DOCUMENT_UPLOADS_COLLECTION].find_one({"upload_id": upload_id, "doc_id": ObjectId(doc_id)})
+    # TTL 索引不會準時刪除；到期後 s3_cleanup 可能正在刪這個物件，不能再 finalize
+    if not upload or upload.get("expires_at", datetime.max) <= datetime.utcnow():
+        raise ValueError("Upload not found or expired")
+
+    sha256 = upload.get("sha256")
+    if upload.get("exists"):
+        # 內容已存在 (presign 時以 sha256 判斷)，沒有上傳，直接引用既有 blob
+        blob = ref_existing_blob(sha256)
+        if not blob:
+            raise ValueError("Stored file no longer exists, please upload again")
+        if mongo.db[DOCUMENT_UPLOADS_COLLECTION].delete_one({"_id": upload["_id"]}).deleted_count == 0:
+            release_blobs([sha256])
+            raise ValueError("Upload already finalized")
+        s3_key, size = blob["s3_key"], blob.get("size")
+    else:
+        try:
+            head = get_s3_client().head_object(Bucket=bucket_name, Key=upload["s3_key"], ChecksumMode="ENABLED")
+        except ClientError as e:
+            raise ValueError(f"Uploaded file not found in S3: {upload['s3_key']}") from e
+
+        # 以 upload_id 原子地刪除 pending 記錄，避免同一個上傳被 finalize 兩次
+        if mongo.db[DOCUMENT_UPLOADS_COLLECTION].delete_one({"_id": upload["_id"]}).deleted_count == 0:
+            raise ValueError("Upload already finalized")
+
+        s3_key, size = upload["s3_key"], head.get("ContentLength")
+        if sha256:
+            expected = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+            if head.get("ChecksumSHA256") == expected:
+                blob = register_blob(sha256, s3_key, size)
+                s3_key = blob["s3_key"]
+            else:
+                # S3 沒有驗證過的 hash 不能拿來去重：當作一般 (不共用) 檔案
+                logger.warning("[finalize_version_upload] checksum not verified for %s, stored without dedup", s3_key)
+                sha256 = None
+
+    try:
+        version_id = _push_document_version(
+            upload["doc_id"],
+            version_note=version_note,
+            filename=upload.get("filename", ""),
+            s3_key=s3_key,
+            size=size,
+            sha256=sha256
+        )
+    except Exception:
+        if sha256:
+            release_blobs([sha256])
+        raise
 
+    # 版本已記錄：取消 presign 時登記的延後刪除 (改引用既有 blob 時，上傳的物件仍要刪，不取消)
+    if not upload.get("exists") and s3_key == upload["s3_key"]:
+        cancel_s3_deletes([s3_key], bucket=bucket_name)
+    return version_id
 
-def get_document_versions(doc_id: str) -> List[dict]:
-    doc = mongo.db["documents"].find_one({"_id": mongo.db["documents"].object_id(doc_id)})
+
+def get_version_download_url(doc_id: str, version_id: str) -> dict:
+    """
+    回傳既有版本的 presigned GET URL：{"url", "filename", "expires_in"}。
+    """
+    bucket_name = os.environ.get("AWS_S3_BUCKET", "")
+    version = find_version(ObjectId(doc_id), version_id)
+    if not version:
+        raise FileNotFoundError("Version not found")
+    if not version.get("s3_key"):
+        raise FileNotFoundError("Version has no stored file")
+
+    filename = version.get("filename") or os.path.basename(version["s3_key"])
+    expires_in = _get_presign_expires()
+    url = get_s3_client().generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": bucket_name,
+            "Key": version["s3_key"],
+            "ResponseContentDisposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+        },
+        ExpiresIn=expires_in
+    )
+    return {"url": url, "filename": filename, "expires_in": expires_in}
+
+
+def get_document_versions(doc_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                          all_versions: bool = False):
+    """
+    預設分頁 (新到舊) => {"items": [...], "next_cursor": str | None}，limit 未給時為 DEFAULT_PAGE_SIZE
+    all_versions=True：回傳所有版本 (舊到新，與原本 documents.versions 相同)，僅供明確要求的舊呼叫端
+    文件不存在時 raise FileNotFoundError
+    """
+    doc = mongo.db["documents"].find_one({"_id": ObjectId(doc_id)}, {"_id": 1})
     if not doc:
-        raise ValueError("Document not found")
-    return doc.get("versions", [])
+        raise FileNotFoundError("Document not found")
+    if all_versions:
+        return list_all_versions(doc["_id"])
+    return list_versions_page(doc["_id"], limit or DEFAULT_PAGE_SIZE, cursor)
 
 
 # ------------------------------------------------------------
 # 產生/填寫 XLSX & PDF (Daily Report)
 # ------------------------------------------------------------
 
-def generate_diary_xlsx_only(site_diary_doc: Dict[str, Any]) -> str:
-    # 取得 project 資料
+def _get_project_doc(site_diary_doc: Dict[str, Any]) -> dict:
     project_id = site_diary_doc.get("project_id")
     project_doc = mongo.db.projects.find_one({"id": project_id})
     if not project_doc:
         raise ValueError(f"Project not found in MongoDB (id={project_id}).")
+    return project_doc
+
+
+def _get_daily_report_template_path() -> str:
+    template_path = os.path.join(
+        current_app.root_path,
+        'report_templates',
+        'daily_report.xlsx'
+    )
+    if not os.path.isfile(template_path):
+        raise FileNotFoundError(f"daily_report.xlsx not found: {template_path}")
+    return template_path
 
+
+# 日報模板的工作表 (file_type => 工作表名稱 / PDF 檔名後綴)
+DAILY_REPORT_SHEETS = {
+    "sheet1": ("每日施工進度報告表", "每日施工進度報告表.pdf"),
+    "sheet2": ("每日本地工人及外地勞工施工人員紀錄表", "施工人員紀錄表.pdf"),
+}
+
+# file_type => 需要產出的 artifact
+DAILY_REPORT_ARTIFACTS = {
+    "xlsx": ("xlsx",),
+    "sheet1": ("sheet1",),
+    "sheet2": ("sheet2",),
+    "all": ("xlsx", "sheet1", "sheet2"),
+}
+
+
+# 日報模板各工作表的列印範圍
+DAILY_REPORT_PRINT_AREAS = {
+    "每日施工進度報告表": "A1:L46",
+    "每日本地工人及外地勞工施工人員紀錄表": "A1:E40",
+}
+
+
+def _daily_report_cell_values(site_diary_doc: Dict[str, Any], project_doc: dict) -> Dict[str, Dict[str, Tuple[Any, bool]]]:
+    """
+    計算日報模板要填入的所有儲存格：{工作表名稱: {cell_ref: (value, 是否置中)}}
+    openpyxl 與 XML patch 兩種 engine 共用這份結果，確保輸出一致。
+    """
     dr_data = site_diary_doc.get("daily_report_data", {})
     report_date = dr_data.get("report_date", None)
     date_str = report_date if report_date else ""
@@ -280,137 +709,414 @@ def generate_diary_xlsx_only(site_diary_doc: Dict[str, Any]) -> str:
     workers_dict = dr_data.get("workers", {})
     machines_dict = dr_data.get("machines", {})
 
-    template_path = os.path.join(
-        current_app.root_path,
-        'report_templates',
-        'daily_report.xlsx'
-    )
-    if not os.path.isfile(template_path):
-        raise FileNotFoundError(f"daily_report.xlsx not found: {template_path}")
+    # Sheet1
+    sheet1 = {}
+    sheet1["C2"] = (date_str, True)
+    sheet1["K2"] = (start_date_str, True)
+    sheet1["D4"] = (project_name, True)
+    sheet1["D5"] = (project_job_number, True)
+    sheet1["D6"] = (contractor_name, True)
+    sheet1["E7"] = (weather_morning, True)
+    sheet1["H7"] = (weather_noon, True)
+    sheet1["D8"] = (duration_str, True)
+    sheet1["J8"] = (day_count_str, True)
+    sheet1["B10"] = (summary_str, True)
+
+    for w_type, cell_ref in worker_map.items():
+        qty = workers_dict.get(w_type, 0)
+        sheet1[cell_ref] = (str(qty) if qty else "", True)
+
+    for m_type, cell_ref in machine_map.items():
+        qty = machines_dict.get(m_type, 0)
+        sheet1[cell_ref] = (str(qty) if qty else "", True)
 
-    temp_dir = tempfile.mkdtemp(prefix="diary_xlsx_")
-    date_str_for_filename = date_str.replace("-", "") if date_str else "noDate"
-    filled_xlsx_path = os.path.join(
-        temp_dir,
-        f"{date_str_for_filename}_daily_report.xlsx"
-    )
+    # Sheet2
+    sheet2 = {}
+    b3_date = date_str.replace("-", "/") if date_str else ""
+    sheet2["B3"] = (b3_date, True)
+    sheet2["B6"] = (project_name, True)
+    sheet2["B7"] = (project_job_number, True)
+    sheet2["B8"] = (contractor_name, True)
+
+    total_workers_sum = sum(workers_dict.values()) if workers_dict else 0
+    total_machines_sum = sum(machines_dict.values()) if machines_dict else 0
+    if (total_workers_sum + total_machines_sum) == 0:
+        for row in range(11, 26):
+            for col in range(2, 5):
+                sheet2[f"{get_column_letter(col)}{row}"] = ("☐", False)
+        for row in range(28, 33):
+            for col in range(2, 4):
+                sheet2[f"{get_column_letter(col)}{row}"] = ("☐", False)
+        sheet2["C33"] = (0, False)
+        sheet2["C34"] = (0, False)
+
+    return {
+        "每日施工進度報告表": sheet1,
+        "每日本地工人及外地勞工施工人員紀錄表": sheet2,
+    }
 
-    shutil.copy(template_path, filled_xlsx_path)
 
-    wb = load_workbook(filled_xlsx_path)
-    # Sheet1
-    if "每日施工進度報告表" in wb.sheetnames:
-        sh1 = wb["每日施工進度報告表"]
-        sh1["C2"].value = date_str
-        sh1["C2"].alignment = Alignment(horizontal='center', vertical='center')
+def _get_xlsx_engine() -> str:
+    """
+    DAILY_REPORT_XLSX_ENGINE：
+      - openpyxl (預設) 以 openpyxl 填表
+      - xml      直接 patch 模板的 worksheet XML (見 xlsx_patch.py)，不經 openpyxl parse/序列化
+    """
+    engine = os.environ.get("DAILY_REPORT_XLSX_ENGINE", "openpyxl").strip().lower()
+    return "xml" if engine == "xml" else "openpyxl"
 
-        sh1["K2"].value = start_date_str
-        sh1["K2"].alignment = Alignment(horizontal='center', vertical='center')
 
-        sh1["D4"].value = project_name
-        sh1["D4"].alignment = Alignment(horizontal='center', vertical='center')
+def _fill_daily_report_workbook(wb, site_diary_doc: Dict[str, Any], project_doc: dict):
+    """
+    將日報與專案資料填入 (已載入的) 模板 workbook。
+    """
+    for sheet_title, cells in _daily_report_cell_values(site_diary_doc, project_doc).items():
+        if sheet_title not in wb.sheetnames:
+            continue
+        ws = wb[sheet_title]
+        for cell_ref, (value, centered) in cells.items():
+            ws[cell_ref].value = value
+            if centered:
+                ws[cell_ref].alignment = Alignment(horizontal='center', vertical='center')
+        ws.print_area = DAILY_REPORT_PRINT_AREAS[sheet_title]
+
+
+def _save_single_sheet_workbook(wb, target_sheet_name: str, out_path: str):
+    """
+    另存一份「只含 target_sheet_name」的 xlsx，不需重新 load。
+    與 wb.remove() 相同 (僅自 _sheets 移除)，存檔後再還原，因此同一個 wb 可接著另存其他工作表。
+    """
+    orig_sheets = wb._sheets
+    orig_active = wb._active_sheet_index
+    wb._sheets = [wb[target_sheet_name]]
+    wb._active_sheet_index = 0
+    try:
+        wb.save(out_path)
+    finally:
+        wb._sheets = orig_sheets
+        wb._active_sheet_index = orig_active
 
-        sh1["D5"].value = project_job_number
-        sh1["D5"].alignment = Alignment(horizontal='center', vertical='center')
 
-        sh1["D6"].value = contractor_name
-        sh1["D6"].alignment = Alignment(horizontal='center', vertical='center')
+def _render_daily_report_workbooks(site_diary_doc: Dict[str, Any], project_doc: Optional[dict] = None,
+                                   sheet_names=(), single_sheet_dir: Optional[str] = None,
+                                   template_path: Optional[str] = None):
+    """
+    一次填表 (模板由記憶體中的 pristine workbook 複製，不再 copy + load_workbook)：
+      - 存完整 xlsx
+      - 對 sheet_names 中的每個 sheet ('sheet1' / 'sheet2') 另存只含該工作表的 xlsx (供轉 PDF)
+    single_sheet_dir 有值時 single-sheet xlsx 放在該目錄 (批次轉檔用，檔名會加上亂數避免重複)。
+    template_path 未指定時使用 Flask app 內的模板 (不在 app context 中執行時必須指定)。
+    回傳 (xlsx_path, {sheet_name: (single_sheet_xlsx, 預期的 pdf_path)})；尚未執行轉檔。
+    """
+    if project_doc is None:
+        project_doc = _get_project_doc(site_diary_doc)
 
-        sh1["E7"].value = weather_morning
-        sh1["E7"].alignment = Alignment(horizontal='center', vertical='center')
+    dr_data = site_diary_doc.get("daily_report_data", {})
+    raw_date = dr_data.get("report_date", "")
+    date_str_for_filename = raw_date.replace("-", "") if raw_date else "noDate"
 
-        sh1["H7"].value = weather_noon
-        sh1["H7"].alignment = Alignment(horizontal='center', vertical='center')
+    template_path = template_path or _get_daily_report_template_path()
 
-        sh1["D8"].value = duration_str
-        sh1["D8"].alignment = Alignment(horizontal='center', vertical='center')
+    temp_dir = scratch_mkdtemp(prefix="diary_xlsx_")
+    filled_xlsx_path = os.path.join(
+        temp_dir,
+        f"{date_str_for_filename}_daily_report.xlsx"
+    )
 
-        sh1["J8"].value = day_count_str
-        sh1["J8"].alignment = Alignment(horizontal='center', vertical='center')
+    singles = {}
+    use_xml_engine = _get_xlsx_engine() == "xml"
+    if use_xml_engine:
+        patch_tpl = get_patch_template(template_path)
+        cell_values = _daily_report_cell_values(site_diary_doc, project_doc)
+        sheetnames = patch_tpl.sheet_names
+        with open(filled_xlsx_path, "wb") as f:
+            f.write(patch_tpl.render(cell_values, DAILY_REPORT_PRINT_AREAS))
+    else:
+        wb = get_workbook_template(template_path).clone()
+        sheetnames = wb.sheetnames
+    try:
+        if not use_xml_engine:
+            _fill_daily_report_workbook(wb, site_diary_doc, project_doc)
+            wb.save(filled_xlsx_path)
+
+        for sheet_name in sheet_names:
+            target_sheet_name, pdf_suffix = DAILY_REPORT_SHEETS[sheet_name]
+            if target_sheet_name not in sheetnames:
+                raise RuntimeError(f"指定工作表 '{target_sheet_name}' 不存在於模板。")
+
+            pdf_path = os.path.join(temp_dir, f"{date_str_for_filename}{pdf_suffix}")
+            single_sheet_name = f"{date_str_for_filename}_{sheet_name}_only.xlsx"
+            if single_sheet_dir:
+                # 同一批次的檔名必須唯一 (LibreOffice 以原檔名產生 .pdf)
+                single_sheet_name = f"{uuid.uuid4().hex[:8]}_{single_sheet_name}"
+            single_sheet_xlsx = os.path.join(single_sheet_dir or temp_dir, single_sheet_name)
+
+            if use_xml_engine:
+                # 其他工作表設為 hidden (LibreOffice 轉 PDF 時不輸出 hidden sheet)
+                with open(single_sheet_xlsx, "wb") as f:
+                    f.write(patch_tpl.render(cell_values, DAILY_REPORT_PRINT_AREAS, only_sheet=target_sheet_name))
+            else:
+                _save_single_sheet_workbook(wb, target_sheet_name, single_sheet_xlsx)
+            singles[sheet_name] = (single_sheet_xlsx, pdf_path)
+    finally:
+        if not use_xml_engine:
+            wb.close()
+
+    return filled_xlsx_path, singles
+
+
+def generate_diary_xlsx_only(site_diary_doc: Dict[str, Any], project_doc: Optional[dict] = None) -> str:
+    xlsx_path, _ = _render_daily_report_workbooks(site_diary_doc, project_doc)
+    return xlsx_path
+
+
+def render_daily_report_xlsx_bytes(site_diary_doc: Dict[str, Any], project_doc: dict,
+                                   template_path: Optional[str] = None) -> bytes:
+    """
+    產生完整日報 xlsx，直接寫入記憶體 buffer 並回傳 bytes (不經過暫存檔)。
+    template_path 未指定時使用 Flask app 內的 report_templates/daily_report.xlsx。
+    """
+    template_path = template_path or _get_daily_report_template_path()
+    if _get_xlsx_engine() == "xml":
+        return get_patch_template(template_path).render(
+            _daily_report_cell_values(site_diary_doc, project_doc), DAILY_REPORT_PRINT_AREAS
+        )
 
-        sh1["B10"].value = summary_str
-        sh1["B10"].alignment = Alignment(horizontal='center', vertical='center')
+    wb = get_workbook_template(template_path).clone()
+    try:
+        _fill_daily_report_workbook(wb, site_diary_doc, project_doc)
+        buf = io.BytesIO()
+        wb.save(buf)
+    finally:
+        wb.close()
+    return buf.getvalue()
 
-        for w_type, cell_ref in worker_map.items():
-            qty = workers_dict.get(w_type, 0)
-            sh1[cell_ref].value = str(qty) if qty else ""
-            sh1[cell_ref].alignment = Alignment(horizontal='center', vertical='center')
 
-        for m_type, cell_ref in machine_map.items():
-            qty = machines_dict.get(m_type, 0)
-            sh1[cell_ref].value = str(qty) if qty else ""
-            sh1[cell_ref].alignment = Alignment(horizontal='center', vertical='center')
+def prepare_diary_single_sheet_xlsx(site_diary_doc: Dict[str, Any], sheet_name: str,
+                                    out_dir: Optional[str] = None,
+                                    project_doc: Optional[dict] = None) -> Tuple[str, str]:
+    """
+    產生「只保留單一工作表」的 xlsx，供 LibreOffice 轉 PDF。
+    回傳 (single_sheet_xlsx_path, 預期的 pdf_path)；尚未執行轉檔。
+    """
+    _, singles = _render_daily_report_workbooks(
+        site_diary_doc, project_doc, sheet_names=(sheet_name,), single_sheet_dir=out_dir
+    )
+    return singles[sheet_name]
 
-        sh1.print_area = "A1:L46"
 
-    # Sheet2
-    if "每日本地工人及外地勞工施工人員紀錄表" in wb.sheetnames:
-        sh2 = wb["每日本地工人及外地勞工施工人員紀錄表"]
-        b3_date = date_str.replace("-", "/") if date_str else ""
-        sh2["B3"].value = b3_date
-        sh2["B3"].alignment = Alignment(horizontal='center', vertical='center')
+def generate_diary_pdf_sheet(site_diary_doc: Dict[str, Any], sheet_name: str,
+                             project_doc: Optional[dict] = None) -> str:
+    single_sheet_xlsx, pdf_path = prepare_diary_single_sheet_xlsx(
+        site_diary_doc, sheet_name, project_doc=project_doc
+    )
+    convert_xlsx_to_pdf(single_sheet_xlsx, pdf_path)
+    return pdf_path
 
-        sh2["B6"].value = project_name
-        sh2["B6"].alignment = Alignment(horizontal='center', vertical='center')
 
-        sh2["B7"].value = project_job_number
-        sh2["B7"].alignment = Alignment(horizontal='center', vertical='center')
+def render_daily_report_files(site_diary_docs: List[Dict[str, Any]], file_type: str,
+                              chunk_size: Optional[int] = None, project_doc: Optional[dict] = None,
+                              template_path: Optional[str] = None):
+    """
+    多筆日報產檔 (generator)，依輸入順序逐筆 yield (doc, {artifact: path})。
+    file_type = xlsx | sheet1 | sheet2 | all (all = xlsx + 兩份 PDF)
+
+    - 每份日報只填表一次，需要的 single-sheet xlsx 直接由同一個 workbook 另存
+    - 一個 chunk 的 PDF 以「一次」LibreOffice 呼叫轉完，避免每份日報各自冷啟動 soffice
+      (chunk 大小由 LIBREOFFICE_BATCH_SIZE 控制，預設 20)
+    - render cache 命中的日報不重新產檔，cache 檔 hard link (或複製) 到目前 owner 的 scratch 目錄後回傳，
+      避免其他 process 淘汰 cache entry 後檔案消失；link 時 entry 已不在則當成 miss 重新產檔
+    在 app context 之外 (例如 render_pool 的子行程) 呼叫時，必須給 project_doc 與 template_path。
+    """
+    if file_type not in DAILY_REPORT_ARTIFACTS:
+        raise ValueError(f"Unsupported file_type={file_type}")
+    artifacts = DAILY_REPORT_ARTIFACTS[file_type]
+    pdf_sheets = tuple(a for a in artifacts if a in DAILY_REPORT_SHEETS)
+
+    if chunk_size is None:
+        try:
+            chunk_size = int(os.environ.get("LIBREOFFICE_BATCH_SIZE", 20))
+        except ValueError:
+            chunk_size = 20
+    chunk_size = max(1, chunk_size)
+
+    cache = _get_render_cache()
+    template_path = template_path or _get_daily_report_template_path()
+    project_docs: Dict[Any, dict] = {}
+    if project_doc is not None:
+        project_docs[project_doc.get("id")] = project_doc
+
+    for offset in range(0, len(site_diary_docs), chunk_size):
+        chunk = site_diary_docs[offset:offset + chunk_size]
+        results: Dict[int, Dict[str, str]] = {}
+        misses = []
+        pin_dir = None
+        for i, doc in enumerate(chunk):
+            pid = doc.get("project_id")
+            if pid not in project_docs:
+                project_docs[pid] = _get_project_doc(doc)
+            cache_key = None
+            if cache:
+                cache_key = compute_render_key(doc, project_docs[pid], template_path)
+                hits = {a: cache.get(cache_key, a) for a in artifacts}
+                if all(hits.values()):
+                    pin_dir = pin_dir or scratch_mkdtemp(prefix="diary_cache_hits_")
+                    pinned = _pin_cache_files(hits, pin_dir, str(offset + i))
+                    if pinned is not None:
+                        results[i] = pinned
+                        continue
+            misses.append((i, doc, cache_key))
+
+        if misses:
+            batch_dir = scratch_mkdtemp(prefix="diary_pdf_batch_") if pdf_sheets else None
+            pairs = []
+            for i, doc, cache_key in misses:
+                xlsx_path, singles = _render_daily_report_workbooks(
+                    doc, project_docs[doc.get("project_id")],
+                    sheet_names=pdf_sheets, single_sheet_dir=batch_dir,
+                    template_path=template_path
+                )
+                files = {"xlsx": xlsx_path}
+                for sheet_name, (single_sheet_xlsx, pdf_path) in singles.items():
+                    files[sheet_name] = pdf_path
+                    pairs.append((single_sheet_xlsx, pdf_path))
+                results[i] = {a: files[a] for a in artifacts}
+
+            convert_xlsx_batch_to_pdf(pairs, batch_dir)
+
+            if cache:
+                for i, _, cache_key in misses:
+                    for a, path in results[i].items():
+                        cache.put(cache_key, a, path)
+
+        for i, doc in enumerate(chunk):
+            yield doc, results[i]
 
-        sh2["B8"].value = contractor_name
-        sh2["B8"].alignment = Alignment(horizontal='center', vertical='center')
 
-        total_workers_sum = sum(workers_dict.values()) if workers_dict else 0
-        total_machines_sum = sum(machines_dict.values()) if machines_dict else 0
-        if (total_workers_sum + total_machines_sum) == 0:
-            for row in range(11, 26):
-                for col in range(2, 5):
-                    sh2.cell(row=row, column=col, value="☐")
-            for row in range(28, 33):
-                for col in range(2, 4):
-                    sh2.cell(row=row, column=col, value="☐")
-            sh2["C33"].value = 0
-            sh2["C34"].value = 0
+# ------------------------------------------------------------
+# Render cache (見 render_cache.py)
+# ------------------------------------------------------------
 
-        sh2.print_area = "A1:E40"
+def _get_render_cache() -> Optional[RenderCache]:
+    return get_render_cache(s3_client_factory=get_s3_client)
 
-    wb.save(filled_xlsx_path)
-    wb.close()
 
-    return filled_xlsx_path
+def _pin_cache_files(hits: Dict[str, str], pin_dir: str, tag: str) -> Optional[Dict[str, str]]:
+    """
+    把 cache 命中的檔案 hard link (不同檔案系統時改為複製) 到 pin_dir；
+    之後 cache entry 被淘汰也不影響這份檔案。任一檔案已不存在 => None。
+    """
+    pinned = {}
+    for artifact, path in hits.items():
+        target = os.path.join(pin_dir, f"{tag}_{os.path.basename(path)}")
+        try:
+            try:
+                os.link(path, target)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                shutil.copyfile(path, target)
+        except FileNotFoundError:
+            return None
+        pinned[artifact] = target
+    return pinned
+
+
+def get_daily_report_files(site_diary_doc: Dict[str, Any], file_type: str,
+                           project_doc: Optional[dict] = None) -> Dict[str, str]:
+    """
+    取得單筆日報的產出檔 {artifact: path}；file_type = xlsx | sheet1 | sheet2 | all。
+    若 render cache 有相同內容 (日報資料 + 專案欄位 + 模板) 的檔案，直接回傳，不重新 render。
+    """
+    _, files = next(render_daily_report_files([site_diary_doc], file_type, project_doc=project_doc))
+    return files
 
 
-def generate_diary_pdf_sheet(site_diary_doc: Dict[str, Any], sheet_name: str) -> str:
-    xlsx_path = generate_diary_xlsx_only(site_diary_doc)
-    temp_dir = os.path.dirname(xlsx_path)
+def invalidate_daily_report_cache(site_diary_doc: Dict[str, Any]):
+    """
+    日報被修改/刪除前呼叫：移除「舊內容」對應的 cache entry (其他日報不受影響)。
+    """
+    cache = _get_render_cache()
+    if not cache:
+        return
+    project_doc = mongo.db.projects.find_one({"id": site_diary_doc.get("project_id")})
+    if not project_doc:
+        return
+    cache_key = compute_render_key(site_diary_doc, project_doc, _get_daily_report_template_path())
+    cache.invalidate(cache_key)
 
-    dr_data = site_diary_doc.get("daily_report_data", {})
-    raw_date = dr_data.get("report_date", "")
-    date_str = raw_date.replace("-", "") if raw_date else "noDate"
 
-    if sheet_name == 'sheet1':
-        target_sheet_name = "每日施工進度報告表"
-        pdf_filename = f"{date_str}每日施工進度報告表.pdf"
+def convert_xlsx_to_pdf(xlsx_path: str, pdf_path: str) -> str:
+    """
+    將 xlsx 轉為 pdf_path。
+    優先使用常駐 LibreOffice pool (見 libreoffice_pool.py)；
+    若 pool 停用或無可用的 uno Python，則退回每次啟動一個 soffice。
+    """
+    lo_exec = get_libreoffice_cmd()
+    pool = get_libreoffice_pool(lo_exec)
+    if pool is not None:
+        try:
+            pool.convert(xlsx_path, pdf_path)
+        except ConversionError as e:
+            raise RuntimeError(str(e)) from e
+        if not os.path.isfile(pdf_path):
+            raise RuntimeError(f"PDF 轉檔失敗: {pdf_path} 不存在")
+        return pdf_path
+
+    t0 = time.monotonic()
+    out_dir = os.path.dirname(pdf_path)
+    _convert_with_soffice_cli(lo_exec, [xlsx_path], out_dir)
+
+    generated_pdf_name = os.path.join(
+        out_dir, os.path.splitext(os.path.basename(xlsx_path))[0] + ".pdf"
+    )
+    if os.path.isfile(generated_pdf_name):
+        if generated_pdf_name != pdf_path:
+            os.replace(generated_pdf_name, pdf_path)
     else:
-        target_sheet_name = "每日本地工人及外地勞工施工人員紀錄表"
-        pdf_filename = f"{date_str}施工人員紀錄表.pdf"
+        raise RuntimeError(f"PDF 轉檔失敗: {generated_pdf_name} 不存在")
 
-    pdf_path = os.path.join(temp_dir, pdf_filename)
+    if not os.path.isfile(pdf_path):
+        raise RuntimeError(f"PDF 轉檔失敗: {pdf_path} 不存在")
 
-    single_sheet_xlsx = os.path.join(temp_dir, f"{date_str}_{sheet_name}_only.xlsx")
-    shutil.copy(xlsx_path, single_sheet_xlsx)
+    logger.info("[convert_xlsx_to_pdf] soffice CLI converted %s in %d ms",
+                os.path.basename(xlsx_path), int((time.monotonic() - t0) * 1000))
+    return pdf_path
 
-    wb = load_workbook(single_sheet_xlsx)
-    if target_sheet_name not in wb.sheetnames:
-        wb.close()
-        raise RuntimeError(f"指定工作表 '{target_sheet_name}' 不存在於模板。")
 
-    for sn in wb.sheetnames:
-        if sn != target_sheet_name:
-            wb.remove(wb[sn])
-    wb.save(single_sheet_xlsx)
-    wb.close()
+def convert_xlsx_batch_to_pdf(pairs: List[Tuple[str, str]], work_dir: str):
+    """
+    批次轉檔：pairs = [(xlsx_path, pdf_path), ...]，所有 xlsx 必須位於 work_dir 且檔名唯一。
+      - 有常駐 pool => 逐筆丟給 pool (instance 已是熱的，不需再合併)
+      - 否則 => 以單一 soffice 呼叫一次轉完全部，再搬到各自的 pdf_path
+    """
+    if not pairs:
+        return
 
     lo_exec = get_libreoffice_cmd()
+    if get_libreoffice_pool(lo_exec) is not None:
+        for xlsx_path, pdf_path in pairs:
+            convert_xlsx_to_pdf(xlsx_path, pdf_path)
+        return
+
+    t0 = time.monotonic()
+    _convert_with_soffice_cli(lo_exec, [x for x, _ in pairs], work_dir)
+    for xlsx_path, pdf_path in pairs:
+        generated_pdf_name = os.path.join(
+            work_dir, os.path.splitext(os.path.basename(xlsx_path))[0] + ".pdf"
+        )
+        if not os.path.isfile(generated_pdf_name):
+            raise RuntimeError(f"PDF 轉檔失敗: {generated_pdf_name} 不存在")
+        shutil.move(generated_pdf_name, pdf_path)
+
+    logger.info("[convert_xlsx_batch_to_pdf] soffice CLI converted %d files in %d ms",
+                len(pairs), int((time.monotonic() - t0) * 1000))
+
+
+def _convert_with_soffice_cli(lo_exec: str, xlsx_paths: List[str], out_dir: str):
+    """
+    以 `soffice --headless --convert-to` 轉檔 (輸出檔名 = 原檔名.pdf，放在 out_dir)。
+    """
     input_filter = "Calc Office Open XML"
 
     # ★ 調整/嘗試更多字型嵌入設定：EmbedStandardFonts, UseTaggedPDF 等
@@ -418,41 +1124,35 @@ def generate_diary_pdf_sheet(site_diary_doc: Dict[str, Any], sheet_name: str) ->
     pdf_filter_options = "SelectPdfVersion=1;EmbedStandardFonts=true;UseTaggedPDF=true"
     output_filter = f"pdf:calc_pdf_Export:{pdf_filter_options}"
 
+    # 同一台機器上同時跑多個 soffice 時，各自需要獨立的 user profile (否則後啟動的會直接結束)
+    profile_dir = os.environ.get("LIBREOFFICE_PROFILE_DIR")
+    profile_args = [f"-env:UserInstallation={pathlib.Path(profile_dir).as_uri()}"] if profile_dir else []
+
     if platform.system().lower().startswith("win"):
+        quoted_inputs = " ".join(f'"{p}"' for p in xlsx_paths)
         cmd = (
-            f'"{lo_exec}" --headless --convert-to "{output_filter}" '
-            f'--infilter="{input_filter}" "{single_sheet_xlsx}" --outdir "{temp_dir}"'
+            f'"{lo_exec}" {" ".join(profile_args)} --headless --convert-to "{output_filter}" '
+            f'--infilter="{input_filter}" {quoted_inputs} --outdir "{out_dir}"'
         )
         try:
-            result = subprocess.run(cmd, shell=True, check=True, capture_output=True)
+            subprocess.run(cmd, shell=True, check=True, capture_output=True)
         except subprocess.CalledProcessError as e:
             err_msg = e.stderr.decode('utf-8', errors='replace') if e.stderr else str(e)
             raise RuntimeError(f"LibreOffice PDF conversion failed (Windows): {err_msg}") from e
     else:
         cmd_list = [
-            lo_exec, "--headless",
+            lo_exec, *profile_args, "--headless",
             "--convert-to", output_filter,
             f'--infilter={input_filter}',
-            single_sheet_xlsx,
-            "--outdir", temp_dir
+            *xlsx_paths,
+            "--outdir", out_dir
         ]
         try:
-            result = subprocess.run(cmd_list, shell=False, check=True, capture_output=True)
+            subprocess.run(cmd_list, shell=False, check=True, capture_output=True)
         except subprocess.CalledProcessError as e:
             err_msg = e.stderr.decode('utf-8', errors='replace') if e.stderr else str(e)
             raise RuntimeError(f"LibreOffice PDF conversion failed: {err_msg}") from e
 
-    generated_pdf_name = os.path.splitext(single_sheet_xlsx)[0] + ".pdf"
-    if os.path.isfile(generated_pdf_name):
-        os.rename(generated_pdf_name, pdf_path)
-    else:
-        raise RuntimeError(f"PDF 轉檔失敗: {generated_pdf_name} 不存在")
-
-    if not os.path.isfile(pdf_path):
-        raise RuntimeError(f"PDF 轉檔失敗: {pdf_path} 不存在")
-
-    return pdf_path
-
 
 def get_libreoffice_cmd() -> str:
     custom_path = os.environ.get("LIBREOFFICE_PATH")
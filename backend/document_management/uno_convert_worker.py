@@ -0,0 +1,181 @@
+# backend/document_management/uno_convert_worker.py
+
+"""
+LibreOffice UNO 轉檔 worker (獨立腳本)。
+
+此檔案「不」由 Flask 直接 import，而是由 libreoffice_pool.py 以
+「帶有 uno 模組的 Python」(通常為 /usr/bin/python3 + python3-uno) 啟動：
+
+    python3 uno_convert_worker.py --soffice /usr/bin/soffice --pipe NAME --profile /tmp/xxx
+
+啟動後會：
+  1) 自行啟動一個常駐 headless soffice (獨立 UserInstallation，避免互相搶 profile lock)
+  2) 透過 UNO pipe 連線
+  3) 從 stdin 逐行讀取 JSON 請求，處理後以 JSON 單行寫回 stdout
+
+請求格式：
+  {"op": "ping"}
+  {"op": "convert", "src": "/abs/in.xlsx", "dst": "/abs/out.pdf"}
+回應格式：
+  {"ok": true, "elapsed_ms": 123} 或 {"ok": false, "error": "..."}
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+INPUT_FILTER = "Calc Office Open XML"
+OUTPUT_FILTER = "calc_pdf_Export"
+
+# 與 CLI 版 "pdf:calc_pdf_Export:SelectPdfVersion=1;EmbedStandardFonts=true;UseTaggedPDF=true" 相同
+PDF_FILTER_DATA = {
+    "SelectPdfVersion": 1,
+    "EmbedStandardFonts": True,
+    "UseTaggedPDF": True,
+}
+
+
+def _prop(name, value):
+    p = PropertyValue()
+    p.Name = name
+    p.Value = value
+    return p
+
+
+def _emit(payload):
+    sys.stdout.write(json.dumps(payload) + "\n")
+    sys.stdout.flush()
+
+
+def _start_soffice(soffice, pipe_name, profile_dir):
+    cmd = [
+        soffice,
+        "--headless", "--invisible", "--nologo", "--nodefault",
+        "--norestore", "--nolockcheck",
+        "-env:UserInstallation=" + uno.systemPathToFileUrl(profile_dir),
+        "--accept=pipe,name=%s;urp;StarOffice.ComponentContext" % pipe_name,
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+
+
+def _connect(pipe_name, soffice_proc, timeout):
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_ctx
+    )
+    url = "uno:pipe,name=%s;urp;StarOffice.ComponentContext" % pipe_name
+    deadline = time.monotonic() + timeout
+    while True:
+        if soffice_proc.poll() is not None:
+            raise RuntimeError("soffice exited during startup (code=%s)" % soffice_proc.returncode)
+        try:
+            ctx = resolver.resolve(url)
+            break
+        except NoConnectException:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Timed out connecting to soffice via UNO")
+            time.sleep(0.2)
+    smgr = ctx.ServiceManager
+    return smgr.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+
+def _convert(desktop, src, dst):
+    load_props = (
+        _prop("Hidden", True),
+        _prop("ReadOnly", True),
+        _prop("FilterName", INPUT_FILTER),
+    )
+    doc = desktop.loadComponentFromURL(uno.systemPathToFileUrl(src), "_blank", 0, load_props)
+    if doc is None:
+        raise RuntimeError("LibreOffice could not load %s" % src)
+    try:
+        filter_data = uno.Any(
+            "[]com.sun.star.beans.PropertyValue",
+            tuple(_prop(k, v) for k, v in PDF_FILTER_DATA.items())
+        )
+        store_props = (
+            _prop("FilterName", OUTPUT_FILTER),
+            _prop("FilterData", filter_data),
+        )
+        uno.invoke(doc, "storeToURL", (uno.systemPathToFileUrl(dst), store_props))
+    finally:
+        doc.close(True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--soffice", required=True)
+    parser.add_argument("--pipe", required=True)
+    parser.add_argument("--profile", required=True)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    soffice_proc = _start_soffice(args.soffice, args.pipe, args.profile)
+    desktop = None
+    try:
+        try:
+            desktop = _connect(args.pipe, soffice_proc, args.startup_timeout)
+        except Exception as e:
+            _emit({"ready": False, "error": str(e)})
+            return 1
+        _emit({"ready": True, "soffice_pid": soffice_proc.pid})
+
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            req = json.loads(line)
+            op = req.get("op")
+
+            if op == "ping":
+                if soffice_proc.poll() is not None:
+                    _emit({"ok": False, "error": "soffice is not running"})
+                    return 1
+                try:
+                    desktop.getComponents()
+                except Exception as e:
+                    _emit({"ok": False, "error": "UNO bridge unhealthy: %s" % e})
+                    return 1
+                _emit({"ok": True})
+
+            elif op == "convert":
+                t0 = time.monotonic()
+                try:
+                    _convert(desktop, req["src"], req["dst"])
+                except Exception as e:
+                    _emit({"ok": False, "error": str(e)})
+                    # soffice 掛掉/bridge 斷線時直接結束，交由 pool 重新啟動
+                    if soffice_proc.poll() is not None or "Disposed" in type(e).__name__:
+                        return 1
+                    continue
+                if not os.path.isfile(req["dst"]):
+                    _emit({"ok": False, "error": "PDF not produced: %s" % req["dst"]})
+                    continue
+                _emit({"ok": True, "elapsed_ms": int((time.monotonic() - t0) * 1000)})
+
+            else:
+                _emit({"ok": False, "error": "Unknown op: %s" % op})
+        return 0
+    finally:
+        if desktop is not None:
+            try:
+                desktop.terminate()
+            except Exception:
+                pass
+        if soffice_proc.poll() is None:
+            soffice_proc.terminate()
+            try:
+                soffice_proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                soffice_proc.kill()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
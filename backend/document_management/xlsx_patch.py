@@ -0,0 +1,311 @@
+# backend/document_management/xlsx_patch.py
+
+"""
+輕量 XLSX 模板 engine：把 XLSX 當成 ZIP，只 patch 需要改的 worksheet XML。
+
+日報模板每次只會改固定的一組儲存格，用 openpyxl 則要把整本 workbook parse + 重新序列化。
+這個 engine：
+  - 模板只讀一次 (每個 worker process)，保留所有 ZIP part 的原始 bytes
+  - render 時只改「有填值的工作表 XML」與 workbook.xml (列印範圍 / 單一工作表模式)，
+    其餘 part (sharedStrings、styles、theme、printerSettings...) 原封不動複製
+  - 字串以 inlineStr 寫入儲存格，因此不必改寫 sharedStrings.xml
+  - 置中對齊：載入時在 styles.xml 的 cellXfs 後面，為每個既有 xf 附加一份「置中」版本，
+    render 時把儲存格的 s 指到對應的置中版本 (與 openpyxl 的 Alignment(center, center) 相同效果)
+
+以 DAILY_REPORT_XLSX_ENGINE=xml 啟用 (預設仍為 openpyxl)。
+"""
+
+import io
+import logging
+import os
+import posixpath
+import re
+import threading
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape, unescape
+
+logger = logging.getLogger(__name__)
+
+_ROW_RE = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_ATTR_RE = r'\b{}="([^"]*)"'
+_REF_RE = re.compile(r'^([A-Z]+)(\d+)$')
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _get_attr(attrs: str, name: str) -> Optional[str]:
+    m = re.search(_ATTR_RE.format(re.escape(name)), attrs)
+    return m.group(1) if m else None
+
+
+def _set_attr(attrs: str, name: str, value: Optional[str]) -> str:
+    """設定/移除 (value=None) 屬性；attrs 為 tag 名稱之後的屬性字串。"""
+    pattern = r'\s+{}="[^"]*"'.format(re.escape(name))
+    attrs = re.sub(pattern, "", attrs)
+    if value is not None:
+        attrs = f'{attrs} {name}="{value}"'
+    return attrs
+
+
+def _col_index(col: str) -> int:
+    idx = 0
+    for ch in col:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    m = _REF_RE.match(ref)
+    if not m:
+        raise ValueError(f"Invalid cell reference: {ref}")
+    return int(m.group(2)), _col_index(m.group(1))
+
+
+def _cell_xml(ref: str, style: Optional[str], value: Any) -> str:
+    s_attr = f' s="{style}"' if style not in (None, "0") else ""
+    if value is None or value == "":
+        return f'<c r="{ref}"{s_attr}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{s_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{s_attr}><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{ref}"{s_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _quote_sheet_title(title: str) -> str:
+    return "'" + title.replace("'", "''") + "'"
+
+
+def _range_to_absolute(cell_range: str) -> str:
+    parts = []
+    for ref in cell_range.split(":"):
+        m = _REF_RE.match(ref)
+        parts.append(f"${m.group(1)}${m.group(2)}" if m else ref)
+    return ":".join(parts)
+
+
+class XlsxPatchTemplate:
+
+    def __init__(self, path: str):
+        self.path = path
+        st = os.stat(path)
+        self.stamp = (st.st_mtime_ns, st.st_size)
+
+        self._parts: List[Tuple[zipfile.ZipInfo, bytes]] = []
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                self._parts.append((info, zf.read(info)))
+        self._part_index = {info.filename: i for i, (info, _) in enumerate(self._parts)}
+
+        self._workbook_xml = self._read_text("xl/workbook.xml")
+        self.sheets = self._parse_sheets()            # [(title, part_name)]
+        self.sheet_names = [title for title, _ in self.sheets]
+        self._sheet_xml = {part: self._read_text(part) for _, part in self.sheets}
+
+        self._styles_xml, self._center_offset = self._build_center_styles(self._read_text("xl/styles.xml"))
+
+    # ---------------- 載入 ----------------
+
+    def _read_text(self, name: str) -> str:
+        return self._parts[self._part_index[name]][1].decode("utf-8")
+
+    def _parse_sheets(self) -> List[Tuple[str, str]]:
+        rels_xml = self._read_text("xl/_rels/workbook.xml.rels")
+        targets = {}
+        for m in re.finditer(r'<Relationship\b([^>]*)/>', rels_xml):
+            attrs = m.group(1)
+            rid = _get_attr(attrs, "Id")
+            target = _get_attr(attrs, "Target")
+            if target.startswith("/"):
+                part = target.lstrip("/")
+            else:
+                part = posixpath.normpath(posixpath.join("xl", target))
+            targets[rid] = part
+
+        sheets = []
+        for m in re.finditer(r'<sheet\b([^>]*)/>', self._workbook_xml):
+            attrs = m.group(1)
+            title = unescape(_get_attr(attrs, "name"), {"&quot;": '"', "&apos;": "'"})
+            sheets.append((title, targets[_get_attr(attrs, "r:id")]))
+        return sheets
+
+    @staticmethod
+    def _build_center_styles(styles_xml: str) -> Tuple[str, int]:
+        """
+        在 cellXfs 尾端為每個 xf 附加一份置中版本；回傳 (新 styles.xml, 原本的 xf 數量)。
+        置中版本的 index = 原 index + 原本的 xf 數量。
+        """
+        m = re.search(r'<cellXfs\b([^>]*)>(.*?)</cellXfs>', styles_xml, re.S)
+        if not m:
+            raise ValueError("styles.xml has no cellXfs")
+        xfs = re.findall(r'<xf\b[^>]*?/>|<xf\b[^>]*?>.*?</xf>', m.group(2), re.S)
+
+        centered = []
+        for xf in xfs:
+            xf = re.sub(r'<alignment\b[^>]*/>', "", xf)
+            head = re.match(r'<xf\b([^>]*?)(/?)>', xf)
+            attrs = _set_attr(head.group(1), "applyAlignment", "1")
+            alignment = '<alignment horizontal="center" vertical="center"/>'
+            if head.group(2) == "/":
+                centered.append(f"<xf{attrs}>{alignment}</xf>")
+            else:
+                centered.append(f"<xf{attrs}>{alignment}{xf[head.end():]}")
+
+        count = len(xfs)
+        new_attrs = _set_attr(m.group(1), "count", str(count * 2))
+        new_block = f"<cellXfs{new_attrs}>{m.group(2)}{''.join(centered)}</cellXfs>"
+        return styles_xml[:m.start()] + new_block + styles_xml[m.end():], count
+
+    # ---------------- render ----------------
+
+    def _patch_sheet(self, sheet_xml: str, cells: Dict[str, Tuple[Any, bool]]) -> str:
+        by_row: Dict[int, Dict[int, Tuple[str, Any, bool]]] = {}
+        for ref, (value, centered) in cells.items():
+            row, col = _split_ref(ref)
+            by_row.setdefault(row, {})[col] = (ref, value, centered)
+
+        m = re.search(r'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', sheet_xml, re.S)
+        if not m:
+            raise ValueError("worksheet has no sheetData")
+        body = m.group(1) or ""
+
+        rows = []  # [(row_num, xml)]
+        for rm in _ROW_RE.finditer(body):
+            rows.append((int(_get_attr(rm.group(1), "r")), rm.group(0)))
+        existing = {num for num, _ in rows}
+        for row_num in by_row:
+            if row_num not in existing:
+                rows.append((row_num, f'<row r="{row_num}"/>'))
+        rows.sort(key=lambda x: x[0])
+
+        out = []
+        for row_num, row_xml in rows:
+            targets = by_row.get(row_num)
+            if not targets:
+                out.append(row_xml)
+                continue
+
+            rm = _ROW_RE.match(row_xml)
+            row_attrs = _set_attr(rm.group(1), "spans", None)
+            row_cells = []  # [(col, xml)]
+            for cm in _CELL_RE.finditer(rm.group(2) or ""):
+                _, col = _split_ref(_get_attr(cm.group(1), "r"))
+                row_cells.append((col, cm.group(0), _get_attr(cm.group(1), "s")))
+
+            patched = []
+            seen = set()
+            for col, cell_xml, style in row_cells:
+                if col in targets:
+                    ref, value, centered = targets[col]
+                    patched.append((col, _cell_xml(ref, self._style(style, centered), value)))
+                    seen.add(col)
+                else:
+                    patched.append((col, cell_xml))
+            for col, (ref, value, centered) in targets.items():
+                if col not in seen:
+                    patched.append((col, _cell_xml(ref, self._style(None, centered), value)))
+            patched.sort(key=lambda x: x[0])
+
+            out.append(f"<row{row_attrs}>{''.join(x for _, x in patched)}</row>")
+
+        return sheet_xml[:m.start()] + f"<sheetData>{''.join(out)}</sheetData>" + sheet_xml[m.end():]
+
+    def _style(self, style: Optional[str], centered: bool) -> Optional[str]:
+        if not centered:
+            return style
+        base = int(style) if style else 0
+        if base >= self._center_offset:
+            return str(base)
+        return str(base + self._center_offset)
+
+    def _patch_workbook(self, print_areas: Dict[str, str], only_sheet: Optional[str]) -> str:
+        wb_xml = self._workbook_xml
+
+        # 列印範圍 (_xlnm.Print_Area, localSheetId = 工作表順序)
+        for title, cell_range in print_areas.items():
+            if title not in self.sheet_names:
+                continue
+            idx = self.sheet_names.index(title)
+            value = f"{escape(_quote_sheet_title(title))}!{_range_to_absolute(cell_range)}"
+            new_def = f'<definedName name="_xlnm.Print_Area" localSheetId="{idx}">{value}</definedName>'
+            pattern = re.compile(
+                r'<definedName\b(?=[^>]*name="_xlnm\.Print_Area")(?=[^>]*localSheetId="%d")[^>]*>.*?</definedName>' % idx,
+                re.S
+            )
+            if pattern.search(wb_xml):
+                wb_xml = pattern.sub(lambda _: new_def, wb_xml, count=1)
+            elif "<definedNames>" in wb_xml:
+                wb_xml = wb_xml.replace("<definedNames>", f"<definedNames>{new_def}", 1)
+            else:
+                wb_xml = wb_xml.replace("</sheets>", f"</sheets><definedNames>{new_def}</definedNames>", 1)
+
+        # 單一工作表模式：其他工作表設為 hidden (LibreOffice 不會輸出 hidden sheet)
+        if only_sheet is not None:
+            target_idx = self.sheet_names.index(only_sheet)
+            counter = iter(range(len(self.sheets)))
+
+            def _sheet_sub(m):
+                i = next(counter)
+                attrs = _set_attr(m.group(1), "state", None if i == target_idx else "hidden")
+                return f"<sheet{attrs}/>"
+
+            wb_xml = re.sub(r'<sheet\b([^>]*?)\s*/>', _sheet_sub, wb_xml)
+            wb_xml = re.sub(
+                r'<workbookView\b([^>]*?)(/?)>',
+                lambda m: "<workbookView{}{}>".format(
+                    _set_attr(_set_attr(m.group(1), "firstSheet", None), "activeTab", str(target_idx)),
+                    m.group(2)
+                ),
+                wb_xml
+            )
+        return wb_xml
+
+    def render(self, cell_values: Dict[str, Dict[str, Tuple[Any, bool]]],
+               print_areas: Optional[Dict[str, str]] = None, only_sheet: Optional[str] = None) -> bytes:
+        """
+        cell_values: {工作表名稱: {cell_ref: (value, 是否置中)}}
+        print_areas: {工作表名稱: "A1:L46"}
+        only_sheet : 指定時其餘工作表設為 hidden (供轉單一工作表 PDF)
+        回傳完整 xlsx 的 bytes。
+        """
+        replaced = {
+            "xl/styles.xml": self._styles_xml.encode("utf-8"),
+            "xl/workbook.xml": self._patch_workbook(print_areas or {}, only_sheet).encode("utf-8"),
+        }
+        sheet_parts = dict(self.sheets)
+        for title, cells in cell_values.items():
+            if title not in sheet_parts or not cells:
+                continue
+            part = sheet_parts[title]
+            replaced[part] = self._patch_sheet(self._sheet_xml[part], cells).encode("utf-8")
+
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as out:
+            for info, data in self._parts:
+                out.writestr(info, replaced.get(info.filename, data))
+        return buf.getvalue()
+
+
+_templates: Dict[str, XlsxPatchTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_patch_template(path: str) -> XlsxPatchTemplate:
+    """
+    取得 (per-process 快取的) patch 模板；模板檔有變更時重新載入。
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    tpl = _templates.get(path)
+    if tpl is not None and tpl.stamp == stamp:
+        return tpl
+
+    with _templates_lock:
+        tpl = _templates.get(path)
+        if tpl is None or tpl.stamp != stamp:
+            tpl = XlsxPatchTemplate(path)
+            _templates[path] = tpl
+            logger.info("[XlsxPatchTemplate] loaded template %s", path)
+    return tpl
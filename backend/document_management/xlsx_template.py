@@ -0,0 +1,72 @@
+# backend/document_management/xlsx_template.py
+
+"""
+常駐記憶體的 XLSX 模板。
+
+原本每次產生日報都 `shutil.copy` 模板再 `load_workbook` 從磁碟 parse 一次，是 XLSX render 最慢的部分。
+這裡每個 worker process 只 parse 模板一次，保留一份 pristine workbook 的 pickle，
+每次 render 以 pickle.loads 複製 (比重新 parse XML 快一個數量級)，原始模板永遠不會被修改。
+模板檔 mtime/size 改變時會自動重新載入。
+"""
+
+import io
+import logging
+import os
+import pickle
+import threading
+from typing import Dict, Optional
+
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+
+class WorkbookTemplate:
+
+    def __init__(self, path: str):
+        self.path = path
+        st = os.stat(path)
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        with open(path, "rb") as f:
+            self.raw_bytes = f.read()
+
+        wb = load_workbook(io.BytesIO(self.raw_bytes))
+        try:
+            self._pickled: Optional[bytes] = pickle.dumps(wb, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            # 理論上 openpyxl workbook 皆可 pickle；萬一不行就退回「從記憶體 bytes 重新 parse」
+            logger.warning("[WorkbookTemplate] cannot pickle %s (%s); falling back to load_workbook", path, e)
+            self._pickled = None
+        finally:
+            wb.close()
+
+    def clone(self):
+        """
+        回傳一份可自由修改的 workbook (不影響模板本身)。
+        """
+        if self._pickled is not None:
+            return pickle.loads(self._pickled)
+        return load_workbook(io.BytesIO(self.raw_bytes))
+
+
+_templates: Dict[str, WorkbookTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_workbook_template(path: str) -> WorkbookTemplate:
+    """
+    取得 (per-process 快取的) 模板；模板檔有變更時重新載入。
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    tpl = _templates.get(path)
+    if tpl is not None and tpl.stamp == stamp:
+        return tpl
+
+    with _templates_lock:
+        tpl = _templates.get(path)
+        if tpl is None or tpl.stamp != stamp:
+            tpl = WorkbookTemplate(path)
+            _templates[path] = tpl
+            logger.info("[WorkbookTemplate] loaded template %s", path)
+    return tpl
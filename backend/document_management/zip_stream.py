@@ -0,0 +1,60 @@
+# backend/document_management/zip_stream.py
+
+"""
+邊產生邊送出的 ZIP (streaming)。
+
+zipfile 寫入不可 seek 的 stream 時會自動改用 data descriptor (每個 entry 寫完才補上 CRC / 大小)，
+因此可以一個 entry 一個 entry 地把壓好的 bytes 交給 HTTP response，
+server 端不需要先把整個 ZIP 寫到磁碟，瀏覽器也能馬上開始收資料。
+"""
+
+import io
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+_COPY_CHUNK = 1024 * 1024
+
+
+class _StreamBuffer(io.RawIOBase):
+    """
+    只能寫、不能 seek 的 buffer；zipfile 寫進來的 bytes 由 drain() 取走。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_stream(entries: Iterable[Tuple[str, str]],
+                    compression: int = zipfile.ZIP_DEFLATED) -> Iterator[bytes]:
+    """
+    entries: (ZIP 內檔名, 本機檔案路徑) 的 iterable，可以是 generator (render 完一筆才給一筆)。
+    yield ZIP 的 bytes 片段；最後一段是 central directory。
+    """
+    buf = _StreamBuffer()
+    with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+        for arcname, path in entries:
+            with open(path, "rb") as src, zf.open(arcname, "w") as dst:
+                for block in iter(lambda: src.read(_COPY_CHUNK), b""):
+                    dst.write(block)
+                    data = buf.drain()
+                    if data:
+                        yield data
+            data = buf.drain()
+            if data:
+                yield data
+    data = buf.drain()
+    if data:
+        yield data
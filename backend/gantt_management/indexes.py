@@ -0,0 +1,33 @@
+# backend/gantt_management/indexes.py
+
+"""
+gantt blueprint 的索引宣告 (見 backend/indexes.py)。
+
+gantt_tasks 的 (project_id, id) 不設 unique：reassign-ids 逐筆改 id，過程中會暫時重複。
+"""
+
+from pymongo import ASCENDING
+
+from backend.indexes import index, query
+
+INDEXES = [
+    # 專案的任務列表 (依 id 排序) / 單筆任務 / 父任務彙總時載入整個任務樹 (task_tree.py)
+    index("gantt_tasks", [("project_id", ASCENDING), ("id", ASCENDING)]),
+    index("gantt_snapshots", [("project_id", ASCENDING), ("snapshot_date", ASCENDING)]),
+    index("gantt_holidays", "project_id"),
+]
+
+QUERIES = [
+    query("GET /api/projects/<project_id>/gantt/tasks", "gantt_tasks",
+          {"project_id": 1}, sort=[("id", ASCENDING)]),
+    query("GET /api/projects/<project_id>/gantt/schedule", "gantt_tasks", {"project_id": 1}),
+    query("PUT|DELETE /api/projects/<project_id>/gantt/tasks/<task_id>", "gantt_tasks",
+          {"project_id": 1, "id": 1}),
+    query("POST|PUT|DELETE /api/projects/<project_id>/gantt/tasks[/batch] (task tree load)", "gantt_tasks",
+          {"project_id": 1}),
+    query("GET /api/projects/<project_id>/gantt/snapshots", "gantt_snapshots",
+          {"project_id": 1}, sort=[("snapshot_date", ASCENDING)]),
+    query("PUT|DELETE /api/projects/<project_id>/gantt/snapshots/<snapshot_date>", "gantt_snapshots",
+          {"project_id": 1, "snapshot_date": "2024-01-01"}),
+    query("GET|PUT /api/projects/<project_id>/gantt/holidays", "gantt_holidays", {"project_id": 1}),
+]
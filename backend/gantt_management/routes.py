@@ -3,6 +3,7 @@
 import logging
 from datetime import datetime, date
 from flask import Blueprint, request, jsonify, abort
+from werkzeug.exceptions import HTTPException
 
 from backend.gantt_management.services import (
     create_gantt_task,
@@ -17,6 +18,9 @@ from backend.gantt_management.services import (
     update_gantt_snapshot,
     delete_gantt_snapshot,
     reassign_task_ids,
+    apply_gantt_task_batch,
+    GanttBatchError,
+    get_gantt_schedule,
 )
 from backend.db import to_iso_datetime, mongo
 
@@ -126,6 +130,40 @@ def remove_task(project_id, task_id):
         return jsonify({"error": str(ex)}), 500
 
 
+@gantt_bp.route("/<int:project_id>/gantt/tasks/batch", methods=["POST"])
+def batch_tasks(project_id):
+    """
+    批次新增 / 修改 / 刪除任務 (匯入排程用)，整批成功或整批不寫入
+    body JSON: {
+      "operations": [
+        {"op": "create", "client_id": "tmp-1", "text": "...", "start_date": "2025-01-15", "duration": 5,
+         "parent_id": null, "depends": []},
+        {"op": "create", "client_id": "tmp-2", "text": "...", "start_date": "2025-01-20", "duration": 2,
+         "parent_id": "tmp-1", "depends": ["tmp-1", 3]},
+        {"op": "update", "id": 12, "progress": 0.5},
+        {"op": "delete", "id": 13}
+      ]
+    }
+    client_id 為前端暫定 ID，同一批的 parent_id / depends / id 可引用；回應的 created 為 client_id => 正式 ID。
+    任一項目無效 => 400，errors 為 [{"index": i, "error": "..."}]。
+    """
+    data = request.json or {}
+    snapshot_date_str = request.args.get("snapshot_date", "").strip()
+    try:
+        result = apply_gantt_task_batch(project_id, data.get("operations"), snapshot_date_str)
+        return jsonify(dict(result, message="Batch applied")), 200
+    except GanttBatchError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except HTTPException:
+        # find_one_or_404 (snapshot 不存在) => 交給 app 的 errorhandler 回 404
+        raise
+    except Exception as ex:
+        logger.exception("batch_tasks error:")
+        return jsonify({"error": str(ex)}), 500
+
+
 # ★★★ 新增：清空所有任務 (可支援當前最新或指定snapshot) ★★★
 @gantt_bp.route("/<int:project_id>/gantt/tasks/clear", methods=["DELETE"])
 def clear_all_tasks(project_id):
@@ -177,6 +215,30 @@ def reassign_ids(project_id):
         return jsonify({"error": str(ex)}), 500
 
 
+# --------------------------------------------------------------------------------
+# 排程 (CPM)
+# --------------------------------------------------------------------------------
+
+@gantt_bp.route("/<int:project_id>/gantt/schedule", methods=["GET"])
+def get_schedule(project_id):
+    """
+    GET /api/projects/{project_id}/gantt/schedule(?snapshot_date=xxxx-xx-xx)
+    依 depends 與假日設定計算每個任務的最早 / 最晚開始與完成、total float (工作日) 與要徑 (critical_path)。
+    只計算，不會修改任務日期；depends 成環 => 400。
+    """
+    snapshot_date_str = request.args.get("snapshot_date", "").strip()
+    try:
+        return jsonify(get_gantt_schedule(project_id, snapshot_date_str)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except HTTPException:
+        # find_one_or_404 (snapshot 不存在) => 交給 app 的 errorhandler 回 404
+        raise
+    except Exception as ex:
+        logger.exception("get_schedule error:")
+        return jsonify({"error": str(ex)}), 500
+
+
 # --------------------------------------------------------------------------------
 # 版本快照
 # --------------------------------------------------------------------------------
@@ -0,0 +1,242 @@
+# backend/gantt_management/scheduling.py
+
+"""
+依 depends 的排程 (CPM, critical path method)。
+
+網路圖 (activity-on-node)：
+  - 一般任務 / milestone：一個節點，工期 = 原本 start ~ end 之間的工作日數 (milestone 為 0，其餘至少 1)
+  - 父任務 (有子任務者)：拆成「開始」「結束」兩個 0 工期節點，
+    開始 -> 每個子任務的開始、每個子任務的結束 -> 結束，所以父任務的期間由子任務決定
+  - A.depends 含 B：B 的結束 -> A 的開始 (finish-to-start)
+時間以工作日 index (見 work_calendar.py) 計算，非工作日自動跳過。
+
+  - forward pass：ES = max(任務原本的開始日, 所有前置任務的 EF)，EF = ES + 工期
+    (原本的開始日視為「不早於」限制；沒有前置的任務就留在原位)
+  - backward pass：LF = min(後續任務的 LS)，沒有後續者為專案完工日；LS = LF - 工期
+  - total float = LS - ES；float 為 0 的即為要徑 (critical path) 上的任務
+index k 是「第 k 個工作日開始時」：開始日 = 第 ES 個工作日，完成日 = 第 EF - 1 個工作日。
+milestone 沒有工期，只是兩個工作日之間的一個時間點 (index k = 第 k - 1 個工作日結束時)：
+  - 最早日期：被前置任務推遲者 (ES 大於原本的日期) 報在前置任務完工的那天 (第 ES - 1 個工作日)，
+    否則報在原本的日期 (即使那天不是工作日)
+  - 最晚日期：沒有 float 時同最早日期，否則報在第 LF - 1 個工作日
+所以 milestone 的最晚日期不會晚於 project_finish。
+父任務的完成日與 project_finish 取 (子) 任務回報的最晚完成日。
+
+拓撲排序 (Kahn) 與兩次 pass 都只走過每個節點 / 每條邊一次，整體為 O(任務數 + 相依數)。
+depends 成環時擲 ValueError；指向不存在任務的 depends 直接忽略 (回傳中計數)。
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from backend.gantt_management.work_calendar import WorkCalendar
+
+# 原始日期無法解析時的預設 (與 parse_date_str 的預設相同)
+_DEFAULT_START = date(2025, 1, 1)
+
+
+def _to_date(value: Any, default: Optional[date]) -> Optional[date]:
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return default
+
+
+def compute_schedule(tasks: List[dict], calendar: WorkCalendar) -> Dict[str, Any]:
+    """
+    tasks 為 gantt 任務 dict (需有 id / parent_id / depends / start_date / end_date / type)。
+    回傳：
+    {
+      "project_start": "YYYY-MM-DD", "project_finish": "YYYY-MM-DD",
+      "critical_path": [task_id, ...],          # 依最早開始排序
+      "tasks": [{"id", "duration", "early_start", "early_finish", "late_start", "late_finish",
+                 "total_float", "critical", "is_summary"}, ...],
+      "ignored_dependencies": n
+    }
+    duration / total_float 的單位是工作日。
+    """
+    by_id = {t["id"]: t for t in tasks if "id" in t}
+    if not by_id:
+        return {"project_start": None, "project_finish": None, "critical_path": [],
+                "tasks": [], "ignored_dependencies": 0}
+
+    children: Dict[Any, List[Any]] = {}
+    for t in by_id.values():
+        parent_id = t.get("parent_id")
+        if parent_id is not None and parent_id != t["id"] and parent_id in by_id:
+            children.setdefault(parent_id, []).append(t["id"])
+    has_children = set(children)
+
+    # ---------------- 節點 ----------------
+    durations: List[int] = []
+    lower_bounds: List[Optional[int]] = []
+    start_node: Dict[Any, int] = {}
+    finish_node: Dict[Any, int] = {}
+    milestone_dates: Dict[int, date] = {}   # milestone 節點 => 原本的日期
+
+    for task_id, t in by_id.items():
+        if task_id in has_children:
+            start_node[task_id] = len(durations)
+            durations.append(0)
+            lower_bounds.append(None)
+            finish_node[task_id] = len(durations)
+            durations.append(0)
+            lower_bounds.append(None)
+            continue
+
+        start = _to_date(t.get("start_date"), _DEFAULT_START)
+        end = _to_date(t.get("end_date"), start)
+        node = len(durations)
+        if t.get("type") == "milestone":
+            duration = 0
+            milestone_dates[node] = start
+        else:
+            duration = max(1, calendar.workdays_between(start, end))
+        start_node[task_id] = finish_node[task_id] = node
+        durations.append(duration)
+        lower_bounds.append(calendar.workday_index(start))
+
+    node_count = len(durations)
+    leaf_bounds = [b for b in lower_bounds if b is not None]
+    project_start_index = min(leaf_bounds) if leaf_bounds else 0
+
+    # ---------------- 邊 ----------------
+    successors: List[List[int]] = [[] for _ in range(node_count)]
+    indegree = [0] * node_count
+    ignored = 0
+
+    def add_edge(u: int, v: int):
+        successors[u].append(v)
+        indegree[v] += 1
+
+    for task_id, t in by_id.items():
+        parent_id = t.get("parent_id")
+        if parent_id in has_children and parent_id != task_id:
+            add_edge(start_node[parent_id], start_node[task_id])
+            add_edge(finish_node[task_id], finish_node[parent_id])
+        for dep in t.get("depends") or []:
+            if dep in by_id and dep != task_id:
+                add_edge(finish_node[dep], start_node[task_id])
+            else:
+                ignored += 1
+
+    # ---------------- 拓撲排序 (Kahn) ----------------
+    order = [v for v in range(node_count) if indegree[v] == 0]
+    remaining = list(indegree)
+    i = 0
+    while i < len(order):
+        for w in successors[order[i]]:
+            remaining[w] -= 1
+            if remaining[w] == 0:
+                order.append(w)
+        i += 1
+
+    if len(order) < node_count:
+        stuck = {v for v in range(node_count) if remaining[v] > 0}
+        cyclic_ids = [tid for tid in by_id if start_node[tid] in stuck or finish_node[tid] in stuck]
+        raise ValueError(f"Dependency cycle detected among tasks: {cyclic_ids[:20]}")
+
+    # ---------------- forward pass ----------------
+    es = [b if b is not None else project_start_index for b in lower_bounds]
+    ef = [0] * node_count
+    for v in order:
+        ef[v] = es[v] + durations[v]
+        for w in successors[v]:
+            if ef[v] > es[w]:
+                es[w] = ef[v]
+
+    project_finish_index = max(ef)
+
+    # ---------------- backward pass ----------------
+    lf = [project_finish_index] * node_count
+    ls = [0] * node_count
+    for v in reversed(order):
+        for w in successors[v]:
+            if ls[w] < lf[v]:
+                lf[v] = ls[w]
+        ls[v] = lf[v] - durations[v]
+
+    # 父任務的開始節點只是 0 工期的掛點，實際的最早 / 最晚開始取子任務中最早者
+    # (子任務的開始節點在拓撲順序中較後面，反向走訪時會先算好)
+    summary_es: Dict[Any, int] = {}
+    summary_ls: Dict[Any, int] = {}
+    summary_by_start = {start_node[tid]: tid for tid in has_children}
+    for v in reversed(order):
+        parent_id = summary_by_start.get(v)
+        if parent_id is None:
+            continue
+        child_es, child_ls = [], []
+        for child_id in children[parent_id]:
+            child_es.append(summary_es.get(child_id, es[start_node[child_id]]))
+            child_ls.append(summary_ls.get(child_id, ls[start_node[child_id]]))
+        summary_es[parent_id] = min(child_es)
+        summary_ls[parent_id] = min(child_ls)
+
+    # ---------------- 結果 ----------------
+    def start_date_of(index: int) -> str:
+        return calendar.date_of_index(index).isoformat()
+
+    def finish_date_of(start_index: int, finish_index: int) -> str:
+        # 工期 0 (milestone) 的完成日即開始日
+        return calendar.date_of_index(max(start_index, finish_index - 1)).isoformat()
+
+    results = []
+    critical = []
+    for task_id in by_id:
+        f = finish_node[task_id]
+        early_start = summary_es.get(task_id, es[start_node[task_id]])
+        late_start = summary_ls.get(task_id, ls[start_node[task_id]])
+        total_float = min(late_start - early_start, lf[f] - ef[f])
+        is_critical = total_float <= 0
+        is_summary = task_id in has_children
+        if f in milestone_dates:
+            if es[f] > lower_bounds[f]:
+                # 被前置任務推遲：在前置任務完工當天達成
+                early_start_date = start_date_of(es[f] - 1)
+            else:
+                early_start_date = milestone_dates[f].isoformat()
+            # 最晚日期與最早日期用同一個「點」的規則：LF 是第 LF - 1 個工作日結束時
+            late_start_date = early_start_date if lf[f] <= es[f] else start_date_of(lf[f] - 1)
+            early_finish_date = early_start_date
+            late_finish_date = late_start_date
+        else:
+            early_start_date = start_date_of(early_start)
+            early_finish_date = finish_date_of(early_start, ef[f])
+            late_start_date = start_date_of(late_start)
+            late_finish_date = finish_date_of(late_start, lf[f])
+        results.append({
+            "id": task_id,
+            "duration": ef[f] - early_start,
+            "early_start": early_start_date,
+            "early_finish": early_finish_date,
+            "late_start": late_start_date,
+            "late_finish": late_finish_date,
+            "total_float": total_float,
+            "critical": is_critical,
+            "is_summary": is_summary,
+        })
+        if is_critical and not is_summary:
+            critical.append((early_start, ef[f], task_id))
+
+    # 父任務的完成日取子任務回報的最晚完成日 (子任務結束節點在拓撲順序中較前面，先算好)
+    result_by_id = {r["id"]: r for r in results}
+    summary_by_finish = {finish_node[tid]: tid for tid in has_children}
+    for v in order:
+        parent_id = summary_by_finish.get(v)
+        if parent_id is None:
+            continue
+        parent = result_by_id[parent_id]
+        for key in ("early_finish", "late_finish"):
+            parent[key] = max(result_by_id[c][key] for c in children[parent_id])
+
+    critical.sort(key=lambda item: (item[0], item[1]))
+    return {
+        "project_start": start_date_of(project_start_index),
+        # ISO 日期字串可直接比較大小
+        "project_finish": max(r["early_finish"] for r in results),
+        "critical_path": [task_id for _, _, task_id in critical],
+        "tasks": results,
+        "ignored_dependencies": ignored,
+    }
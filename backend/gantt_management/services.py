@@ -1,12 +1,17 @@
 # backend/gantt_management/services.py
 
 import math
+import os
 import logging
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, Optional, List
 from bson.objectid import ObjectId
+from pymongo import DeleteOne, InsertOne, UpdateOne
 
-from backend.db import mongo, get_next_sequence, parse_date_str, normalize_progress, find_all_and_format, find_one_or_404
+from backend.db import mongo, get_next_sequence, id_allocator, parse_date_str, normalize_progress, find_all_and_format, find_one_or_404
+from backend.gantt_management.task_tree import TaskTree, load_task_tree, rollup_update_ops
+from backend.gantt_management.scheduling import compute_schedule
+from backend.gantt_management.work_calendar import WorkCalendar
 
 logger = logging.getLogger(__name__)
 
@@ -18,9 +23,12 @@ logger = logging.getLogger(__name__)
 def get_all_tasks_for_project(project_id: int):
     """
     查詢當前最新資料(不含版本快照)的 tasks。
+    工作天 (duration_type == "business") 專案的 duration 以工作日曆計算。
     """
+    calendar = get_duration_calendar(project_id)
+
     def format_task(doc):
-        return _format_task_doc(doc)
+        return _format_task_doc(doc, calendar)
     
     return find_all_and_format(
         collection="gantt_tasks",
@@ -29,13 +37,13 @@ def get_all_tasks_for_project(project_id: int):
     )
 
 
-def create_gantt_task(data: Dict[str, Any], snapshot_date_str: str = "") -> int:
+def _build_new_task(data: Dict[str, Any], task_id: Optional[int],
+                    calendar: Optional[WorkCalendar] = None) -> Dict[str, Any]:
     """
-    新增一筆任務（至最新或指定 snapshot）。
-    - 若 snapshot_date_str 有值 => 直接操作該 snapshot 的 tasks (in-memory + update snapshot)
-    - 否則 => 建立於 gantt_tasks 集合中。
+    依 create body 建立新任務 document (單筆新增與批次新增共用)；缺日期時擲 ValueError。
+    task_id 可先給 None，驗證通過、取得序號後再填入。
+    calendar 不為 None (工作天專案) 時，duration 以工作日計算結束日。
     """
-    project_id = data["project_id"]
     text = data.get("text", "Unnamed Task")
     start_date_str = data.get("start_date")
     end_date_str = data.get("end_date")
@@ -59,7 +67,7 @@ def create_gantt_task(data: Dict[str, Any], snapshot_date_str: str = "") -> int:
             end_dt = start_dt + timedelta(days=1)
     else:
         if duration:
-            end_dt = start_dt + timedelta(days=duration - 1)
+            end_dt = _end_after_duration(start_dt, _validate_duration(duration), calendar)
         else:
             end_dt = start_dt + timedelta(days=1)
 
@@ -72,11 +80,42 @@ def create_gantt_task(data: Dict[str, Any], snapshot_date_str: str = "") -> int:
     if task_type == "milestone":
         end_dt = start_dt
 
-    # progress
-    progress_val = normalize_progress(progress)
+    return {
+        "id": task_id,
+        "project_id": data["project_id"],
+        "text": text,
+        "start_date": start_dt.date().isoformat(),
+        "end_date": end_dt.date().isoformat(),
+        "progress": normalize_progress(progress),
+        "parent_id": parent_id,
+        "depends": depends,
+        "type": task_type,
+        "created_at": datetime.now(),
+    }
+
+
+def _next_snapshot_task_id(tasks_list: List[dict]) -> int:
+    # snapshot 內的暫定 ID => 當前 tasks_list 的 max id + 1
+    max_id = 0
+    for t in tasks_list:
+        if t["id"] > max_id:
+            max_id = t["id"]
+    return max_id + 1
+
+
+def create_gantt_task(data: Dict[str, Any], snapshot_date_str: str = "") -> int:
+    """
+    新增一筆任務（至最新或指定 snapshot）。
+    - 若 snapshot_date_str 有值 => 直接操作該 snapshot 的 tasks (in-memory + update snapshot)
+    - 否則 => 建立於 gantt_tasks 集合中。
+    """
+    project_id = data["project_id"]
 
     # 如果是 snapshot 模式 => 先讀出 tasks array，再 in-memory 新增
     if snapshot_date_str:
+        # 先驗證 body (無效即擲 ValueError)，再讀 snapshot
+        new_task = _build_new_task(data, None, _calendar_for_body(project_id, data))
+
         # 使用 find_one_or_404 函數查詢
         snap_doc = find_one_or_404(
             "gantt_snapshots",
@@ -88,70 +127,45 @@ def create_gantt_task(data: Dict[str, Any], snapshot_date_str: str = "") -> int:
         )
 
         tasks_list = snap_doc.get("tasks", [])
+        tree = TaskTree(tasks_list)
 
-        # 產生一個新的暫定 ID => 找當前 tasks_list 的 max id
-        max_id = 0
-        for t in tasks_list:
-            if t["id"] > max_id:
-                max_id = t["id"]
-        new_id = max_id + 1
-
-        new_task = {
-            "id": new_id,
-            "project_id": project_id,
-            "text": text,
-            "start_date": start_dt.date().isoformat(),
-            "end_date": end_dt.date().isoformat(),
-            "progress": progress_val,
-            "parent_id": parent_id,
-            "depends": depends,
-            "type": task_type,
-            "created_at": datetime.now(),
-        }
+        new_id = _next_snapshot_task_id(tasks_list)
+        new_task["id"] = new_id
         tasks_list.append(new_task)
+        tree.add(new_task)
 
-        # 接著更新 snapshot doc
-        # 先寫回 tasks_list (未計算父任務), 再進行父任務的自動更新
+        # ★重新計算父任務 (in-memory)，與新任務一起寫回 snapshot
+        tree.recalc()
         mongo.db["gantt_snapshots"].update_one(
             {"_id": snap_doc["_id"]},
             {"$set": {"tasks": tasks_list}}
         )
 
-        # ★重新計算父任務
-        _recalc_parent_chain_in_snapshot(project_id, new_id, snapshot_date_str)
-
         return new_id
 
     else:
-        # 建立於 gantt_tasks 集合
+        # 建立於 gantt_tasks 集合 (先驗證 body 再取序號)
+        task_doc = _build_new_task(data, None, _calendar_for_body(project_id, data))
         new_task_id = get_next_sequence("gantt_tasks")
-        task_doc = {
-            "id": new_task_id,
-            "project_id": project_id,
-            "text": text,
-            "start_date": start_dt.date().isoformat(),
-            "end_date": end_dt.date().isoformat(),
-            "progress": progress_val,
-            "parent_id": parent_id,
-            "depends": depends,
-            "type": task_type,
-            "created_at": datetime.now(),
-        }
-        mongo.db["gantt_tasks"].insert_one(task_doc)
-
-        # 重新計算父任務
-        _recalc_parent_chain_in_db(project_id, new_task_id)
+        task_doc["id"] = new_task_id
+        ops = [InsertOne(task_doc)]
 
+        # 重新計算父任務 (沒有 parent 就不必載入任務樹)
+        if task_doc["parent_id"] is not None:
+            tree = load_task_tree(project_id)
+            tree.add(task_doc)
+            ops.extend(rollup_update_ops(tree.recalc()))
+
+        mongo.db["gantt_tasks"].bulk_write(ops)
         return new_task_id
 
 
-def update_gantt_task(task_id: int, data: Dict[str, Any], snapshot_date_str: str = ""):
+def _build_task_update(doc: Dict[str, Any], data: Dict[str, Any],
+                       calendar: Optional[WorkCalendar] = None) -> Dict[str, Any]:
     """
-    更新任務；若 snapshot_date_str 有值 => 更新 snapshot tasks
-              否則更新 gantt_tasks 集合
+    依 update body 算出要 $set 的欄位 (snapshot 與 gantt_tasks 共用)。
+    calendar 同 _build_new_task。
     """
-    project_id = data["project_id"]
-
     start_date_str = data.get("start_date")
     end_date_str = data.get("end_date")
     duration = data.get("duration")
@@ -160,6 +174,67 @@ def update_gantt_task(task_id: int, data: Dict[str, Any], snapshot_date_str: str
     depends = data.get("depends") if "depends" in data else None
     task_type = data.get("type", None)  # 可能是 "project"|"milestone"|"task"
 
+    update_fields = {}
+
+    if data.get("text") is not None:
+        update_fields["text"] = data["text"]
+
+    if progress is not None:
+        update_fields["progress"] = normalize_progress(progress)
+
+    if parent_id is not None:
+        update_fields["parent_id"] = parent_id
+    if depends is not None:
+        update_fields["depends"] = depends
+
+    old_start_str = doc.get("start_date", "")
+    old_end_str = doc.get("end_date", "")
+    old_start_dt = parse_date_str(old_start_str, "2025-01-01")
+    old_end_dt = parse_date_str(old_end_str, None)
+
+    if start_date_str or end_date_str or duration is not None:
+        start_dt = old_start_dt
+        end_dt = old_end_dt if old_end_dt else (old_start_dt + timedelta(days=1))
+
+        if start_date_str:
+            start_dt = parse_date_str(start_date_str, "2025-01-01")
+        if end_date_str:
+            end_dt = parse_date_str(end_date_str, None)
+            if end_dt is None:
+                end_dt = start_dt + timedelta(days=1)
+        elif duration is not None:
+            end_dt = _end_after_duration(start_dt, _validate_duration(duration), calendar)
+
+        if end_dt < start_dt:
+            end_dt = start_dt + timedelta(days=1)
+
+        # 若 type=milestone => 令 start==end
+        the_type = task_type or doc.get("type", "task")
+        if the_type == "milestone":
+            end_dt = start_dt
+
+        update_fields["start_date"] = start_dt.date().isoformat()
+        update_fields["end_date"] = end_dt.date().isoformat()
+
+    if task_type:
+        update_fields["type"] = task_type
+        # 如果是 milestone, 要強制同一天
+        if task_type == "milestone":
+            sdt = parse_date_str(update_fields.get("start_date") or old_start_str, "2025-01-01")
+            update_fields["end_date"] = sdt.date().isoformat()
+
+    update_fields["updated_at"] = datetime.now()
+    return update_fields
+
+
+def update_gantt_task(task_id: int, data: Dict[str, Any], snapshot_date_str: str = ""):
+    """
+    更新任務；若 snapshot_date_str 有值 => 更新 snapshot tasks
+              否則更新 gantt_tasks 集合
+    兩者都是：一次讀出所有任務建成 TaskTree => 記憶體中更新並重算父任務 => 一次寫回。
+    """
+    project_id = data["project_id"]
+
     if snapshot_date_str:
         # 更新快照 in memory
         snap = find_one_or_404(
@@ -172,152 +247,270 @@ def update_gantt_task(task_id: int, data: Dict[str, Any], snapshot_date_str: str
         )
 
         tasks_list = snap.get("tasks", [])
-        # 找到該task
-        found_index = -1
-        for i, t in enumerate(tasks_list):
-            if t["id"] == task_id:
-                found_index = i
-                break
-        if found_index < 0:
+        tree = TaskTree(tasks_list)
+        doc = tree.get(task_id)
+        if doc is None:
             raise KeyError("Task not found in snapshot")
 
-        updated_doc = dict(tasks_list[found_index])  # copy
-
-        # 更新字段
-        if data.get("text") is not None:
-            updated_doc["text"] = data["text"]
-
-        if progress is not None:
-            updated_doc["progress"] = normalize_progress(progress)
+        tree.update(task_id, _build_task_update(doc, data, _calendar_for_body(project_id, data)))
+        tree.recalc()
 
-        if parent_id is not None:
-            updated_doc["parent_id"] = parent_id
-
-        if depends is not None:
-            updated_doc["depends"] = depends
+        mongo.db["gantt_snapshots"].update_one(
+            {"_id": snap["_id"]},
+            {"$set": {"tasks": tasks_list}}
+        )
 
-        # start/end/duration
-        old_start = parse_date_str(updated_doc.get("start_date", ""), "2025-01-01")
-        old_end = parse_date_str(updated_doc.get("end_date", ""), None)
-        if start_date_str or end_date_str or duration is not None:
-            start_dt = old_start
-            end_dt = old_end if old_end else (old_start + timedelta(days=1))
+    else:
+        # 更新 DB
+        tree = load_task_tree(project_id)
+        doc = tree.get(task_id)
+        if doc is None:
+            raise KeyError("Task not found")
 
-            if start_date_str:
-                start_dt = parse_date_str(start_date_str, "2025-01-01")
-            if end_date_str:
-                end_dt = parse_date_str(end_date_str, None)
-                if end_dt is None:
-                    end_dt = start_dt + timedelta(days=1)
-            elif duration is not None:
-                end_dt = start_dt + timedelta(days=duration - 1)
+        update_fields = _build_task_update(doc, data, _calendar_for_body(project_id, data))
+        tree.update(task_id, update_fields)
 
-            if end_dt < start_dt:
-                end_dt = start_dt + timedelta(days=1)
+        # 任務本身 + 有變動的父任務，一次 bulk_write
+        ops = [UpdateOne({"_id": doc["_id"]}, {"$set": update_fields})]
+        ops.extend(rollup_update_ops(tree.recalc(now=update_fields["updated_at"])))
+        mongo.db["gantt_tasks"].bulk_write(ops)
 
-            # 若 type=milestone => 令 start==end
-            the_type = task_type or updated_doc.get("type", "task")
-            if the_type == "milestone":
-                end_dt = start_dt
 
-            updated_doc["start_date"] = start_dt.date().isoformat()
-            updated_doc["end_date"] = end_dt.date().isoformat()
+def delete_gantt_task(project_id: int, task_id: int, snapshot_date_str: str = ""):
+    """
+    刪除任務；若 snapshot_date_str 有值 => 在 snapshot 中刪
+             否則在 DB 中刪
+    刪除後原本的父任務會重新彙總。
+    """
+    if snapshot_date_str:
+        snap = find_one_or_404(
+            "gantt_snapshots",
+            {
+                "project_id": project_id,
+                "snapshot_date": snapshot_date_str
+            },
+            "Snapshot not found"
+        )
 
-        # type
-        if task_type:
-            updated_doc["type"] = task_type
-            # 如果是 milestone, 要強制同一天
-            if task_type == "milestone":
-                sdt = parse_date_str(updated_doc["start_date"], "2025-01-01")
-                updated_doc["end_date"] = sdt.date().isoformat()
+        tasks_list = snap.get("tasks", [])
+        tree = TaskTree(tasks_list)
+        if tree.get(task_id) is None:
+            raise KeyError("Task not found")
 
-        updated_doc["updated_at"] = datetime.now()
+        tree.remove(task_id)
+        tree.recalc()
+        new_tasks_list = [t for t in tasks_list if t["id"] != task_id]
 
-        # 更新回 tasks_list
-        tasks_list[found_index] = updated_doc
-        # 先寫回
+        # 寫回 snapshot
         mongo.db["gantt_snapshots"].update_one(
             {"_id": snap["_id"]},
-            {"$set": {"tasks": tasks_list}}
+            {"$set": {"tasks": new_tasks_list}}
         )
 
-        # 再重新計算父任務
-        _recalc_parent_chain_in_snapshot(project_id, task_id, snapshot_date_str)
-
     else:
-        # 更新 DB
-        # 使用 find_one_or_404 函數查詢
-        doc = find_one_or_404(
-            "gantt_tasks", 
-            {"id": task_id, "project_id": project_id},
-            "Task not found"
-        )
+        tree = load_task_tree(project_id)
+        if tree.get(task_id) is None:
+            raise KeyError("Task not found")
 
-        update_fields = {}
+        removed = tree.remove(task_id)
+        ops = [DeleteOne({"_id": removed["_id"]})]
+        ops.extend(rollup_update_ops(tree.recalc()))
+        mongo.db["gantt_tasks"].bulk_write(ops)
 
-        if data.get("text") is not None:
-            update_fields["text"] = data["text"]
 
-        if progress is not None:
-            update_fields["progress"] = normalize_progress(progress)
+# --------------------------------------------------------------------------
+# 批次新增 / 修改 / 刪除 (匯入排程用)
+# --------------------------------------------------------------------------
+
+class GanttBatchError(ValueError):
+    """
+    批次中有任一項目無效；errors 為 [{"index": i, "error": "..."}]，整批都不會寫入。
+    """
 
-        if parent_id is not None:
-            update_fields["parent_id"] = parent_id
-        if depends is not None:
-            update_fields["depends"] = depends
+    def __init__(self, errors: List[dict]):
+        super().__init__(f"{len(errors)} operation(s) failed")
+        self.errors = errors
 
-        old_start_str = doc.get("start_date", "")
-        old_end_str = doc.get("end_date", "")
-        old_start_dt = parse_date_str(old_start_str, "2025-01-01")
-        old_end_dt = parse_date_str(old_end_str, None)
 
-        if start_date_str or end_date_str or duration is not None:
-            start_dt = old_start_dt
-            end_dt = old_end_dt if old_end_dt else (old_start_dt + timedelta(days=1))
+def _batch_max_operations() -> int:
+    try:
+        return int(os.environ.get("GANTT_BATCH_MAX_OPERATIONS", 5000))
+    except ValueError:
+        return 5000
 
-            if start_date_str:
-                start_dt = parse_date_str(start_date_str, "2025-01-01")
-            if end_date_str:
-                end_dt = parse_date_str(end_date_str, None)
-                if end_dt is None:
-                    end_dt = start_dt + timedelta(days=1)
-            elif duration is not None:
-                end_dt = start_dt + timedelta(days=duration - 1)
 
-            if end_dt < start_dt:
-                end_dt = start_dt + timedelta(days=1)
+def _supports_transactions() -> bool:
+    # 只有 replica set / sharded cluster 能開 transaction；單機 mongod 則退回單次 ordered bulk_write
+    try:
+        return mongo.cx.topology_description.topology_type_name in ("ReplicaSetWithPrimary", "Sharded")
+    except Exception:
+        return False
 
-            # 若 type=milestone => 令 start==end
-            the_type = task_type or doc.get("type", "task")
-            if the_type == "milestone":
-                end_dt = start_dt
 
-            update_fields["start_date"] = start_dt.date().isoformat()
-            update_fields["end_date"] = end_dt.date().isoformat()
+class _PendingTaskId:
+    """
+    批次 create 在驗證完成前的暫定 ID：與任何既有任務 id 都不相等，整批驗證通過後才換成正式序號。
+    """
+    __slots__ = ("index",)
 
-        if task_type:
-            update_fields["type"] = task_type
-            if task_type == "milestone":
-                sdt = parse_date_str(update_fields.get("start_date") or old_start_str, "2025-01-01")
-                update_fields["end_date"] = sdt.date().isoformat()
+    def __init__(self, index: int):
+        self.index = index
 
-        update_fields["updated_at"] = datetime.now()
+    def __repr__(self):
+        return f"<new task #{self.index}>"
 
-        if update_fields:
-            mongo.db["gantt_tasks"].update_one(
-                {"id": task_id, "project_id": project_id},
-                {"$set": update_fields}
-            )
 
-        # 重新計算父任務
-        _recalc_parent_chain_in_db(project_id, task_id)
+def _resolve_ref(value: Any, client_ids: Dict[str, Any]) -> Any:
+    """
+    parent_id / depends / id 可以是既有任務 id，或同一批 create 的 client_id (字串)。
+    """
+    if isinstance(value, str):
+        if value in client_ids:
+            return client_ids[value]
+        raise ValueError(f"Unknown client_id: {value}")
+    return value
 
 
-def delete_gantt_task(project_id: int, task_id: int, snapshot_date_str: str = ""):
+def _resolve_task_refs(item: Dict[str, Any], client_ids: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(item)
+    if data.get("parent_id") is not None:
+        data["parent_id"] = _resolve_ref(data["parent_id"], client_ids)
+    if "depends" in data:
+        if not isinstance(data["depends"], list):
+            raise ValueError("depends must be a list")
+        data["depends"] = [_resolve_ref(d, client_ids) for d in data["depends"]]
+    return data
+
+
+def _stage_gantt_task_batch(project_id: int, operations: List[Any], tree: TaskTree):
     """
-    刪除任務；若 snapshot_date_str 有值 => 在 snapshot 中刪
-             否則在 DB 中刪
+    以暫定 ID 在記憶體中依序套用整批操作並重算父任務 (不讀寫 DB、不取序號)。
+    任一項目失敗 => 擲 GanttBatchError。
+    回傳 dict：
+      tree     = 套用後的任務樹
+      pending  = 每個 create 的暫定 ID (依 operations 順序)
+      inserted = 暫定 ID => 新任務 doc；updated = 既有任務 id => 累積的 $set；deleted = 被刪除的既有任務
+      created  = client_id => 暫定 ID；changed = 值有變動的父任務
+    """
+    errors: List[dict] = []
+    calendar = None
+    if any(isinstance(item, dict) and _uses_duration(item) for item in operations):
+        calendar = get_duration_calendar(project_id)
+
+    # 1) client_id => 暫定 ID 對照 (可往後引用)
+    pending: List[_PendingTaskId] = []
+    client_ids: Dict[str, _PendingTaskId] = {}
+    for index, item in enumerate(operations):
+        if not isinstance(item, dict) or item.get("op") != "create":
+            continue
+        placeholder = _PendingTaskId(index)
+        pending.append(placeholder)
+        client_id = item.get("client_id")
+        if client_id is None:
+            continue
+        if not isinstance(client_id, str) or client_id in client_ids:
+            errors.append({"index": index, "error": f"Invalid or duplicate client_id: {client_id}"})
+            continue
+        client_ids[client_id] = placeholder
+
+    # 2) 在記憶體中依序套用
+    inserted: Dict[Any, dict] = {}
+    updated: Dict[int, dict] = {}
+    deleted: List[dict] = []
+    created: Dict[str, Any] = {}
+    pending_iter = iter(pending)
+
+    for index, item in enumerate(operations):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("operation must be an object")
+            op = item.get("op")
+
+            if op == "create":
+                task_id = next(pending_iter)
+                data = _resolve_task_refs(item, client_ids)
+                data["project_id"] = project_id
+                task_doc = _build_new_task(data, task_id, calendar)
+                tree.add(task_doc)
+                inserted[task_id] = task_doc
+                created[item.get("client_id") or str(index)] = task_id
+
+            elif op == "update":
+                task_id = _resolve_ref(item.get("id"), client_ids)
+                doc = tree.get(task_id)
+                if doc is None:
+                    raise KeyError(f"Task not found: {item.get('id')}")
+                data = _resolve_task_refs(item, client_ids)
+                fields = _build_task_update(doc, data, calendar)
+                tree.update(task_id, fields)
+                if task_id not in inserted:
+                    updated.setdefault(task_id, {}).update(fields)
+
+            elif op == "delete":
+                task_id = _resolve_ref(item.get("id"), client_ids)
+                if tree.get(task_id) is None:
+                    raise KeyError(f"Task not found: {item.get('id')}")
+                removed = tree.remove(task_id)
+                if inserted.pop(task_id, None) is None:
+                    updated.pop(task_id, None)
+                    deleted.append(removed)
+
+            else:
+                raise ValueError(f"Unknown op: {op}")
+
+        except KeyError as e:
+            errors.append({"index": index, "error": e.args[0] if e.args else "Task not found"})
+        except (ValueError, TypeError) as e:
+            errors.append({"index": index, "error": str(e)})
+
+    if errors:
+        raise GanttBatchError(errors)
+
+    # 3) 一次父任務彙總
+    changed = tree.recalc(now=datetime.now())
+    return {"tree": tree, "pending": pending, "inserted": inserted, "updated": updated,
+            "deleted": deleted, "created": created, "changed": changed}
+
+
+def _assign_pending_ids(id_map: Dict[_PendingTaskId, int], docs):
+    """
+    把 doc (或 $set 欄位) 裡的暫定 ID (id / parent_id / depends) 換成正式序號。
+    """
+    for doc in docs:
+        if doc.get("id") in id_map:
+            doc["id"] = id_map[doc["id"]]
+        if doc.get("parent_id") in id_map:
+            doc["parent_id"] = id_map[doc["parent_id"]]
+        if isinstance(doc.get("depends"), list) and any(d in id_map for d in doc["depends"]):
+            doc["depends"] = [id_map.get(d, d) for d in doc["depends"]]
+
+
+def apply_gantt_task_batch(project_id: int, operations: List[Dict[str, Any]],
+                           snapshot_date_str: str = "") -> Dict[str, Any]:
     """
+    一次套用多筆任務新增 / 修改 / 刪除 (依 operations 順序)：
+      {"op": "create", "client_id": "tmp-1", "text": ..., "parent_id": "tmp-0" | 12, "depends": ["tmp-2", 3], ...}
+      {"op": "update", "id": 12 | "tmp-1", ...欄位同單筆 PUT}
+      {"op": "delete", "id": 12 | "tmp-1"}
+    client_id 是前端暫定的 ID，同一批的 parent_id / depends / id 都可引用 (可往後引用)。
+
+    做法：
+      - 一次讀出任務樹，所有操作以暫定 ID 在記憶體中套用；任一項目失敗 => 擲 GanttBatchError，
+        不寫入任何資料，也不消耗序號
+      - 全部通過後才以 id_allocator.reserve 一次 $inc 保留 create 需要的 ID (snapshot 模式則從 max id 往後排)
+      - 只跑一次父任務彙總，gantt_tasks 以一次 ordered bulk_write 寫回
+    伺服器支援 transaction 時，任務樹的讀取與 bulk_write 在同一個 transaction 內，
+    期間有其他寫入衝突會整批失敗 (不會以過期的任務樹覆寫)；單機 mongod 沒有 transaction，
+    讀取與寫入之間其他 request 的修改可能被彙總值覆蓋 (與單筆 API 相同)。
+    snapshot 模式一次寫回 tasks array。
+    回傳 {"created": {client_id: id}, "created_ids": [...], "updated": n, "deleted": n, "parents_recalculated": n}
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations must be a non-empty list")
+    max_ops = _batch_max_operations()
+    if len(operations) > max_ops:
+        raise ValueError(f"Too many operations (max {max_ops})")
+
     if snapshot_date_str:
         snap = find_one_or_404(
             "gantt_snapshots",
@@ -325,46 +518,69 @@ def delete_gantt_task(project_id: int, task_id: int, snapshot_date_str: str = ""
                 "project_id": project_id,
                 "snapshot_date": snapshot_date_str
             },
-            "Snapshot not found"
+            f"Snapshot not found for {snapshot_date_str}"
         )
-
         tasks_list = snap.get("tasks", [])
-        new_tasks_list = []
-        deleted = False
-
-        for t in tasks_list:
-            if t["id"] == task_id:
-                deleted = True
-            else:
-                new_tasks_list.append(t)
-
-        if not deleted:
-            raise KeyError("Task not found")
-
-        # 寫回 snapshot
+        staged = _stage_gantt_task_batch(project_id, operations, TaskTree(tasks_list))
+
+        first_id = _next_snapshot_task_id(tasks_list)
+        id_map = dict(zip(staged["pending"], range(first_id, first_id + len(staged["pending"]))))
+        deleted_ids = {t["id"] for t in staged["deleted"]}
+        new_tasks_list = [t for t in tasks_list if t["id"] not in deleted_ids]
+        new_tasks_list.extend(staged["inserted"].values())
+        _assign_pending_ids(id_map, new_tasks_list)
         mongo.db["gantt_snapshots"].update_one(
             {"_id": snap["_id"]},
-            {"$set": {"tasks": new_tasks_list}}
+            {"$set": {"tasks": new_tasks_list, "updated_at": datetime.now()}}
         )
 
-        # 父任務重新計算
-        _recalc_parent_chain_in_snapshot(project_id, task_id, snapshot_date_str)
+    elif _supports_transactions():
+        with mongo.cx.start_session() as session:
+            with session.start_transaction():
+                staged = _stage_gantt_task_batch(project_id, operations, load_task_tree(project_id, session=session))
+                id_map = _write_gantt_task_batch(staged, session=session)
 
     else:
-        result = mongo.db["gantt_tasks"].delete_one({
-            "id": task_id,
-            "project_id": project_id
-        })
-        if result.deleted_count == 0:
-            raise KeyError("Task not found")
+        staged = _stage_gantt_task_batch(project_id, operations, load_task_tree(project_id))
+        id_map = _write_gantt_task_batch(staged)
 
-        # 父任務重新計算
-        _recalc_parent_chain_in_db(project_id, task_id)
+    inserted = staged["inserted"]
+    return {
+        # 同一批新增又刪除的任務不列入
+        "created": {k: id_map[v] for k, v in staged["created"].items() if v in inserted},
+        "created_ids": [id_map[v] for v in inserted],
+        "updated": len(staged["updated"]),
+        "deleted": len(staged["deleted"]),
+        "parents_recalculated": len(staged["changed"]),
+    }
 
 
-def _format_task_doc(doc):
+def _write_gantt_task_batch(staged: Dict[str, Any], session=None) -> Dict[_PendingTaskId, int]:
+    """
+    保留正式序號、換掉暫定 ID 後一次 ordered bulk_write；回傳 暫定 ID => 正式 ID。
+    """
+    tree, inserted, updated = staged["tree"], staged["inserted"], staged["updated"]
+    id_map: Dict[_PendingTaskId, int] = {}
+    if staged["pending"]:
+        id_map = dict(zip(staged["pending"], id_allocator.reserve("gantt_tasks", len(staged["pending"]))))
+    _assign_pending_ids(id_map, inserted.values())
+    _assign_pending_ids(id_map, updated.values())
+
+    ops = [InsertOne(doc) for doc in inserted.values()]
+    ops.extend(UpdateOne({"_id": tree.get(tid)["_id"]}, {"$set": fields}) for tid, fields in updated.items())
+    ops.extend(DeleteOne({"_id": t["_id"]}) for t in staged["deleted"])
+    # 新任務若也是父任務，彙總值已直接寫進要 insert 的 doc
+    new_docs = {id(doc) for doc in inserted.values()}
+    ops.extend(rollup_update_ops([t for t in staged["changed"] if id(t) not in new_docs]))
+    if ops:
+        mongo.db["gantt_tasks"].bulk_write(ops, ordered=True, session=session)
+    return id_map
+
+
+def _format_task_doc(doc, calendar: Optional[WorkCalendar] = None):
     """
     將資料庫中的 task doc 格式化成前端需要的欄位結構。
+    calendar 不為 None (工作天專案) 時，duration 為工作日數。
     """
     if "id" not in doc:
         return None  # 理論上已在 DB 內確定都有 id
@@ -376,25 +592,127 @@ def _format_task_doc(doc):
         "progress": doc.get("progress", 0.0),
         "parent_id": doc.get("parent_id"),
         "depends": doc.get("depends", []),
-        "duration": _calc_duration(doc.get("start_date"), doc.get("end_date")),
+        "duration": _calc_duration(doc.get("start_date"), doc.get("end_date"), calendar),
         "type": doc.get("type", "task"),  # 預設是 "task" 以相容舊資料
     }
 
 
-def _calc_duration(start_date_iso, end_date_iso):
+def _calc_duration(start_date_iso, end_date_iso, calendar: Optional[WorkCalendar] = None):
     if not start_date_iso or not end_date_iso:
         return 1
     try:
-        sdt = datetime.strptime(start_date_iso, "%Y-%m-%d")
-        edt = datetime.strptime(end_date_iso, "%Y-%m-%d")
-    except ValueError:
+        sdt = date.fromisoformat(start_date_iso)
+        edt = date.fromisoformat(end_date_iso)
+    except (TypeError, ValueError):
         return 1
-    diff = (edt - sdt).days + 1
+    if calendar is not None:
+        diff = calendar.workdays_between(sdt, edt)
+    else:
+        diff = (edt - sdt).days + 1
     if diff < 1:
         return 1
     return diff
 
 
+def _max_task_duration() -> int:
+    try:
+        return max(1, int(os.environ.get("GANTT_MAX_TASK_DURATION_DAYS", 3650)))
+    except ValueError:
+        return 3650
+
+
+def _validate_duration(duration) -> int:
+    """
+    duration 必須是 1 ~ GANTT_MAX_TASK_DURATION_DAYS (預設 3650) 的整數 (可為整數值的 float)，否則擲 ValueError；
+    避免異常的工期讓工作日曆一路延伸、佔用大量 CPU 與記憶體。
+    """
+    if isinstance(duration, float) and duration.is_integer():
+        duration = int(duration)
+    max_days = _max_task_duration()
+    if isinstance(duration, bool) or not isinstance(duration, int) or not 1 <= duration <= max_days:
+        raise ValueError(f"duration must be an integer between 1 and {max_days}")
+    return duration
+
+
+def _end_after_duration(start_dt: datetime, duration: int, calendar: Optional[WorkCalendar]) -> datetime:
+    """
+    為期 duration 天的任務的結束日 (含開始日)；工作天專案以工作日計算，跳過假日。
+    超出可表示 / 工作日曆支援的日期範圍時擲 ValueError。
+    """
+    if calendar is None:
+        try:
+            return start_dt + timedelta(days=duration - 1)
+        except OverflowError:
+            raise ValueError("end date is out of range")
+    end = calendar.add_workdays(start_dt.date(), duration)
+    return datetime(end.year, end.month, end.day)
+
+
+# --------------------------------------------------------------------------
+# 工作日曆 (依 gantt_holidays，快取於 process 內)
+# --------------------------------------------------------------------------
+
+# project_id => (gantt_holidays.updated_at, WorkCalendar)
+_calendar_cache: Dict[int, tuple] = {}
+
+
+def get_work_calendar(project_id: int) -> WorkCalendar:
+    """
+    專案的工作日曆。假日設定只讀一筆 document；updated_at 沒變就沿用已建好的 prefix-sum 表，
+    所以其他 worker 經 update_holiday_settings 改了設定，這裡下次查詢也會重建。
+    """
+    settings = get_holiday_settings(project_id)
+    version = settings.get("updated_at") if settings else None
+    cached = _calendar_cache.get(project_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    calendar = WorkCalendar.from_settings(settings)
+    _calendar_cache[project_id] = (version, calendar)
+    return calendar
+
+
+def get_duration_calendar(project_id: int) -> Optional[WorkCalendar]:
+    """
+    工作天 (projects.duration_type == "business") 專案回傳工作日曆，否則 None (以日曆天計算)。
+    """
+    project = mongo.db["projects"].find_one({"id": project_id}, {"_id": 0, "duration_type": 1})
+    if not project or project.get("duration_type") != "business":
+        return None
+    return get_work_calendar(project_id)
+
+
+def _uses_duration(data: Dict[str, Any]) -> bool:
+    # 只有「給 duration、沒給 end_date」時才需要以 duration 推算結束日
+    return data.get("duration") is not None and not data.get("end_date")
+
+
+def _calendar_for_body(project_id: int, data: Dict[str, Any]) -> Optional[WorkCalendar]:
+    return get_duration_calendar(project_id) if _uses_duration(data) else None
+
+
+# --------------------------------------------------------------------------
+# 排程 (依 depends 的 CPM，見 scheduling.py)
+# --------------------------------------------------------------------------
+
+SCHEDULE_TASK_PROJECTION = {
+    "_id": 0, "id": 1, "parent_id": 1, "depends": 1, "type": 1, "start_date": 1, "end_date": 1,
+}
+
+
+def get_gantt_schedule(project_id: int, snapshot_date_str: str = "") -> Dict[str, Any]:
+    """
+    以專案的工作日曆 (gantt_holidays) 計算最早 / 最晚開始與完成、total float 與要徑。
+    只計算不寫回；depends 成環時擲 ValueError。
+    """
+    if snapshot_date_str:
+        snap = get_specific_snapshot(project_id, snapshot_date_str)
+        tasks = snap.get("tasks", [])
+    else:
+        tasks = list(mongo.db["gantt_tasks"].find({"project_id": project_id}, SCHEDULE_TASK_PROJECTION))
+
+    return compute_schedule(tasks, get_work_calendar(project_id))
+
+
 # --------------------------------------------------------------------------
 # 版本快照 (gantt_snapshots) ...
 # --------------------------------------------------------------------------
@@ -491,156 +809,15 @@ def update_holiday_settings(project_id: int, data: Dict[str, Any]):
         {"$set": update_data},
         upsert=True
     )
+    _calendar_cache.pop(project_id, None)
 
 
 # --------------------------------------------------------------------------
 # 「父任務自動計算」的輔助函式
 # --------------------------------------------------------------------------
 
-def _recalc_parent_chain_in_db(project_id: int, changed_task_id: int):
-    """
-    從 changed_task_id 開始，向上遞歸更新父任務(start_date, end_date, progress)。
-    使用 gantt_tasks 集合。
-    """
-    coll = mongo.db["gantt_tasks"]
-
-    # 先找到該任務
-    changed_doc = coll.find_one({"project_id": project_id, "id": changed_task_id})
-    if not changed_doc:
-        # 可能是被刪除了
-        pass
-
-    # 逐層向上更新
-    # 例如 BFS: 先找 changed_doc 的 parent, 再找 parent 的 parent...
-    visited = set()
-    current_parent_id = changed_doc["parent_id"] if changed_doc else None
-
-    while current_parent_id:
-        if current_parent_id in visited:
-            # 避免環
-            break
-        visited.add(current_parent_id)
-
-        parent_doc = coll.find_one({"project_id": project_id, "id": current_parent_id})
-        if not parent_doc:
-            break
-
-        # 找出所有孩子
-        children = list(coll.find({"project_id": project_id, "parent_id": current_parent_id}))
-
-        new_start, new_end, new_progress = _calc_parent_fields(children, parent_doc.get("type", "task"))
-        coll.update_one(
-            {"_id": parent_doc["_id"]},
-            {"$set": {
-                "start_date": new_start.isoformat(),
-                "end_date": new_end.isoformat(),
-                "progress": new_progress,
-                "updated_at": datetime.now()
-            }}
-        )
-        current_parent_id = parent_doc.get("parent_id")
-
-
-def _recalc_parent_chain_in_snapshot(project_id: int, changed_task_id: int, snapshot_date: str):
-    """
-    與上面類似，但針對 snapshot 裡的 tasks array (in-memory)。
-    """
-    snap = mongo.db["gantt_snapshots"].find_one({
-        "project_id": project_id,
-        "snapshot_date": snapshot_date
-    })
-    if not snap:
-        return
-    tasks_list = snap.get("tasks", [])
-    # 先找 changed task
-    changed_doc = None
-    for t in tasks_list:
-        if t["id"] == changed_task_id:
-            changed_doc = t
-            break
-
-    visited = set()
-    current_parent_id = changed_doc["parent_id"] if changed_doc else None
-
-    while current_parent_id:
-        if current_parent_id in visited:
-            break
-        visited.add(current_parent_id)
-
-        parent_task = None
-        for t in tasks_list:
-            if t["id"] == current_parent_id:
-                parent_task = t
-                break
-
-        if not parent_task:
-            break
-
-        # 找出所有孩子
-        children = [c for c in tasks_list if c.get("parent_id") == current_parent_id]
-
-        new_start, new_end, new_progress = _calc_parent_fields(children, parent_task.get("type", "task"))
-        parent_task["start_date"] = new_start.isoformat()
-        parent_task["end_date"] = new_end.isoformat()
-        parent_task["progress"] = new_progress
-        parent_task["updated_at"] = datetime.now()
-
-        current_parent_id = parent_task.get("parent_id")
-
-    # 最後寫回 DB
-    mongo.db["gantt_snapshots"].update_one(
-        {"_id": snap["_id"]},
-        {"$set": {"tasks": tasks_list}}
-    )
-
-
-def _calc_parent_fields(child_tasks: List[dict], parent_type: str):
-    """
-    給定所有子任務 (child_tasks)，計算父任務的 start_date, end_date, progress.
-    - start_date = min( child.start )
-    - end_date = max( child.end )
-    - progress = ( 所有子任務 progress 的「平均」 ) (亦可改成加權平均)
-    - 若 parent_type == "milestone"，強制 start_date=end_date
-    """
-    if not child_tasks:
-        # 沒小孩 => 父任務可能是空殼 => 預設 progress=0, start/end=今日
-        today = datetime.today().date()
-        return (today, today, 0.0)
-
-    min_start = None
-    max_end = None
-    total_progress = 0.0
-    for c in child_tasks:
-        s = parse_date_str(c.get("start_date", ""), "2025-01-01")
-        e = parse_date_str(c.get("end_date", ""), "2025-01-02")
-        p = c.get("progress", 0.0)
-        if min_start is None or s < min_start:
-            min_start = s
-        if max_end is None or e > max_end:
-            max_end = e
-        total_progress += float(p)
-
-    avg_progress = total_progress / len(child_tasks)
-    if avg_progress < 0:
-        avg_progress = 0
-    if avg_progress > 1:
-        avg_progress = 1.0
-
-    if parent_type == "milestone":
-        # 強制同一天
-        if min_start and max_end:
-            # 就以min_start為準
-            return (min_start.date(), min_start.date(), avg_progress)
-        else:
-            today = datetime.today().date()
-            return (today, today, avg_progress)
-
-    # 一般( project / task )
-    if min_start is None:
-        min_start = datetime.today()
-    if max_end is None:
-        max_end = min_start
-    return (min_start.date(), max_end.date(), avg_progress)
+# 父任務的彙總 (start = 子任務最早開始、end = 最晚結束、progress = 平均) 由 task_tree.py 的 TaskTree 負責：
+# 一次載入專案所有任務、記憶體中重算受影響的祖先，再一次 bulk_write 寫回。
 
 
 # --------------------------------------------------------------------------
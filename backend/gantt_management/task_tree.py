@@ -0,0 +1,229 @@
+# backend/gantt_management/task_tree.py
+
+"""
+父任務自動彙總 (rollup) 用的任務樹。
+
+舊做法每改一筆任務就沿著 parent 鏈往上，每一層 find_one 父任務 + find 所有子任務 + update_one，
+階層越深 round trip 越多 (3 × 深度)，兄弟任務也一再重讀。
+
+這裡把一個專案 (或 snapshot) 的任務一次載入成索引結構：
+  - by_id：id -> task dict
+  - children：parent_id -> [子任務 id]
+編輯 (add / update / remove) 只在記憶體中進行並標記受影響的父任務為 dirty；
+recalc() 由深到淺只重算 dirty 的祖先 (值沒變就不再往上)，回傳有變動的父任務，
+呼叫端再以一次 bulk_write (或一次寫回 snapshot) 存回。
+
+父任務的值就是其子樹的彙總：start_date = min(子任務 start)、end_date = max(子任務 end)、
+progress = 子任務 progress 平均 (子任務本身若是父任務，用的是它已彙總過的值)。
+"""
+
+import heapq
+import itertools
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from backend.db import mongo, parse_date_str
+
+# 父任務由子任務彙總而來的欄位
+ROLLUP_FIELDS = ("start_date", "end_date", "progress")
+
+# 載入任務樹需要的欄位 (update 也要用到 start/end/type)
+TASK_TREE_PROJECTION = {
+    "_id": 1, "id": 1, "parent_id": 1, "type": 1,
+    "start_date": 1, "end_date": 1, "progress": 1,
+}
+
+
+def calc_parent_fields(child_tasks: List[dict], parent_type: str):
+    """
+    給定所有子任務 (child_tasks)，計算父任務的 start_date, end_date, progress.
+    - start_date = min( child.start )
+    - end_date = max( child.end )
+    - progress = ( 所有子任務 progress 的「平均」 ) (亦可改成加權平均)
+    - 若 parent_type == "milestone"，強制 start_date=end_date
+    """
+    if not child_tasks:
+        # 沒小孩 => 父任務可能是空殼 => 預設 progress=0, start/end=今日
+        today = datetime.today().date()
+        return (today, today, 0.0)
+
+    min_start = None
+    max_end = None
+    total_progress = 0.0
+    for c in child_tasks:
+        s = parse_date_str(c.get("start_date", ""), "2025-01-01")
+        e = parse_date_str(c.get("end_date", ""), "2025-01-02")
+        p = c.get("progress", 0.0)
+        if min_start is None or s < min_start:
+            min_start = s
+        if max_end is None or e > max_end:
+            max_end = e
+        total_progress += float(p)
+
+    avg_progress = total_progress / len(child_tasks)
+    if avg_progress < 0:
+        avg_progress = 0
+    if avg_progress > 1:
+        avg_progress = 1.0
+
+    if parent_type == "milestone":
+        # 強制同一天
+        if min_start and max_end:
+            # 就以min_start為準
+            return (min_start.date(), min_start.date(), avg_progress)
+        else:
+            today = datetime.today().date()
+            return (today, today, avg_progress)
+
+    # 一般( project / task )
+    if min_start is None:
+        min_start = datetime.today()
+    if max_end is None:
+        max_end = min_start
+    return (min_start.date(), max_end.date(), avg_progress)
+
+
+class TaskTree:
+    """
+    一個專案 (或 snapshot) 的任務索引；task dict 以參考方式保存，recalc() 會直接修改父任務的 dict。
+    """
+
+    def __init__(self, tasks: Iterable[dict]):
+        self.by_id: Dict[Any, dict] = {}
+        self.children: Dict[Any, List[Any]] = {}
+        self._dirty = set()
+        for task in tasks:
+            self._index(task)
+
+    # ---------------- 索引 ----------------
+
+    def _index(self, task: dict):
+        self.by_id[task["id"]] = task
+        self.children.setdefault(task.get("parent_id"), []).append(task["id"])
+
+    def _unlink(self, task_id: Any, parent_id: Any):
+        siblings = self.children.get(parent_id)
+        if siblings and task_id in siblings:
+            siblings.remove(task_id)
+
+    def get(self, task_id: Any) -> Optional[dict]:
+        return self.by_id.get(task_id)
+
+    def child_tasks(self, task_id: Any) -> List[dict]:
+        return [self.by_id[c] for c in self.children.get(task_id, ()) if c in self.by_id]
+
+    def depth(self, task_id: Any) -> int:
+        """
+        到樹根的層數 (parent 不存在即視為樹根；遇到環就停)。
+        """
+        depth, seen = 0, {task_id}
+        parent_id = self.by_id[task_id].get("parent_id") if task_id in self.by_id else None
+        while parent_id in self.by_id and parent_id not in seen:
+            seen.add(parent_id)
+            depth += 1
+            parent_id = self.by_id[parent_id].get("parent_id")
+        return depth
+
+    # ---------------- 編輯 ----------------
+
+    def mark_dirty(self, parent_id: Any):
+        if parent_id is not None:
+            self._dirty.add(parent_id)
+
+    def add(self, task: dict):
+        self._index(task)
+        self.mark_dirty(task.get("parent_id"))
+
+    def update(self, task_id: Any, fields: Dict[str, Any]) -> dict:
+        """
+        更新任務欄位；若改了 parent_id，新舊父任務都要重算。
+        """
+        task = self.by_id[task_id]
+        old_parent_id = task.get("parent_id")
+        task.update(fields)
+        new_parent_id = task.get("parent_id")
+        if new_parent_id != old_parent_id:
+            self._unlink(task_id, old_parent_id)
+            self.children.setdefault(new_parent_id, []).append(task_id)
+            self.mark_dirty(old_parent_id)
+        self.mark_dirty(new_parent_id)
+        return task
+
+    def remove(self, task_id: Any) -> dict:
+        """
+        移除任務 (子任務保留原 parent_id，與舊行為相同)；其父任務要重算。
+        """
+        task = self.by_id.pop(task_id)
+        self._unlink(task_id, task.get("parent_id"))
+        self._dirty.discard(task_id)
+        self.mark_dirty(task.get("parent_id"))
+        return task
+
+    # ---------------- 彙總 ----------------
+
+    def recalc(self, now: Optional[datetime] = None) -> List[dict]:
+        """
+        由深到淺重算 dirty 的父任務；某父任務的值有變才把它的父任務加入重算。
+        每個任務最多算一次 (避免 parent_id 成環時無限循環)。
+        子任務都被移走 / 刪除的父任務不重算，保留原本的日期與進度 (不會被改成今天)。
+        回傳值有變動的父任務 (已更新 ROLLUP_FIELDS 與 updated_at)。
+        """
+        now = now or datetime.now()
+        # 同深度以加入順序排 (id 不一定能互相比較，例如批次新增的暫定 ID)
+        seq = itertools.count()
+        heap = [(-self.depth(pid), next(seq), pid) for pid in self._dirty if pid in self.by_id]
+        heapq.heapify(heap)
+        self._dirty.clear()
+
+        done, changed = set(), []
+        while heap:
+            _, _, parent_id = heapq.heappop(heap)
+            if parent_id in done:
+                continue
+            done.add(parent_id)
+
+            child_tasks = self.child_tasks(parent_id)
+            if not child_tasks:
+                continue
+
+            parent = self.by_id[parent_id]
+            new_start, new_end, new_progress = calc_parent_fields(child_tasks, parent.get("type", "task"))
+            fields = {
+                "start_date": new_start.isoformat(),
+                "end_date": new_end.isoformat(),
+                "progress": new_progress,
+            }
+            if all(parent.get(k) == v for k, v in fields.items()):
+                continue
+
+            parent.update(fields)
+            parent["updated_at"] = now
+            changed.append(parent)
+
+            grandparent_id = parent.get("parent_id")
+            if grandparent_id in self.by_id and grandparent_id not in done:
+                heapq.heappush(heap, (-self.depth(grandparent_id), next(seq), grandparent_id))
+        return changed
+
+
+def load_task_tree(project_id: int, session=None) -> TaskTree:
+    """
+    一次讀出專案在 gantt_tasks 的所有任務 (只取彙總需要的欄位)。
+    session：在 transaction 內讀取時傳入。
+    """
+    return TaskTree(mongo.db["gantt_tasks"].find({"project_id": project_id}, TASK_TREE_PROJECTION, session=session))
+
+
+def rollup_update_ops(changed: List[dict]) -> List[UpdateOne]:
+    """
+    recalc() 回傳的父任務 => bulk_write 用的 UpdateOne。
+    """
+    return [
+        UpdateOne(
+            {"_id": task["_id"]},
+            {"$set": dict({k: task[k] for k in ROLLUP_FIELDS}, updated_at=task["updated_at"])}
+        )
+        for task in changed
+    ]
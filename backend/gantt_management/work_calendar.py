@@ -0,0 +1,169 @@
+# backend/gantt_management/work_calendar.py
+
+"""
+專案的工作日曆 (依 gantt_holidays 設定)。
+
+gantt_holidays 欄位：
+  - holidays：假日 ["YYYY-MM-DD", ...]
+  - special_workdays：特別工作日 (即使是週末或假日也上班)
+  - workday_weekdays：工作日對應星期幾 (前端慣例 0=日, 1=一, ..., 6=六)
+  - workdays_per_week：workday_weekdays 未設定時，取週一起算的前 N 天 (預設 5 => 週一 ~ 週五)
+
+內部以 ORIGIN 起的「工作日 prefix sum」表示：
+  prefix[i] = ORIGIN 到 ORIGIN + i 天 (不含) 之間的工作日數，workdays = 依序排列的工作日。
+「某日之前有幾個工作日」、「兩日之間的工作日數」、「第 n 個工作日是哪天」都是 O(1) 查表；
+表格只往後延伸 (查到範圍外的日期時自動補)，所以工作日 index 一經算出就不會變。
+表格最多延伸到 LIMIT (約 73k 筆)：更晚的日期在計數時視同 LIMIT，
+要求 LIMIT 之後的第 n 個工作日則擲 ValueError，避免異常的日期 / 工期把表格撐到數百萬筆。
+"""
+
+from datetime import date
+from typing import Any, Iterable, List, Optional
+
+# 支援的最早日期 (更早的日期視同 ORIGIN)
+ORIGIN = date(2000, 1, 1)
+
+# 支援的最晚日期 (更晚的日期視同 LIMIT)
+LIMIT = date(2200, 1, 1)
+
+# 每次延伸表格時至少多補的天數
+_EXTEND_DAYS = 366
+
+
+def _parse_dates(values: Iterable[Any]) -> set:
+    result = set()
+    for value in values or []:
+        try:
+            result.add(date.fromisoformat(str(value).strip()[:10]).toordinal())
+        except ValueError:
+            continue
+    return result
+
+
+def _python_weekdays(workday_weekdays: Iterable[Any], workdays_per_week: Any) -> set:
+    # 前端 0=日 => python weekday() 0=一
+    weekdays = set()
+    for value in workday_weekdays or []:
+        try:
+            js_day = int(value)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= js_day <= 6:
+            weekdays.add((js_day - 1) % 7)
+    if weekdays:
+        return weekdays
+    try:
+        count = int(workdays_per_week)
+    except (TypeError, ValueError):
+        count = 5
+    return set(range(max(1, min(count, 7))))
+
+
+class WorkCalendar:
+    """
+    工作日查詢；表格在第一次查詢時才建立，之後只往後延伸。
+    """
+
+    def __init__(self, holidays: Iterable[Any] = (), special_workdays: Iterable[Any] = (),
+                 workday_weekdays: Iterable[Any] = (), workdays_per_week: Any = 5):
+        self._holidays = _parse_dates(holidays)
+        self._special = _parse_dates(special_workdays)
+        self._weekdays = _python_weekdays(workday_weekdays, workdays_per_week)
+
+        self._origin = ORIGIN.toordinal()
+        self._max_offset = LIMIT.toordinal() - self._origin
+        self._prefix: List[int] = [0]
+        self._workdays: List[int] = []
+
+    @classmethod
+    def from_settings(cls, settings: Optional[dict]) -> "WorkCalendar":
+        """
+        由 get_holiday_settings() 的 document 建立 (None => 週一 ~ 週五、無假日)。
+        """
+        settings = settings or {}
+        return cls(
+            holidays=settings.get("holidays", []),
+            special_workdays=settings.get("special_workdays", []),
+            workday_weekdays=settings.get("workday_weekdays", []),
+            workdays_per_week=settings.get("workdays_per_week", 5),
+        )
+
+    # ---------------- 表格 ----------------
+
+    def _is_workday_ordinal(self, ordinal: int) -> bool:
+        if ordinal in self._special:
+            return True
+        if ordinal in self._holidays:
+            return False
+        # date(1, 1, 1) (ordinal 1) 是週一
+        return (ordinal - 1) % 7 in self._weekdays
+
+    def _extend(self, days: int) -> bool:
+        """
+        表格往後補至少 days 天 (不超過 LIMIT)；已到 LIMIT 無法再補時回傳 False。
+        """
+        prefix, workdays = self._prefix, self._workdays
+        # prefix 最多 max_offset + 2 筆 (涵蓋 LIMIT 當天)
+        days = min(max(days, _EXTEND_DAYS), self._max_offset + 2 - len(prefix))
+        if days <= 0:
+            return False
+        ordinal = self._origin + len(prefix) - 1
+        count = prefix[-1]
+        for _ in range(days):
+            if self._is_workday_ordinal(ordinal):
+                workdays.append(ordinal)
+                count += 1
+            prefix.append(count)
+            ordinal += 1
+        return True
+
+    def _offset(self, d: date) -> int:
+        """
+        d 相對 ORIGIN 的天數 (確保表格涵蓋到 d 當天；範圍外的日期取 ORIGIN / LIMIT)。
+        """
+        offset = min(max(0, d.toordinal() - self._origin), self._max_offset)
+        if offset + 1 >= len(self._prefix):
+            self._extend(offset + 2 - len(self._prefix))
+        return offset
+
+    # ---------------- 查詢 ----------------
+
+    def is_workday(self, d: date) -> bool:
+        offset = self._offset(d)
+        return self._prefix[offset + 1] > self._prefix[offset]
+
+    def workday_index(self, d: date) -> int:
+        """
+        d 之前 (不含 d) 的工作日數；d 是工作日時即為它在 workdays 中的位置。
+        """
+        return self._prefix[self._offset(d)]
+
+    def date_of_index(self, index: int) -> date:
+        """
+        第 index 個工作日 (0 起算)；超過 LIMIT 擲 ValueError。
+        """
+        while index >= len(self._workdays):
+            if not self._extend(_EXTEND_DAYS):
+                raise ValueError(f"Date is beyond the supported calendar range (after {LIMIT.isoformat()})")
+        return date.fromordinal(self._workdays[max(0, index)])
+
+    def workdays_between(self, start: date, end: date) -> int:
+        """
+        start ~ end (含兩端) 的工作日數。
+        """
+        if end < start:
+            return 0
+        end_offset = self._offset(end)
+        return self._prefix[end_offset + 1] - self._prefix[self._offset(start)]
+
+    def next_workday(self, d: date) -> date:
+        """
+        d 本身或之後第一個工作日。
+        """
+        return self.date_of_index(self.workday_index(d))
+
+    def add_workdays(self, start: date, days: int) -> date:
+        """
+        從 start (遇非工作日順延) 開始、為期 days 個工作日的任務，最後一個工作日是哪天。
+        """
+        return self.date_of_index(self.workday_index(start) + max(days, 1) - 1)
@@ -0,0 +1,296 @@
+# backend/indexes.py
+
+"""
+宣告式的 MongoDB 索引管理。
+
+各 blueprint 在自己的 indexes.py 宣告：
+  - INDEXES：需要的索引 (index(collection, keys, **options))
+  - QUERIES：該 blueprint 各 route 的熱門查詢樣本 (query(route, collection, filter, sort))，
+             用來以 explain() 檢查是否真的走索引
+本檔集中載入 (INDEX_MODULES)，並提供：
+  - apply_indexes()   建立缺少的索引；回報多出來 (未宣告) 與選項不符的索引，drop_extra=True 時刪除多餘的
+  - check_indexes()   只檢查不修改
+  - explain_queries() 對每個查詢樣本跑 explain()，回報 COLLSCAN / 記憶體內排序 (SORT) 的 route
+
+create_app 啟動時會 apply (INDEX_AUTO_APPLY=0 可關閉，改由部署流程執行 CLI)；多餘的索引啟動時只記 log，不會刪除。
+
+CLI (於專案根目錄，環境變數與 web 相同，至少需要 MONGO_URI)：
+    python -m backend.indexes check
+    python -m backend.indexes apply [--drop-extra]
+    python -m backend.indexes explain
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from backend.db import mongo
+
+logger = logging.getLogger(__name__)
+
+# 各 blueprint 的索引宣告 (模組需有 INDEXES / QUERIES)
+INDEX_MODULES = [
+    "backend.project_management.indexes",
+    "backend.staff_management.indexes",
+    "backend.gantt_management.indexes",
+    "backend.document_management.indexes",
+]
+
+# 比對既有索引時會看的選項
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def index(collection: str, keys, **options) -> dict:
+    """
+    宣告一個索引；keys 為欄位名稱或 [(欄位, ASCENDING/DESCENDING), ...]。
+    """
+    if isinstance(keys, str):
+        keys = [(keys, ASCENDING)]
+    return {"collection": collection, "keys": [(k, int(d)) for k, d in keys], "options": options}
+
+
+def query(route: str, collection: str, filter: dict, sort: Optional[List[Tuple[str, int]]] = None) -> dict:
+    """
+    宣告一個 route 的查詢樣本 (filter 的值只需型別正確)。
+    """
+    return {"route": route, "collection": collection, "filter": filter, "sort": sort}
+
+
+# ---------------- 核心 (非 blueprint) collection ----------------
+
+INDEXES = [
+    # get_next_sequence 的自動遞增序號
+    index("counters", "collection_name", unique=True),
+    # 背景 job (見 jobs.py)
+    index("jobs", "job_id", unique=True),
+    index("jobs", [("status", ASCENDING), ("created_at", ASCENDING)]),
+    index("jobs", "expires_at", expireAfterSeconds=0),
+]
+
+QUERIES = [
+    query("GET /api/documents/daily-report/progress-sse/<job_id>", "jobs", {"job_id": "x"}),
+    query("worker: claim_next_job", "jobs",
+          {"job_type": {"$in": ["x"]}, "$or": [{"status": "queued"}, {"status": "in_progress", "attempts": {"$lt": 3}}]},
+          sort=[("created_at", ASCENDING)]),
+]
+
+
+# ---------------- registry ----------------
+
+def load_declarations(modules: Optional[Iterable[str]] = None):
+    """
+    回傳 (indexes, queries)；每個項目多帶一個 "owner" (宣告所在的 blueprint，核心 collection 為 "core")。
+    """
+    indexes = [dict(spec, owner="core") for spec in INDEXES]
+    queries = [dict(q, owner="core") for q in QUERIES]
+    for name in modules or INDEX_MODULES:
+        module = importlib.import_module(name)
+        owner = name.split(".")[-2]
+        indexes.extend(dict(spec, owner=owner) for spec in getattr(module, "INDEXES", []))
+        queries.extend(dict(q, owner=owner) for q in getattr(module, "QUERIES", []))
+    return indexes, queries
+
+
+def _normalize_key(key) -> Tuple[Tuple[str, Any], ...]:
+    items = key.items() if isinstance(key, dict) else key
+    return tuple((f, int(d) if isinstance(d, (int, float)) else d) for f, d in items)
+
+
+def _compared_options(options: dict) -> dict:
+    # 注意 expireAfterSeconds=0 是有效值，不能用 truthiness 判斷
+    return {k: options[k] for k in _COMPARED_OPTIONS if options.get(k) is not None and options.get(k) is not False}
+
+
+def _describe(collection: str, keys, options: Optional[dict] = None) -> str:
+    fields = ", ".join(f"{f}:{d}" for f, d in keys)
+    opts = f" {json.dumps(options, default=str)}" if options else ""
+    return f"{collection} ({fields}){opts}"
+
+
+def _diff_collection(collection: str, specs: List[dict]) -> dict:
+    existing = {}
+    for name, info in mongo.db[collection].index_information().items():
+        if name == "_id_":
+            continue
+        existing[_normalize_key(info["key"])] = (name, _compared_options(info))
+
+    missing, mismatched, matched = [], [], set()
+    for spec in specs:
+        key = _normalize_key(spec["keys"])
+        wanted = _compared_options(spec["options"])
+        if key not in existing:
+            missing.append(spec)
+            continue
+        matched.add(key)
+        name, actual = existing[key]
+        if actual != wanted:
+            mismatched.append({"collection": collection, "name": name, "expected": wanted, "actual": actual,
+                               "owner": spec["owner"]})
+
+    extra = [{"collection": collection, "name": name, "keys": list(key), "options": opts}
+             for key, (name, opts) in existing.items() if key not in matched]
+    return {"missing": missing, "mismatched": mismatched, "extra": extra}
+
+
+def _group_by_collection(specs: List[dict]) -> Dict[str, List[dict]]:
+    grouped: Dict[str, List[dict]] = {}
+    for spec in specs:
+        grouped.setdefault(spec["collection"], []).append(spec)
+    return grouped
+
+
+def check_indexes(collections: Optional[Iterable[str]] = None) -> dict:
+    """
+    比對宣告與實際索引，不做任何修改。
+    回傳 {"missing": [...], "mismatched": [...], "extra": [...]}
+    """
+    specs, _ = load_declarations()
+    grouped = _group_by_collection(specs)
+    report = {"missing": [], "mismatched": [], "extra": []}
+    for collection in collections or grouped:
+        diff = _diff_collection(collection, grouped.get(collection, []))
+        report["missing"].extend(_describe(s["collection"], s["keys"], s["options"]) for s in diff["missing"])
+        report["mismatched"].extend(diff["mismatched"])
+        report["extra"].extend(diff["extra"])
+    return report
+
+
+def apply_indexes(collections: Optional[Iterable[str]] = None, drop_extra: bool = False) -> dict:
+    """
+    建立缺少的索引 (可重複呼叫)；個別索引建立失敗 (例如既有資料違反 unique) 只記錄，不中斷。
+    回傳 {"created": [...], "failed": [...], "mismatched": [...], "extra": [...], "dropped": [...]}
+    """
+    specs, _ = load_declarations()
+    grouped = _group_by_collection(specs)
+    report = {"created": [], "failed": [], "mismatched": [], "extra": [], "dropped": []}
+
+    for collection in collections or grouped:
+        diff = _diff_collection(collection, grouped.get(collection, []))
+        for spec in diff["missing"]:
+            desc = _describe(collection, spec["keys"], spec["options"])
+            try:
+                mongo.db[collection].create_indexes([IndexModel(spec["keys"], **spec["options"])])
+                report["created"].append(desc)
+                logger.info("[indexes] created %s (%s)", desc, spec["owner"])
+            except OperationFailure as e:
+                report["failed"].append({"index": desc, "error": str(e)})
+                logger.error("[indexes] failed to create %s: %s", desc, e)
+
+        for item in diff["mismatched"]:
+            report["mismatched"].append(item)
+            logger.warning("[indexes] %s.%s options differ: expected %s, actual %s",
+                           collection, item["name"], item["expected"], item["actual"])
+
+        for item in diff["extra"]:
+            if drop_extra:
+                mongo.db[collection].drop_index(item["name"])
+                report["dropped"].append(item)
+                logger.info("[indexes] dropped undeclared index %s.%s", collection, item["name"])
+            else:
+                report["extra"].append(item)
+                logger.warning("[indexes] undeclared index %s.%s", collection, item["name"])
+    return report
+
+
+# ---------------- explain 覆蓋率 ----------------
+
+def _plan_stages(plan: Any, stages: List[str], index_names: List[str]):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if plan.get("indexName"):
+            index_names.append(plan["indexName"])
+        for value in plan.values():
+            _plan_stages(value, stages, index_names)
+    elif isinstance(plan, list):
+        for value in plan:
+            _plan_stages(value, stages, index_names)
+
+
+def explain_query(probe: dict) -> dict:
+    cursor = mongo.db[probe["collection"]].find(probe["filter"])
+    if probe.get("sort"):
+        cursor = cursor.sort(probe["sort"])
+    plan = cursor.limit(1).explain().get("queryPlanner", {}).get("winningPlan", {})
+
+    stages, index_names = [], []
+    _plan_stages(plan, stages, index_names)
+    if "COLLSCAN" in stages:
+        status = "collection_scan"
+    elif "SORT" in stages:
+        status = "in_memory_sort"
+    elif "EOF" in stages and not index_names:
+        status = "empty_collection"
+    else:
+        status = "ok"
+    return {
+        "route": probe["route"],
+        "owner": probe["owner"],
+        "collection": probe["collection"],
+        "status": status,
+        "indexes": sorted(set(index_names)),
+        "stages": stages,
+    }
+
+
+def explain_queries() -> List[dict]:
+    """
+    對所有宣告的查詢樣本跑 explain()；status 為 ok / in_memory_sort / collection_scan / empty_collection。
+    """
+    _, probes = load_declarations()
+    results = []
+    for probe in probes:
+        try:
+            results.append(explain_query(probe))
+        except OperationFailure as e:
+            results.append({"route": probe["route"], "owner": probe["owner"],
+                            "collection": probe["collection"], "status": "error", "error": str(e)})
+    return results
+
+
+def apply_indexes_on_startup():
+    """
+    create_app 時呼叫 (INDEX_AUTO_APPLY=0 可關閉)；不刪除多餘索引。
+    """
+    if os.environ.get("INDEX_AUTO_APPLY", "1").strip().lower() in ("0", "false", "no"):
+        return
+    try:
+        apply_indexes()
+    except Exception as e:
+        # 索引建立失敗不應讓整個服務起不來；以 CLI 檢查
+        logger.error("[indexes] apply on startup failed: %s", e)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.indexes")
+    parser.add_argument("command", choices=["check", "apply", "explain"])
+    parser.add_argument("--drop-extra", action="store_true", help="apply 時刪除未宣告的索引")
+    args = parser.parse_args(argv)
+
+    from backend.main import create_app
+
+    os.environ.setdefault("INDEX_AUTO_APPLY", "0")
+    app = create_app()
+    with app.app_context():
+        if args.command == "check":
+            result = check_indexes()
+        elif args.command == "apply":
+            result = apply_indexes(drop_extra=args.drop_extra)
+        else:
+            result = explain_queries()
+            uncovered = [r for r in result if r["status"] in ("collection_scan", "in_memory_sort", "error")]
+            for r in uncovered:
+                print(f"[{r['status']}] {r['route']} ({r['collection']})")
+            print(f"{len(result) - len(uncovered)}/{len(result)} queries use an index without in-memory sort")
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    main()
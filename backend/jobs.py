@@ -0,0 +1,331 @@
+# backend/jobs.py
+
+"""
+以 MongoDB `jobs` collection 實作的背景工作佇列 (取代各 gunicorn worker 自己記憶體裡的 dict)。
+
+job document：
+  {
+    "job_id": str (uuid),
+    "job_type": "daily_report_zip" | ...,
+    "status": "queued" | "in_progress" | "done" | "error",
+    "progress": 0~100,
+    "params": {...},            # 建立 job 時的參數
+    "result": {...} | None,     # 例如 {"file_path": ..., "s3_key": ...}
+    "error_msg": "",
+    "attempts": int,
+    "claimed_by": "host:pid" | None,
+    "created_at" / "updated_at" / "heartbeat_at": datetime (UTC),
+    "expires_at": datetime (UTC)  # TTL index，到期後由 MongoDB 自動刪除
+  }
+
+任何一個 web worker 都能查詢進度 / 下載結果；實際執行有兩種模式 (JOB_EXECUTION)：
+  - inline (預設)：建立 job 的 web worker 立刻在背景 thread 認領並執行 (單一容器部署)
+  - worker      ：web 端只建立 job，由獨立行程 `python -m backend.worker` 認領執行，
+                  render 能力可與 web 分開擴充
+認領以 find_one_and_update 原子操作完成，同一個 job 只會被一個 worker 執行；
+worker 模式下，heartbeat 逾時 (JOB_STALE_SECONDS) 的 in_progress job 會被重新認領 (最多 JOB_MAX_ATTEMPTS 次)。
+
+進度事件 (pub/sub)：
+  每次狀態 / 進度變更都會寫一筆事件到 capped collection `job_events`，
+  SSE 連線以 tailable (await) cursor 阻塞等待新事件，有變化才送出，不必每秒輪詢 jobs。
+  capped collection 不需 replica set (change stream 需要)，單機 MongoDB 也可用。
+  - JOB_EVENTS_CAPPED_MB  job_events 的大小上限 (MB，預設 16)
+"""
+
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, CursorType, DESCENDING, ReturnDocument
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from backend.db import mongo
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "jobs"
+JOB_EVENTS_COLLECTION = "job_events"
+
+JOB_QUEUED = "queued"
+JOB_IN_PROGRESS = "in_progress"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_job_ttl_seconds() -> int:
+    return _env_int("JOB_TTL_SECONDS", 1800)
+
+
+def get_job_execution_mode() -> str:
+    mode = os.environ.get("JOB_EXECUTION", "inline").strip().lower()
+    return "worker" if mode == "worker" else "inline"
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _jobs():
+    return mongo.db[JOBS_COLLECTION]
+
+
+def _job_events():
+    return mongo.db[JOB_EVENTS_COLLECTION]
+
+
+def ensure_job_events_collection():
+    """
+    建立 job_events capped collection (可重複呼叫)；jobs 的索引宣告於 backend/indexes.py。
+    """
+    try:
+        mongo.db.create_collection(
+            JOB_EVENTS_COLLECTION,
+            capped=True,
+            size=max(1, _env_int("JOB_EVENTS_CAPPED_MB", 16)) * 1024 * 1024
+        )
+    except CollectionInvalid:
+        pass  # 已存在
+    # tailable cursor 在空的 capped collection 上會立即失效，先放一筆哨兵事件
+    if _job_events().find_one() is None:
+        _job_events().insert_one({"job_id": None, "status": "init", "created_at": datetime.utcnow()})
+
+
+# ---------------- 進度事件 (pub/sub) ----------------
+
+def publish_job_event(job_id: str, status: str, progress: int, error_msg: str = ""):
+    """
+    發佈一筆進度事件；失敗只記 log (進度事件遺失不應讓 job 失敗，SSE 端仍會以 keep-alive 時的狀態補上)。
+    """
+    try:
+        _job_events().insert_one({
+            "job_id": job_id,
+            "status": status,
+            "progress": int(progress),
+            "error_msg": error_msg,
+            "created_at": datetime.utcnow(),
+        })
+    except Exception as e:
+        logger.warning("[jobs] publish event failed job_id=%s: %s", job_id, e)
+
+
+def latest_job_event_id() -> Optional[ObjectId]:
+    """
+    目前最新一筆事件的 _id；訂閱前先取得，再讀 job 狀態，確保兩者之間的事件不會漏掉。
+    """
+    doc = _job_events().find_one({}, {"_id": 1}, sort=[("$natural", DESCENDING)])
+    return doc["_id"] if doc else None
+
+
+def iter_job_events(job_id: str, after_id: Optional[ObjectId] = None, wait_seconds: float = 15.0):
+    """
+    阻塞式訂閱 job 的事件 (generator)：
+      - 有新事件時 yield {"status", "progress", "error_msg"}
+      - 等待 wait_seconds 仍無事件時 yield None (呼叫端可藉此送 keep-alive / 檢查過期)
+    """
+    last_id = after_id
+    while True:
+        query = {"job_id": job_id}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        cursor = _job_events().find(
+            query, cursor_type=CursorType.TAILABLE_AWAIT
+        ).max_await_time_ms(int(wait_seconds * 1000))
+        try:
+            while cursor.alive:
+                doc = cursor.try_next()
+                if doc is None:
+                    yield None
+                    continue
+                last_id = doc["_id"]
+                yield {
+                    "status": doc.get("status"),
+                    "progress": doc.get("progress", 0),
+                    "error_msg": doc.get("error_msg", ""),
+                }
+        except OperationFailure as e:
+            # 例如 capped collection 覆寫過快導致 cursor 失效；稍後以 last_id 重新開 cursor
+            logger.debug("[jobs] event cursor for %s lost: %s", job_id, e)
+        finally:
+            cursor.close()
+        # cursor 失效 (例如 collection 尚無事件) 時避免空轉
+        time.sleep(min(wait_seconds, 1.0))
+        yield None
+
+
+def create_job(job_type: str, params: Dict[str, Any], ttl_seconds: Optional[int] = None) -> dict:
+    now = datetime.utcnow()
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "job_type": job_type,
+        "status": JOB_QUEUED,
+        "progress": 0,
+        "params": params,
+        "result": None,
+        "error_msg": "",
+        "attempts": 0,
+        "claimed_by": None,
+        "created_at": now,
+        "updated_at": now,
+        "heartbeat_at": None,
+        "expires_at": now + timedelta(seconds=ttl_seconds or get_job_ttl_seconds()),
+    }
+    _jobs().insert_one(job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    if not job_id:
+        return None
+    return _jobs().find_one({"job_id": job_id}, {"_id": 0})
+
+
+def is_job_expired(job: dict) -> bool:
+    expires_at = job.get("expires_at")
+    return bool(expires_at and datetime.utcnow() > expires_at)
+
+
+def claim_job(job_id: str, worker_id: Optional[str] = None) -> Optional[dict]:
+    """
+    認領指定的 queued job (inline 模式用)；已被別人認領時回傳 None。
+    """
+    now = datetime.utcnow()
+    job = _jobs().find_one_and_update(
+        {"job_id": job_id, "status": JOB_QUEUED},
+        {
+            "$set": {
+                "status": JOB_IN_PROGRESS,
+                "claimed_by": worker_id or get_worker_id(),
+                "updated_at": now,
+                "heartbeat_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is not None:
+        publish_job_event(job_id, JOB_IN_PROGRESS, job.get("progress", 0))
+    return job
+
+
+def claim_next_job(job_types: Iterable[str], worker_id: Optional[str] = None) -> Optional[dict]:
+    """
+    原子地認領下一個可執行的 job (最早建立者優先)：
+      - status=queued
+      - 或 status=in_progress 但 heartbeat 已逾時 (原 worker 可能已死)，且嘗試次數未達上限
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=_env_int("JOB_STALE_SECONDS", 300))
+    max_attempts = _env_int("JOB_MAX_ATTEMPTS", 3)
+
+    job = _jobs().find_one_and_update(
+        {
+            "job_type": {"$in": list(job_types)},
+            "expires_at": {"$gt": now},
+            "$or": [
+                {"status": JOB_QUEUED},
+                {
+                    "status": JOB_IN_PROGRESS,
+                    "heartbeat_at": {"$lt": stale_before},
+                    "attempts": {"$lt": max_attempts},
+                },
+            ],
+        },
+        {
+            "$set": {
+                "status": JOB_IN_PROGRESS,
+                "progress": 0,
+                "claimed_by": worker_id or get_worker_id(),
+                "updated_at": now,
+                "heartbeat_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", ASCENDING)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is not None:
+        publish_job_event(job["job_id"], JOB_IN_PROGRESS, 0)
+    return job
+
+
+def update_job_progress(job_id: str, progress: int, worker_id: Optional[str] = None) -> bool:
+    """
+    更新進度 (同時當作 heartbeat)。
+    回傳 False 表示 job 已不再屬於這個 worker (被取消 / 過期 / 被重新認領)，呼叫端應停止執行。
+    """
+    now = datetime.utcnow()
+    res = _jobs().update_one(
+        {"job_id": job_id, "status": JOB_IN_PROGRESS, "claimed_by": worker_id or get_worker_id()},
+        {"$set": {"progress": int(progress), "updated_at": now, "heartbeat_at": now}}
+    )
+    if res.matched_count == 0:
+        return False
+    publish_job_event(job_id, JOB_IN_PROGRESS, progress)
+    return True
+
+
+def finish_job(job_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+    now = datetime.utcnow()
+    res = _jobs().update_one(
+        {"job_id": job_id, "status": JOB_IN_PROGRESS, "claimed_by": worker_id or get_worker_id()},
+        {"$set": {"status": JOB_DONE, "progress": 100, "result": result, "updated_at": now}}
+    )
+    if res.matched_count == 0:
+        return False
+    publish_job_event(job_id, JOB_DONE, 100)
+    return True
+
+
+def fail_job(job_id: str, error_msg: str, worker_id: Optional[str] = None) -> bool:
+    now = datetime.utcnow()
+    job = _jobs().find_one_and_update(
+        {"job_id": job_id, "status": {"$in": [JOB_QUEUED, JOB_IN_PROGRESS]},
+         "claimed_by": {"$in": [None, worker_id or get_worker_id()]}},
+        {"$set": {"status": JOB_ERROR, "error_msg": error_msg, "updated_at": now}},
+        projection={"progress": 1}
+    )
+    if job is None:
+        return False
+    publish_job_event(job_id, JOB_ERROR, job.get("progress", 0), error_msg)
+    return True
+
+
+def execute_job(job: dict, handlers: Dict[str, Any], worker_id: Optional[str] = None):
+    """
+    執行一個已認領的 job：handlers[job_type](job, worker_id) 回傳 result dict 即標記為 done；
+    回傳 None 代表中途停止 (job 已不屬於此 worker)，不再更動狀態；拋出例外則標記為 error。
+    需在 Flask app context 中呼叫。
+    """
+    job_id = job["job_id"]
+    worker_id = worker_id or get_worker_id()
+    handler = handlers.get(job.get("job_type"))
+    if handler is None:
+        fail_job(job_id, f"Unsupported job_type={job.get('job_type')}", worker_id)
+        return
+
+    try:
+        result = handler(job, worker_id)
+    except Exception as e:
+        logger.exception("[jobs] job %s (%s) failed:", job_id, job.get("job_type"))
+        fail_job(job_id, str(e), worker_id)
+        return
+
+    if result is None:
+        logger.info("[jobs] job %s stopped (no longer owned by %s)", job_id, worker_id)
+        return
+    if not finish_job(job_id, result, worker_id):
+        logger.warning("[jobs] job %s finished but was no longer owned by %s", job_id, worker_id)
@@ -10,6 +10,9 @@ from backend.material_management.routes import material_bp
 from backend.staff_management.routes import staff_bp
 
 from backend.db import init_mongo_app
+from backend.indexes import apply_indexes_on_startup
+from backend.jobs import ensure_job_events_collection
+from backend.document_management.s3_cleanup import start_s3_cleanup
 
 # from backend.site_diary.progress_sse import progress_sse_bp  # <-- 已刪除，不再引用
 from backend.gantt_management.routes import gantt_bp
@@ -23,6 +26,12 @@ def create_app():
 
     # 初始化 MongoDB
     init_mongo_app(app)
+    # 所有 collection 的索引 (各 blueprint 的 indexes.py 宣告，見 backend/indexes.py)
+    apply_indexes_on_startup()
+    # 背景 job 進度事件的 capped collection
+    ensure_job_events_collection()
+    # 待刪除的 S3 物件 (背景批次刪除)
+    start_s3_cleanup(app)
 
     # Blueprint 註冊
     app.register_blueprint(projects_bp, url_prefix='/api/projects')
@@ -0,0 +1,19 @@
+# backend/project_management/indexes.py
+
+"""
+projects blueprint 的索引宣告 (見 backend/indexes.py)。
+"""
+
+from pymongo import ASCENDING
+
+from backend.indexes import index, query
+
+INDEXES = [
+    # 以自動遞增的整數 id 查詢 / 排序
+    index("projects", "id", unique=True),
+]
+
+QUERIES = [
+    query("GET /api/projects/", "projects", {}, sort=[("id", ASCENDING)]),
+    query("GET|PUT|DELETE /api/projects/<project_id>", "projects", {"id": 1}),
+]
@@ -0,0 +1,19 @@
+# backend/staff_management/indexes.py
+
+"""
+staff blueprint 的索引宣告 (見 backend/indexes.py)。
+"""
+
+from pymongo import ASCENDING
+
+from backend.indexes import index, query
+
+INDEXES = [
+    # 以自動遞增的整數 id 查詢 / 排序
+    index("staff", "id", unique=True),
+]
+
+QUERIES = [
+    query("GET /api/staff", "staff", {}, sort=[("id", ASCENDING)]),
+    query("GET|PUT|DELETE /api/staff/<staff_id>", "staff", {"id": 1}),
+]
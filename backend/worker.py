@@ -0,0 +1,58 @@
+# backend/worker.py
+
+"""
+背景 job worker (JOB_EXECUTION=worker 時使用)。
+
+用法 (於專案根目錄，環境變數與 web 相同，至少需要 MONGO_URI)：
+    python -m backend.worker
+
+不斷從 MongoDB `jobs` collection 原子地認領 job 並執行 (見 backend/jobs.py)；
+可以開多個 worker 行程 / 容器來擴充 render 能力，與 web worker 數量無關。
+  - JOB_POLL_INTERVAL  沒有 job 時的輪詢間隔 (秒，預設 2)
+"""
+
+import logging
+import os
+import signal
+import time
+
+from backend.main import create_app
+from backend.jobs import claim_next_job, execute_job, get_worker_id
+from backend.document_management.export_jobs import JOB_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+_stopping = False
+
+
+def _handle_stop(signum, frame):
+    global _stopping
+    _stopping = True
+    logger.info("[worker] received signal %s, stopping after current job", signum)
+
+
+def run_worker():
+    try:
+        poll_interval = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+    except ValueError:
+        poll_interval = 2.0
+
+    app = create_app()
+    worker_id = get_worker_id()
+    logger.info("[worker] %s started, job types=%s", worker_id, list(JOB_HANDLERS))
+
+    with app.app_context():
+        while not _stopping:
+            job = claim_next_job(JOB_HANDLERS.keys(), worker_id)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            logger.info("[worker] claimed job %s (%s), attempt %s", job["job_id"], job["job_type"], job["attempts"])
+            execute_job(job, JOB_HANDLERS, worker_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+    run_worker()
@@ -0,0 +1,104 @@
+# benchmarks/bench_daily_report_xlsx.py
+
+"""
+日報 XLSX render 效能比較 (不需 MongoDB / Flask app)：
+  - before: shutil.copy 模板 + load_workbook 從磁碟 parse + 填表 + 存檔 (舊做法)
+  - after : 由記憶體中的 pristine 模板複製 + 填表 + 寫入記憶體 buffer
+
+用法 (於專案根目錄)：
+    python -m benchmarks.bench_daily_report_xlsx
+    python -m benchmarks.bench_daily_report_xlsx --counts 1,100,1000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from backend.document_management.services import (
+    _fill_daily_report_workbook,
+    render_daily_report_xlsx_bytes,
+)
+
+TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "backend", "report_templates", "daily_report.xlsx"
+)
+
+PROJECT_DOC = {
+    "id": 1,
+    "name": "測試工程",
+    "job_number": "JOB-001",
+    "contractor": "測試承建商",
+    "start_date": datetime(2025, 1, 1),
+    "duration_days": 365,
+    "duration_type": "business",
+}
+
+
+def _sample_doc(i: int) -> dict:
+    return {
+        "project_id": 1,
+        "daily_report_id": i,
+        "daily_report_data": {
+            "report_date": f"2025-03-{(i % 28) + 1:02d}",
+            "weather_morning": "晴",
+            "weather_noon": "多雲",
+            "day_count": i,
+            "summary": f"第 {i} 天施工摘要",
+            "workers": {"工程師": 2, "管工": 1, "雜工": i % 5},
+            "machines": {"挖掘機": 1},
+        },
+    }
+
+
+def render_before(doc: dict, out_dir: str) -> str:
+    out_path = os.path.join(out_dir, f"{doc['daily_report_id']}_daily_report.xlsx")
+    shutil.copy(TEMPLATE_PATH, out_path)
+    wb = load_workbook(out_path)
+    _fill_daily_report_workbook(wb, doc, PROJECT_DOC)
+    wb.save(out_path)
+    wb.close()
+    return out_path
+
+
+def render_after(doc: dict) -> bytes:
+    return render_daily_report_xlsx_bytes(doc, PROJECT_DOC, template_path=TEMPLATE_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", default="1,100,1000")
+    args = parser.parse_args()
+    counts = [int(c) for c in args.counts.split(",") if c.strip()]
+
+    # 預熱 (讓 after 的模板載入不計入單筆時間)
+    render_after(_sample_doc(0))
+
+    print(f"{'reports':>8} | {'before total(s)':>15} | {'before/report(ms)':>17} | "
+          f"{'after total(s)':>14} | {'after/report(ms)':>16} | {'speedup':>7}")
+    for n in counts:
+        docs = [_sample_doc(i) for i in range(1, n + 1)]
+
+        out_dir = tempfile.mkdtemp(prefix="bench_xlsx_")
+        t0 = time.perf_counter()
+        for doc in docs:
+            render_before(doc, out_dir)
+        before = time.perf_counter() - t0
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+        t0 = time.perf_counter()
+        for doc in docs:
+            render_after(doc)
+        after = time.perf_counter() - t0
+
+        print(f"{n:>8} | {before:>15.3f} | {before * 1000 / n:>17.1f} | "
+              f"{after:>14.3f} | {after * 1000 / n:>16.1f} | {before / after:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_document_listing.py
+
+"""
+文件列表回應大小 / 序列化時間比較 (不需 MongoDB)：
+  - full   : 整筆文件 (含 daily_report_data 與舊資料的 versions 陣列，原本的 list_documents 行為)
+  - summary: build_document_projection("summary") 的欄位 (新的預設)
+
+以 projection 模擬 Mongo 回傳的欄位，量測 jsonify 的時間與 JSON bytes。
+
+用法 (於專案根目錄)：
+    python -m benchmarks.bench_document_listing --docs 2000 --versions 5
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from flask import Flask, jsonify
+
+from backend.document_management.document_versions import version_summary
+from backend.document_management.services import build_document_projection
+
+
+def _make_doc(i: int, versions: int) -> dict:
+    now = datetime.now() - timedelta(days=i)
+    workers = {f"worker_type_{k}": random.randint(0, 30) for k in range(25)}
+    machines = {f"machine_type_{k}": random.randint(0, 10) for k in range(20)}
+    vers = [{
+        "version_id": str(uuid.uuid4()),
+        "version_note": f"note {v}",
+        "filename": f"report_{i}_{v}.pdf",
+        "s3_key": f"documents/{uuid.uuid4()}.pdf",
+        "size": 123456,
+        "created_at": now,
+    } for v in range(versions)]
+    return {
+        "_id": ObjectId(),
+        "title": f"DailyReport #{i}",
+        "doc_type": "DAILY_REPORT",
+        "project_id": 1,
+        "description": "Daily report for project 1",
+        "daily_report_id": i,
+        "daily_report_data": {
+            "report_date": now.strftime("%Y-%m-%d"),
+            "weather_morning": "晴",
+            "weather_noon": "陰",
+            "day_count": i,
+            "summary": "今日施工內容摘要 " * 20,
+            "workers": workers,
+            "machines": machines,
+            "staff_ids": list(range(10)),
+        },
+        "versions": vers,
+        "latest_version": version_summary(vers[-1] if vers else None),
+        "version_count": versions,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _project(doc: dict, projection) -> dict:
+    if projection is None:
+        return dict(doc)
+    if any(v == 0 for v in projection.values()):
+        return {k: v for k, v in doc.items() if projection.get(k, 1)}
+    return {k: v for k, v in doc.items() if k == "_id" or k in projection}
+
+
+def _run(label: str, app: Flask, docs, projection, rounds: int):
+    elapsed = 0.0
+    size = 0
+    with app.app_context():
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            results = []
+            for d in docs:
+                d = _project(d, projection)
+                d["id"] = str(d.pop("_id"))
+                results.append(d)
+            size = len(jsonify(results).get_data())
+            elapsed += time.perf_counter() - t0
+    ms = elapsed * 1000 / rounds
+    print(f"{label:>8}: {size / 1024:.0f} KB, {ms:.1f} ms/response")
+    return size, ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    docs = [_make_doc(i, args.versions) for i in range(args.docs)]
+    full_size, full_ms = _run("full", app, docs, None, args.rounds)
+    summary_size, summary_ms = _run("summary", app, docs, build_document_projection("summary"), args.rounds)
+    print(f"size x{full_size / summary_size:.1f}, time x{full_ms / summary_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_gantt_schedule.py
+
+"""
+CPM 排程效能：合成的 WBS (每 --fanout 個任務一個父任務、多層) + 隨機 finish-to-start 相依，
+量 compute_schedule 的時間，並以不同規模檢查耗時大致隨 任務數 + 相依數 線性成長。
+計時前先以小型 fixture (MILESTONE_FIXTURE) 檢查 milestone 的日期規則。
+
+純記憶體計算，不需要 MongoDB。
+
+用法 (於專案根目錄)：
+    python -m benchmarks.bench_gantt_schedule --tasks 10000 --deps-per-task 2
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from backend.gantt_management.scheduling import compute_schedule
+from backend.gantt_management.work_calendar import WorkCalendar
+
+
+# milestone 日期規則 (週一 ~ 週五上班，2025-01-11 / 12 為週末)：
+#   1 -> 2 -> 3：鏈在週五 01-10 完工，被推遲的 milestone 3 報在 01-10
+#   4：不被推遲、沒有後續的 milestone，原本就在週六 01-11 => 最早日期維持 01-11，
+#      最晚日期不可晚於 project_finish
+#   5：01-13 ~ 01-14 的任務，決定 project_finish = 01-14
+MILESTONE_FIXTURE = [
+    {"id": 1, "type": "task", "start_date": "2025-01-06", "end_date": "2025-01-08", "depends": []},
+    {"id": 2, "type": "task", "start_date": "2025-01-09", "end_date": "2025-01-10", "depends": [1]},
+    {"id": 3, "type": "milestone", "start_date": "2025-01-01", "end_date": "2025-01-01", "depends": [2]},
+    {"id": 4, "type": "milestone", "start_date": "2025-01-11", "end_date": "2025-01-11", "depends": []},
+    {"id": 5, "type": "task", "start_date": "2025-01-13", "end_date": "2025-01-14", "depends": []},
+]
+
+MILESTONE_EXPECTED = {
+    # id: (early_start, early_finish, late_start, late_finish)
+    3: ("2025-01-10", "2025-01-10", "2025-01-14", "2025-01-14"),
+    4: ("2025-01-11", "2025-01-11", "2025-01-14", "2025-01-14"),
+}
+
+
+def check_milestone_fixture():
+    result = compute_schedule([dict(t) for t in MILESTONE_FIXTURE], WorkCalendar())
+    assert result["project_finish"] == "2025-01-14", result["project_finish"]
+    by_id = {t["id"]: t for t in result["tasks"]}
+    for task_id, expected in MILESTONE_EXPECTED.items():
+        t = by_id[task_id]
+        actual = (t["early_start"], t["early_finish"], t["late_start"], t["late_finish"])
+        assert actual == expected, f"milestone {task_id}: {actual} != {expected}"
+    for t in result["tasks"]:
+        assert t["late_finish"] <= result["project_finish"], t
+    print("milestone fixture: ok")
+
+
+def make_tasks(count: int, deps_per_task: int, fanout: int, seed: int = 42):
+    rng = random.Random(seed)
+    base = date(2025, 1, 1)
+    tasks = []
+    # 先建葉任務，之後每 fanout 個掛一個父任務，逐層往上
+    level = []
+    for i in range(1, count + 1):
+        start = base + timedelta(days=rng.randint(0, 365))
+        tasks.append({
+            "id": i,
+            "parent_id": None,
+            "type": "milestone" if i % 50 == 0 else "task",
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=rng.randint(0, 20))).isoformat(),
+            # 只依賴 id 較小的任務 => 無環
+            "depends": sorted({rng.randint(max(1, i - 500), i - 1) for _ in range(deps_per_task)}) if i > 1 else [],
+        })
+        level.append(i)
+
+    next_id = count + 1
+    while len(level) > 1:
+        parents = []
+        for j in range(0, len(level), fanout):
+            parent_id = next_id
+            next_id += 1
+            tasks.append({"id": parent_id, "parent_id": None, "type": "project",
+                          "start_date": base.isoformat(), "end_date": base.isoformat(), "depends": []})
+            for child_id in level[j:j + fanout]:
+                tasks[child_id - 1]["parent_id"] = parent_id
+            parents.append(parent_id)
+        level = parents
+    return tasks
+
+
+def run(count: int, deps_per_task: int, fanout: int, repeat: int):
+    tasks = make_tasks(count, deps_per_task, fanout)
+    edges = sum(len(t["depends"]) for t in tasks)
+    settings = {"holidays": ["2025-01-29", "2025-01-30", "2025-01-31", "2025-04-04", "2025-12-25"],
+                "workday_weekdays": [1, 2, 3, 4, 5, 6], "special_workdays": []}
+
+    best = None
+    for _ in range(repeat):
+        calendar = WorkCalendar.from_settings(settings)
+        t0 = time.perf_counter()
+        result = compute_schedule(tasks, calendar)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{len(tasks):>7} tasks ({count} leaves), {edges:>7} deps: "
+          f"{best * 1000:8.1f} ms, critical path {len(result['critical_path'])} tasks, "
+          f"finish {result['project_finish']}")
+    return best, len(tasks) + edges
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--deps-per-task", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    check_milestone_fixture()
+
+    # --tasks 的 1/4、1/2、全部
+    timings = [run(args.tasks * scale // 4, args.deps_per_task, args.fanout, args.repeat) for scale in (1, 2, 4)]
+
+    (t_small, n_small), (t_large, n_large) = timings[0], timings[-1]
+    print(f"scaling: size x{n_large / n_small:.1f} => time x{t_large / t_small:.1f}")
+
+
+if __name__ == "__main__":
+    main()
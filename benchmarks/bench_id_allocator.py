@@ -0,0 +1,102 @@
+# benchmarks/bench_id_allocator.py
+
+"""
+自增 ID 發放的併發比較：多個 greenlet 同時經由實際的 service 路徑新增 gantt 任務
+  - single : create_gantt_task 逐筆新增，每個 ID 一次 find_one_and_update (get_next_sequence 的預設行為)
+  - batch  : apply_gantt_task_batch，每個 greenlet 一次批次新增 (reserve(n) 一次保留 + 一次 bulk_write)
+量到的是整個新增路徑 (組 doc + 取 ID + bulk_write)，並檢查所有 ID 不重複、且批次內的 ID 連續。
+(區塊發放 ID_BLOCK_COLLECTIONS 預設不啟用，因為任務 ID 對使用者可見，這裡不比較。)
+
+需要可用的 MongoDB；會在指定的 database 新增 (並在結束時刪除) project_id = --project-id 的任務，
+gantt_tasks 的 counters 會因此前進，請使用獨立的 bench database：
+    MONGO_URI="mongodb://127.0.0.1:27017/work_project_bench" python -m benchmarks.bench_id_allocator
+
+用法 (於專案根目錄)：
+    python -m benchmarks.bench_id_allocator --greenlets 200 --tasks 20
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+from flask import Flask  # noqa: E402
+
+from backend.db import mongo  # noqa: E402
+from backend.gantt_management.services import apply_gantt_task_batch, create_gantt_task  # noqa: E402
+
+
+def _task_body(project_id: int, n: int) -> dict:
+    return {"project_id": project_id, "text": f"bench {n}", "start_date": "2025-01-01", "end_date": "2025-01-05"}
+
+
+def _report(label: str, ids: list, total: int, elapsed: float):
+    assert len(ids) == total and len(set(ids)) == total, f"{label}: duplicate or missing IDs"
+    print(f"{label:>8}: {elapsed:.3f}s for {total} tasks, {total / elapsed:,.0f} tasks/s")
+
+
+def _run_create(app: Flask, project_id: int, greenlets: int, tasks: int):
+    ids = []
+
+    def worker(n):
+        with app.app_context():
+            for i in range(n):
+                ids.append(create_gantt_task(_task_body(project_id, i)))
+
+    t0 = time.perf_counter()
+    gevent.joinall([gevent.spawn(worker, tasks) for _ in range(greenlets)], raise_error=True)
+    elapsed = time.perf_counter() - t0
+    _report("single", ids, greenlets * tasks, elapsed)
+    return elapsed
+
+
+def _run_batch(app: Flask, project_id: int, greenlets: int, tasks: int):
+    ids = []
+
+    def worker(n):
+        with app.app_context():
+            operations = [dict(_task_body(project_id, i), op="create") for i in range(n)]
+            created = apply_gantt_task_batch(project_id, operations)["created_ids"]
+            assert created == list(range(created[0], created[0] + n)), "batch: IDs not contiguous"
+            ids.extend(created)
+
+    t0 = time.perf_counter()
+    gevent.joinall([gevent.spawn(worker, tasks) for _ in range(greenlets)], raise_error=True)
+    elapsed = time.perf_counter() - t0
+    _report("batch", ids, greenlets * tasks, elapsed)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--greenlets", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20, help="每個 greenlet 新增的任務數")
+    parser.add_argument("--project-id", type=int, default=999999, help="bench 任務使用的 project_id")
+    args = parser.parse_args()
+
+    mongo_uri = os.environ.get("MONGO_URI", "").strip()
+    if not mongo_uri:
+        raise SystemExit("MONGO_URI is required (use a scratch database)")
+
+    app = Flask(__name__)
+    app.config["MONGO_URI"] = mongo_uri
+    mongo.init_app(app)
+
+    with app.app_context():
+        mongo.db["counters"].create_index("collection_name", unique=True)
+
+    try:
+        before = _run_create(app, args.project_id, args.greenlets, args.tasks)
+        after = _run_batch(app, args.project_id, args.greenlets, args.tasks)
+        print(f"batch (reserve) speedup: {before / after:.1f}x")
+    finally:
+        with app.app_context():
+            mongo.db["gantt_tasks"].delete_many({"project_id": args.project_id})
+
+
+if __name__ == "__main__":
+    main()
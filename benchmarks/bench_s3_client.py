@@ -0,0 +1,69 @@
+# benchmarks/bench_s3_client.py
+
+"""
+S3 client 效能比較：100 次連續上傳
+  - before: 每次上傳都 new 一個 boto3 Session + client (舊的 get_s3_client 行為)
+  - after : process 共用的 client (s3_client.get_s3_client，連線池重用)
+
+需要可用的 S3 (或相容服務)；本機可用 moto server / MinIO：
+    moto_server -p 5000 &
+    S3_ENDPOINT_URL=http://127.0.0.1:5000 AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x \\
+    AWS_S3_BUCKET=bench python -m benchmarks.bench_s3_client --create-bucket
+
+用法 (於專案根目錄)：
+    python -m benchmarks.bench_s3_client --count 100 --size-kb 64
+"""
+
+import argparse
+import os
+import time
+import uuid
+
+from backend.document_management.s3_client import create_s3_client, get_s3_client
+
+
+def _run(label: str, client_factory, bucket: str, count: int, body: bytes):
+    keys = []
+    t0 = time.perf_counter()
+    for _ in range(count):
+        key = f"bench-s3-client/{uuid.uuid4().hex}"
+        client_factory().put_object(Bucket=bucket, Key=key, Body=body)
+        keys.append(key)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:>7}: {elapsed:.3f}s total, {elapsed * 1000 / count:.1f} ms/upload")
+
+    client = get_s3_client()
+    for i in range(0, len(keys), 1000):
+        client.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]]})
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--create-bucket", action="store_true")
+    args = parser.parse_args()
+
+    bucket = os.environ.get("AWS_S3_BUCKET", "")
+    if not bucket:
+        raise SystemExit("AWS_S3_BUCKET not set")
+    if args.create_bucket:
+        try:
+            get_s3_client().create_bucket(
+                Bucket=bucket,
+                CreateBucketConfiguration={"LocationConstraint": os.environ.get("AWS_DEFAULT_REGION", "ap-southeast-1")}
+            )
+        except get_s3_client().exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+    body = os.urandom(args.size_kb * 1024)
+    get_s3_client().put_object(Bucket=bucket, Key="bench-s3-client/warmup", Body=b"")  # 預熱 (建立共用 client)
+
+    before = _run("before", create_s3_client, bucket, args.count, body)
+    after = _run("after", get_s3_client, bucket, args.count, body)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/compare_xlsx_engines.py
+
+"""
+比較日報 XLSX 的兩種 engine (不需 MongoDB / Flask app)：
+  - openpyxl: 由記憶體中的 pristine workbook 複製 + 填表
+  - xml     : 直接 patch 模板 worksheet XML (xlsx_patch.py)
+
+1. golden 檢查：以 openpyxl 重新讀取兩種 engine 的輸出，逐格比對所有工作表的
+   值 / 對齊 / 字型 / 框線 / 填色 / 數字格式、合併儲存格與列印範圍，有差異即以非 0 結束。
+2. 效能：每份日報的平均 render 時間。
+
+用法 (於專案根目錄)：
+    python -m benchmarks.compare_xlsx_engines
+    python -m benchmarks.compare_xlsx_engines --count 200
+"""
+
+import argparse
+import io
+import sys
+import time
+
+from openpyxl import load_workbook
+
+from backend.document_management.services import (
+    DAILY_REPORT_PRINT_AREAS,
+    DAILY_REPORT_SHEETS,
+    _daily_report_cell_values,
+    render_daily_report_xlsx_bytes,
+)
+from backend.document_management.xlsx_patch import get_patch_template
+from benchmarks.bench_daily_report_xlsx import PROJECT_DOC, TEMPLATE_PATH, _sample_doc
+
+
+def _cell_signature(cell):
+    return (
+        cell.value,
+        cell.alignment.horizontal, cell.alignment.vertical, bool(cell.alignment.wrap_text),
+        cell.font.name, cell.font.sz, bool(cell.font.b),
+        cell.border.left.style, cell.border.right.style, cell.border.top.style, cell.border.bottom.style,
+        cell.fill.fgColor.rgb if cell.fill and cell.fill.fill_type else None,
+        cell.number_format,
+    )
+
+
+def _normalize_print_area(ws):
+    area = ws.print_area
+    if not area:
+        return None
+    return area.split("!")[-1].replace("$", "")
+
+
+def compare_workbooks(data_a: bytes, data_b: bytes, sheet_titles=None):
+    """
+    回傳差異描述 list (空 list = 相同)。sheet_titles 指定時只比對 (可見的) 這些工作表。
+    """
+    wb_a = load_workbook(io.BytesIO(data_a))
+    wb_b = load_workbook(io.BytesIO(data_b))
+    diffs = []
+    titles = sheet_titles or wb_a.sheetnames
+    for title in titles:
+        if title not in wb_b.sheetnames:
+            diffs.append(f"{title}: missing sheet")
+            continue
+        ws_a, ws_b = wb_a[title], wb_b[title]
+        if sheet_titles and ws_b.sheet_state != "visible":
+            diffs.append(f"{title}: not visible")
+        if _normalize_print_area(ws_a) != _normalize_print_area(ws_b):
+            diffs.append(f"{title}: print_area {ws_a.print_area!r} != {ws_b.print_area!r}")
+        if sorted(map(str, ws_a.merged_cells.ranges)) != sorted(map(str, ws_b.merged_cells.ranges)):
+            diffs.append(f"{title}: merged cells differ")
+
+        max_row = max(ws_a.max_row, ws_b.max_row)
+        max_col = max(ws_a.max_column, ws_b.max_column)
+        for row in range(1, max_row + 1):
+            for col in range(1, max_col + 1):
+                sig_a = _cell_signature(ws_a.cell(row, col))
+                sig_b = _cell_signature(ws_b.cell(row, col))
+                if sig_a != sig_b:
+                    diffs.append(f"{title}!{ws_a.cell(row, col).coordinate}: {sig_a} != {sig_b}")
+    # 單一工作表模式：其餘可見工作表不得存在
+    if sheet_titles:
+        for ws in wb_b.worksheets:
+            if ws.title not in sheet_titles and ws.sheet_state == "visible":
+                diffs.append(f"{ws.title}: should not be visible")
+    return diffs
+
+
+def _render_openpyxl(doc):
+    return render_daily_report_xlsx_bytes(doc, PROJECT_DOC, template_path=TEMPLATE_PATH)
+
+
+def _render_xml(doc, only_sheet=None):
+    return get_patch_template(TEMPLATE_PATH).render(
+        _daily_report_cell_values(doc, PROJECT_DOC), DAILY_REPORT_PRINT_AREAS, only_sheet=only_sheet
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100)
+    args = parser.parse_args()
+
+    docs = [_sample_doc(i) for i in range(1, 6)]
+    docs.append({"project_id": 1, "daily_report_id": 99, "daily_report_data": {}})
+    docs.append({
+        "project_id": 1,
+        "daily_report_id": 100,
+        "daily_report_data": {"report_date": "2025-04-01", "summary": "<特殊> & \"符號\" 'test'\n第二行"},
+    })
+
+    failed = False
+    for doc in docs:
+        expected = _render_openpyxl(doc)
+        diffs = compare_workbooks(expected, _render_xml(doc))
+        for title, _ in DAILY_REPORT_SHEETS.values():
+            diffs += compare_workbooks(expected, _render_xml(doc, only_sheet=title), sheet_titles=[title])
+        if diffs:
+            failed = True
+            print(f"[FAIL] daily_report_id={doc['daily_report_id']}")
+            for d in diffs[:20]:
+                print("   ", d)
+        else:
+            print(f"[OK]   daily_report_id={doc['daily_report_id']}")
+
+    bench_docs = [_sample_doc(i) for i in range(1, args.count + 1)]
+    for name, fn in (("openpyxl", _render_openpyxl), ("xml", _render_xml)):
+        fn(bench_docs[0])  # 預熱 (模板載入)
+        t0 = time.perf_counter()
+        for doc in bench_docs:
+            fn(doc)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>8}: {elapsed:.3f}s total, {elapsed * 1000 / len(bench_docs):.2f} ms/report")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()